@@ -0,0 +1,226 @@
+import asyncio
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import threading
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from food_table import FoodCatalog
+from nutrition_coach import NutritionCoachAgent
+
+# Agent methods a client may call through the service
+SERVICE_METHODS = ("setup_user_profile", "set_goals", "log_meal", "log_meals",
+                   "get_daily_summary", "get_weekly_summary")
+
+
+def _serve_shard(inbox: multiprocessing.Queue, replies: multiprocessing.connection.Connection,
+                 food_database: Optional[Dict[str, Dict[str, Union[float, str]]]]):
+    """Worker loop: own the agents of one shard and answer requests until a None arrives."""
+    if food_database is None:
+        food_database = NutritionCoachAgent().food_database
+    catalog = FoodCatalog(food_database)
+    agents = {}
+
+    while True:
+        request = inbox.get()
+        if request is None:
+            break
+
+        request_id, user_id, method, args, kwargs = request
+        try:
+            agent = agents.get(user_id)
+            if agent is None:
+                agent = agents[user_id] = NutritionCoachAgent(catalog=catalog)
+            _reply(replies, request_id, True, getattr(agent, method)(*args, **kwargs))
+        except Exception as error:
+            _reply(replies, request_id, False, error)
+
+
+def _reply(replies: multiprocessing.connection.Connection, request_id: int, succeeded: bool, value: Any):
+    """
+    Send a reply with its value already pickled.
+
+    The value is pickled, and an exception also unpickled, here in the worker,
+    where a failure can still be reported: a value or exception that cannot
+    make the trip is replaced by a RuntimeError carrying its text.
+    """
+    try:
+        payload = pickle.dumps(value)
+        if not succeeded:
+            # Exceptions with extra constructor arguments pickle fine but fail to unpickle
+            pickle.loads(payload)
+    except Exception as error:
+        text = f"{type(value).__name__}: {value}" if not succeeded else f"unpicklable {type(value).__name__} result"
+        payload = pickle.dumps(RuntimeError(f"{text} ({type(error).__name__}: {error})"))
+        succeeded = False
+    replies.send((request_id, succeeded, payload))
+
+
+class CoachService:
+    """
+    Multi-user nutrition coach served by a fixed set of worker processes.
+
+    Every user id hashes to one worker, which keeps that user's agent (profile,
+    goals and logs) in memory, so requests for a user are handled in order by
+    the same process. Each worker builds a single read-only FoodCatalog that
+    all of its agents share.
+
+    If a worker process dies, the calls waiting on it and any later calls for
+    its users raise RuntimeError; the users of other workers are unaffected.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 food_database: Optional[Dict[str, Dict[str, Union[float, str]]]] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.food_database = food_database
+        self._inboxes = []
+        self._processes = []
+        self._collector = None
+        self._loop = None
+        # request id -> (worker index, future)
+        self._pending = {}
+        # worker index -> why it is no longer serving
+        self._dead = {}
+        self._request_ids = itertools.count()
+
+    async def start(self):
+        """Start the worker processes and the thread that collects their replies."""
+        self._loop = asyncio.get_running_loop()
+        # One reply pipe per worker: a worker that dies mid-send cannot take a lock
+        # shared with the others down with it, and its pipe closing tells us it is gone
+        connections = []
+        for _ in range(self.workers):
+            inbox = multiprocessing.Queue()
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_serve_shard, args=(inbox, writer, self.food_database),
+                                              daemon=True)
+            process.start()
+            writer.close()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+            connections.append(reader)
+
+        self._collector = threading.Thread(target=self._collect_replies, args=(connections, list(self._processes)),
+                                           daemon=True)
+        self._collector.start()
+
+    async def stop(self):
+        """Stop the workers once they have answered every queued request."""
+        for worker, inbox in enumerate(self._inboxes):
+            if worker not in self._dead:
+                inbox.put(None)
+        # The collector returns once every worker has exited and been reaped
+        await self._loop.run_in_executor(None, self._collector.join)
+        self._inboxes, self._processes = [], []
+        # Calls made while stopping never reach a worker
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("CoachService stopped"))
+        self._pending, self._dead = {}, {}
+
+    async def __aenter__(self) -> "CoachService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def _collect_replies(self, connections, processes):
+        """Hand each worker's replies to the event loop until every worker has exited."""
+        workers = {connection: worker for worker, connection in enumerate(connections)}
+        while workers:
+            for connection in multiprocessing.connection.wait(list(workers)):
+                try:
+                    request_id, succeeded, payload = connection.recv()
+                except (EOFError, OSError):
+                    # The worker's end is closed, so everything it sent has been read
+                    worker = workers.pop(connection)
+                    connection.close()
+                    processes[worker].join()
+                    self._loop.call_soon_threadsafe(self._fail_worker, worker,
+                                                    f"Worker {worker} exited with code {processes[worker].exitcode}")
+                    continue
+                try:
+                    value = pickle.loads(payload)
+                except Exception as error:
+                    succeeded = False
+                    value = RuntimeError(f"Reply could not be unpickled: {type(error).__name__}: {error}")
+                self._loop.call_soon_threadsafe(self._resolve, request_id, succeeded, value)
+
+    def _resolve(self, request_id: int, succeeded: bool, value: Any):
+        _, future = self._pending.pop(request_id, (None, None))
+        if future is None or future.done():
+            return
+        if succeeded:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _fail_worker(self, worker: int, reason: str):
+        """Fail every call waiting on a worker that is gone, and refuse new ones."""
+        self._dead.setdefault(worker, reason)
+        for request_id, (owner, future) in list(self._pending.items()):
+            if owner == worker:
+                del self._pending[request_id]
+                if not future.done():
+                    future.set_exception(RuntimeError(reason))
+
+    def shard_for(self, user_id: str) -> int:
+        """Return the worker index that owns a user (stable across runs, unlike hash())."""
+        return zlib.crc32(str(user_id).encode("utf-8")) % self.workers
+
+    async def call(self, user_id: str, method: str, *args, **kwargs) -> Any:
+        """
+        Run an agent method for a user on the worker that owns them.
+
+        Args:
+            user_id: User identifier
+            method: One of SERVICE_METHODS
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            The method's return value
+        """
+        if method not in SERVICE_METHODS:
+            raise ValueError(f"Unsupported method: {method}")
+        if not self._processes:
+            raise RuntimeError("CoachService is not running; call start() first")
+
+        worker = self.shard_for(user_id)
+        if worker in self._dead:
+            raise RuntimeError(self._dead[worker])
+
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = (worker, future)
+        self._inboxes[worker].put((request_id, user_id, method, args, kwargs))
+        return await future
+
+    async def setup_user_profile(self, user_id: str, *args, **kwargs) -> str:
+        return await self.call(user_id, "setup_user_profile", *args, **kwargs)
+
+    async def set_goals(self, user_id: str, *args, **kwargs) -> str:
+        return await self.call(user_id, "set_goals", *args, **kwargs)
+
+    async def log_meal(self, user_id: str, *args, **kwargs) -> str:
+        return await self.call(user_id, "log_meal", *args, **kwargs)
+
+    async def get_daily_summary(self, user_id: str, *args, **kwargs) -> str:
+        return await self.call(user_id, "get_daily_summary", *args, **kwargs)
+
+
+async def _demo():
+    async with CoachService(workers=2) as service:
+        await service.setup_user_profile("rishabh", name="Rishabh Jain", age=23, weight=70, height=165,
+                                         gender="male", activity_level="moderate")
+        await service.set_goals("rishabh", weight_goal=70, daily_calories=2000)
+        await service.log_meal("rishabh", "breakfast", {"oats": 1.5, "banana": 1, "almonds": 0.5})
+        print(await service.get_daily_summary("rishabh"))
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -0,0 +1,385 @@
+import csv
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from food_table import DIETARY_TAGS, NUTRIENTS
+
+FoodRecord = Dict[str, Union[float, str, List[str]]]
+
+# Fuzzy search reads the posting lists of the query's rarest trigrams up to this many rows in total
+MAX_POSTINGS = 10000
+# and scores at most this many of the foods found there, those sharing the most trigrams first
+MAX_CANDIDATES = 200
+# Jaccard similarity lookup() needs for a fuzzy match; one or two typos in a short name score 0.4-0.5
+LOOKUP_SIMILARITY = 0.4
+# Jaccard similarity a misspelled word needs to be corrected to a catalog word ("lemn" -> "lemon" is 0.375)
+WORD_SIMILARITY = 0.35
+# Names lookup() has found nothing for, kept until foods are added
+MAX_CACHED_MISSES = 10000
+
+
+def parse_tags(tags: Union[str, Iterable[str], None]) -> List[str]:
+    """Normalize tags given as a list or as a ";"/","/"|" separated string (as in CSV files)."""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = re.split(r"[;,|]", tags)
+    return [tag.strip().lower() for tag in tags if tag.strip()]
+
+
+def checkable_tags(restrictions: Iterable[str]) -> List[str]:
+    """Return the restrictions that are DIETARY_TAGS tags, lowercased; others cannot be checked."""
+    return [restriction.lower() for restriction in restrictions if restriction.lower() in DIETARY_TAGS]
+
+
+def similarity(grams: set, other: set) -> float:
+    """Jaccard similarity of two trigram sets."""
+    shared = len(grams & other)
+    return shared / (len(grams) + len(other) - shared)
+
+
+def words(text: str) -> List[str]:
+    """Return the lowercased words of a food name."""
+    return re.findall(r"\w+", text.lower())
+
+
+def trigrams(text: str) -> set:
+    """Return the set of padded character trigrams of a lowercased string."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodStore:
+    """
+    SQLite-backed food catalog for catalogs too large to keep in memory.
+
+    Names are stored lowercase under a unique index, which serves exact and
+    prefix lookups. A (trigram, food_id) table clustered on the trigram plus
+    per-trigram document frequencies serve fuzzy matching, so no lookup has to
+    scan the catalog. The distinct words of all names, with their own trigram
+    table, let lookup() correct misspelled words cheaply: the vocabulary is far
+    smaller than the catalog. Names lookup() finds nothing for are remembered
+    until the catalog changes.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self._create_schema()
+        self._misses = set()
+
+    def _create_schema(self):
+        nutrient_columns = ", ".join(f"{nutrient} REAL NOT NULL DEFAULT 0" for nutrient in NUTRIENTS)
+        with self.connection:
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS foods (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    {nutrient_columns},
+                    category TEXT NOT NULL DEFAULT '',
+                    tags TEXT NOT NULL DEFAULT '',
+                    trigram_count INTEGER NOT NULL
+                )""")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS food_trigrams (
+                    trigram TEXT NOT NULL,
+                    food_id INTEGER NOT NULL,
+                    PRIMARY KEY (trigram, food_id)
+                ) WITHOUT ROWID""")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS trigram_stats (
+                    trigram TEXT PRIMARY KEY,
+                    food_count INTEGER NOT NULL
+                ) WITHOUT ROWID""")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS words (
+                    word TEXT PRIMARY KEY,
+                    trigram_count INTEGER NOT NULL,
+                    food_count INTEGER NOT NULL
+                ) WITHOUT ROWID""")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS word_trigrams (
+                    trigram TEXT NOT NULL,
+                    word TEXT NOT NULL,
+                    PRIMARY KEY (trigram, word)
+                ) WITHOUT ROWID""")
+            # Stores written before the vocabulary tables existed get theirs built once
+            if not self.connection.execute("SELECT 1 FROM words LIMIT 1").fetchone():
+                for (name,) in self.connection.execute("SELECT name FROM foods").fetchall():
+                    self._add_words(name)
+
+    def add_foods(self, foods: Iterable[Tuple[str, FoodRecord]]) -> int:
+        """
+        Insert or replace foods in a single transaction.
+
+        Args:
+            foods: Iterable of (name, record) pairs, records shaped like the entries of
+                NutritionCoachAgent._initialize_food_database
+
+        Returns:
+            Number of foods written
+        """
+        columns = ", ".join(NUTRIENTS)
+        placeholders = ", ".join("?" for _ in NUTRIENTS)
+        assignments = ", ".join(f"{nutrient} = ?" for nutrient in NUTRIENTS)
+        count = 0
+        self._misses.clear()
+        with self.connection:
+            for name, record in foods:
+                name = name.strip().lower()
+                values = tuple(float(record.get(nutrient) or 0) for nutrient in NUTRIENTS)
+                category = record.get("category", "")
+                # Stored as ",tag,tag," so a tag test is a plain substring match
+                tags = "".join(f",{tag}" for tag in parse_tags(record.get("tags"))) + ","
+                existing = self.connection.execute("SELECT id FROM foods WHERE name = ?", (name,)).fetchone()
+                if existing:
+                    # Same name, same trigrams: only the nutrient columns change
+                    self.connection.execute(f"UPDATE foods SET {assignments}, category = ?, tags = ? WHERE id = ?",
+                                            (*values, category, tags, existing["id"]))
+                else:
+                    grams = trigrams(name)
+                    cursor = self.connection.execute(
+                        f"INSERT INTO foods (name, {columns}, category, tags, trigram_count) "
+                        f"VALUES (?, {placeholders}, ?, ?, ?)", (name, *values, category, tags, len(grams)))
+                    self.connection.executemany("INSERT INTO food_trigrams (trigram, food_id) VALUES (?, ?)",
+                                                ((gram, cursor.lastrowid) for gram in grams))
+                    self.connection.executemany("INSERT INTO trigram_stats (trigram, food_count) VALUES (?, 1) "
+                                                "ON CONFLICT (trigram) DO UPDATE SET food_count = food_count + 1",
+                                                ((gram,) for gram in grams))
+                    self._add_words(name)
+                count += 1
+        return count
+
+    def _add_words(self, name: str):
+        for word in set(words(name)):
+            grams = trigrams(word)
+            cursor = self.connection.execute("INSERT OR IGNORE INTO words (word, trigram_count, food_count) "
+                                             "VALUES (?, ?, 1)", (word, len(grams)))
+            if cursor.rowcount:
+                self.connection.executemany("INSERT INTO word_trigrams (trigram, word) VALUES (?, ?)",
+                                            ((gram, word) for gram in grams))
+            else:
+                self.connection.execute("UPDATE words SET food_count = food_count + 1 WHERE word = ?", (word,))
+
+    def import_csv(self, csv_path: str) -> int:
+        """
+        Import a catalog from a CSV file with name, nutrient, category and tags columns.
+
+        Args:
+            csv_path: Path to the CSV file
+
+        Returns:
+            Number of foods written
+        """
+        with open(csv_path, newline="", encoding="utf-8") as file:
+            return self.add_foods((row["name"], row) for row in csv.DictReader(file) if row.get("name"))
+
+    def _to_record(self, row: sqlite3.Row) -> FoodRecord:
+        record = {nutrient: row[nutrient] for nutrient in NUTRIENTS}
+        record["category"] = row["category"]
+        record["tags"] = parse_tags(row["tags"])
+        record["name"] = row["name"]
+        return record
+
+    def get(self, name: str) -> Optional[FoodRecord]:
+        """Return the record for an exact (case-insensitive) food name, or None."""
+        row = self.connection.execute("SELECT * FROM foods WHERE name = ?", (name.strip().lower(),)).fetchone()
+        return self._to_record(row) if row else None
+
+    def search_prefix(self, prefix: str, limit: int = 10, restrictions: Iterable[str] = (),
+                      shortest_first: bool = False) -> List[FoodRecord]:
+        """
+        Find foods whose name starts with the given prefix.
+
+        Args:
+            prefix: Start of the food name
+            limit: Maximum number of results
+            restrictions: Dietary restrictions the foods must satisfy
+            shortest_first: Order by name length first, closest to the prefix itself
+
+        Returns:
+            Matching records in name order, or in length then name order
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        # A half-open range on the unique name index instead of LIKE, which SQLite
+        # will not run against the index with the default case-insensitive collation.
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        tags = checkable_tags(restrictions)
+        tag_filter = "".join(" AND instr(tags, ?) > 0" for _ in tags)
+        order = "length(name), name" if shortest_first else "name"
+        rows = self.connection.execute(f"SELECT * FROM foods WHERE name >= ? AND name < ?{tag_filter} "
+                                       f"ORDER BY {order} LIMIT ?", (prefix, upper, *(f",{tag}," for tag in tags), limit))
+        return [self._to_record(row) for row in rows]
+
+    def search_fuzzy(self, query: str, limit: int = 10, min_similarity: float = 0.3,
+                     restrictions: Iterable[str] = ()) -> List[Tuple[float, FoodRecord]]:
+        """
+        Find foods whose names share the most trigrams with the query.
+
+        Only the posting lists of the query's rarest trigrams are read, up to
+        MAX_POSTINGS rows, skipping trigrams so common that their list alone
+        would exceed what is left. Of the foods found there within the length
+        bounds [min_similarity * len(q), len(q) / min_similarity], the
+        MAX_CANDIDATES sharing the most probed trigrams (then closest in length)
+        are scored. The cost is bounded whatever the catalog size, at the price
+        of missing a match that shares only common trigrams with the query.
+
+        Args:
+            query: Food name as typed by the user
+            limit: Maximum number of results
+            min_similarity: Minimum Jaccard similarity of the trigram sets (0-1]
+            restrictions: Dietary restrictions the foods must satisfy
+
+        Returns:
+            (similarity, record) pairs, most similar first
+        """
+        grams = trigrams(query.strip())
+        if not grams or min_similarity <= 0:
+            return []
+
+        placeholders = ", ".join("?" for _ in grams)
+        food_counts = dict(self.connection.execute(
+            f"SELECT trigram, food_count FROM trigram_stats WHERE trigram IN ({placeholders})", tuple(grams)))
+        probe, budget = [], MAX_POSTINGS
+        for gram in sorted(food_counts, key=food_counts.get):
+            if food_counts[gram] <= budget or not probe:
+                probe.append(gram)
+                budget -= food_counts[gram]
+        if not probe:
+            return []
+
+        tags = checkable_tags(restrictions)
+        tag_filter = "".join(" AND instr(f.tags, ?) > 0" for _ in tags)
+        placeholders = ", ".join("?" for _ in probe)
+        rows = self.connection.execute(f"""
+            SELECT f.* FROM (
+                SELECT food_id, COUNT(*) AS shared FROM food_trigrams
+                WHERE trigram IN ({placeholders}) GROUP BY food_id
+            ) c JOIN foods f ON f.id = c.food_id
+            WHERE f.trigram_count BETWEEN ? AND ?{tag_filter}
+            ORDER BY c.shared DESC, abs(f.trigram_count - ?) LIMIT ?""",
+                                       (*probe, min_similarity * len(grams), len(grams) / min_similarity,
+                                        *(f",{tag}," for tag in tags), len(grams), MAX_CANDIDATES))
+
+        matches = []
+        for row in rows:
+            score = similarity(grams, trigrams(row["name"]))
+            if score >= min_similarity:
+                matches.append((score, self._to_record(row)))
+        matches.sort(key=lambda match: (-match[0], match[1]["name"]))
+        return matches[:limit]
+
+    def _closest_word(self, word: str) -> Optional[str]:
+        grams = trigrams(word)
+        placeholders = ", ".join("?" for _ in grams)
+        row = self.connection.execute(f"""
+            SELECT w.word, 1.0 * c.shared / (w.trigram_count + ? - c.shared) AS similarity FROM (
+                SELECT word, COUNT(*) AS shared FROM word_trigrams
+                WHERE trigram IN ({placeholders}) GROUP BY word
+            ) c JOIN words w ON w.word = c.word
+            ORDER BY similarity DESC, w.food_count DESC, w.word LIMIT 1""", (len(grams), *grams)).fetchone()
+        return row["word"] if row and row["similarity"] >= WORD_SIMILARITY else None
+
+    def correct_spelling(self, query: str) -> str:
+        """
+        Replace each word of a query that no food name contains with the most similar one that some do.
+
+        Words shorter than three characters, and words nothing is similar enough
+        to, are kept as they are.
+
+        Args:
+            query: Food name as typed by the user
+
+        Returns:
+            The lowercased query with its misspelled words corrected
+        """
+        query = query.strip().lower()
+        typed = set(words(query))
+        if not typed:
+            return query
+        placeholders = ", ".join("?" for _ in typed)
+        known = {row[0] for row in self.connection.execute(f"SELECT word FROM words WHERE word IN ({placeholders})",
+                                                           tuple(typed))}
+        corrections = {word: self._closest_word(word) for word in typed - known if len(word) >= 3}
+        return re.sub(r"\w+", lambda match: corrections.get(match.group()) or match.group(), query)
+
+    def search(self, query: str, restrictions: Iterable[str] = (), limit: int = 10) -> List[FoodRecord]:
+        """
+        Search by prefix, then by prefix with misspelled words corrected, then fill up with fuzzy matches.
+
+        Args:
+            query: Full or partial food name
+            restrictions: Dietary restrictions the foods must satisfy
+            limit: Maximum number of results
+
+        Returns:
+            Matching records, prefix matches first
+        """
+        restrictions = list(restrictions)
+        results = self.search_prefix(query, limit, restrictions)
+        corrected = self.correct_spelling(query) if len(results) < limit else query
+        if corrected != query.strip().lower():
+            seen = {record["name"] for record in results}
+            results += [record for record in self.search_prefix(corrected, limit, restrictions)
+                        if record["name"] not in seen][:limit - len(results)]
+        if len(results) < limit:
+            seen = {record["name"] for record in results}
+            results += [record for _, record in self.search_fuzzy(corrected, limit, restrictions=restrictions)
+                        if record["name"] not in seen][:limit - len(results)]
+        return results
+
+    def lookup(self, name: str) -> Optional[FoodRecord]:
+        """
+        Resolve a food name: exact match first, then a unique prefix, then the same
+        two with misspelled words corrected, then the best fuzzy match.
+
+        When the corrected name is the start of several foods, the shortest, which
+        is the most similar to it, is taken. A name that resolves to nothing is remembered, so
+        asking again costs a set lookup until add_foods() changes the catalog.
+
+        Args:
+            name: Food name as typed by the user
+
+        Returns:
+            The matched record (its "name" is the catalog name), or None
+        """
+        key = name.strip().lower()
+        if key in self._misses:
+            return None
+
+        record = self.get(key)
+        if record:
+            return record
+
+        prefixed = self.search_prefix(key, limit=2)
+        if len(prefixed) == 1:
+            return prefixed[0]
+
+        corrected = self.correct_spelling(key)
+        if corrected != key:
+            record = self.get(corrected)
+            if record:
+                return record
+            prefixed = self.search_prefix(corrected, limit=1, shortest_first=True)
+            if prefixed:
+                return prefixed[0]
+
+        fuzzy = self.search_fuzzy(corrected, limit=1, min_similarity=LOOKUP_SIMILARITY)
+        if fuzzy:
+            return fuzzy[0][1]
+        if len(self._misses) >= MAX_CACHED_MISSES:
+            self._misses.clear()
+        self._misses.add(key)
+        return None
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM foods").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
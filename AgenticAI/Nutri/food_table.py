@@ -0,0 +1,169 @@
+import numpy as np
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Optional, Union
+
+# Column order of the nutrient matrix, shared by every batch computation.
+NUTRIENTS = ("calories", "protein", "carbs", "fat", "fiber")
+
+# Dietary restrictions a food can be tagged as suitable for. Restrictions outside
+# this list cannot be checked and are ignored when filtering.
+DIETARY_TAGS = ("vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free")
+
+
+def round_nutrients(values: np.ndarray) -> np.ndarray:
+    """
+    Round an array of nutrient values to one decimal place.
+
+    np.round scales by ten before rounding, which can turn a value that the
+    built-in round() rounds down (e.g. 0.15, stored as 0.1499...) into an exact
+    tie. Those near-tie entries are re-rounded with round() so batch results
+    agree with the per-item rounding in NutritionCoachAgent.log_meal.
+
+    Args:
+        values: Array of unrounded nutrient values
+
+    Returns:
+        A new array with every value rounded to one decimal place
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(value), 1) for value in values[near_tie]]
+    return rounded
+
+
+class FoodTable:
+    """
+    Foods x nutrients matrix with a name -> row index.
+
+    Each DIETARY_TAGS tag also gets a packed bitset over the rows, so filtering
+    the whole table by several restrictions is a bitwise AND.
+    """
+
+    def __init__(self, names: List[str], matrix: np.ndarray, categories: List[str],
+                 tags: Optional[List[Iterable[str]]] = None):
+        self.names = list(names)
+        self.index = {name: row for row, name in enumerate(self.names)}
+        self.matrix = matrix
+        self.categories = list(categories)
+        self.tags = [frozenset(food_tags) for food_tags in tags] if tags is not None else [frozenset()] * len(names)
+        self._category_rows = None
+        self._tag_bits = None
+
+    @classmethod
+    def from_database(cls, food_database: Dict[str, Dict[str, Union[float, str]]]) -> "FoodTable":
+        """
+        Build the columnar table from a food database dict.
+
+        Args:
+            food_database: Mapping of food name to its nutrient record
+
+        Returns:
+            A FoodTable with one row per food, columns ordered as NUTRIENTS
+        """
+        names = list(food_database)
+        matrix = np.array([[food_database[name][nutrient] for nutrient in NUTRIENTS] for name in names],
+                          dtype=np.float64).reshape(len(names), len(NUTRIENTS))
+        categories = [food_database[name]["category"] for name in names]
+        tags = [food_database[name].get("tags", ()) for name in names]
+        return cls(names, matrix, categories, tags)
+
+    def add(self, name: str, record: Dict[str, Union[float, str]]) -> int:
+        """
+        Append a food to the table, growing the matrix geometrically when full.
+
+        Args:
+            name: Food name
+            record: Nutrient record with NUTRIENTS keys and a category
+
+        Returns:
+            The row assigned to the food
+        """
+        name = name.lower()
+        if name in self.index:
+            return self.index[name]
+
+        row = len(self.names)
+        if row == self.matrix.shape[0]:
+            grown = np.zeros((max(16, 2 * row), len(NUTRIENTS)))
+            grown[:row] = self.matrix[:row]
+            self.matrix = grown
+        self.matrix[row] = [record[nutrient] for nutrient in NUTRIENTS]
+        self.names.append(name)
+        self.categories.append(record["category"])
+        self.tags.append(frozenset(record.get("tags", ())))
+        self.index[name] = row
+        self._category_rows = None
+        self._tag_bits = None
+        return row
+
+    def alias(self, name: str, row: int):
+        """Make another name (e.g. a fuzzy-matched spelling) resolve to an existing row."""
+        self.index[name.lower()] = row
+
+    def category_rows(self) -> Dict[str, np.ndarray]:
+        """Return the rows of each category, built once and reused until a food is added."""
+        if self._category_rows is None:
+            categories = np.asarray(self.categories, dtype=object)
+            self._category_rows = {category: np.flatnonzero(categories == category)
+                                   for category in dict.fromkeys(self.categories)}
+        return self._category_rows
+
+    def tag_bits(self) -> Dict[str, np.ndarray]:
+        """Return one packed bitset per dietary tag, built once and reused until a food is added."""
+        if self._tag_bits is None:
+            self._tag_bits = {tag: np.packbits(np.fromiter((tag in food_tags for food_tags in self.tags),
+                                                           dtype=bool, count=len(self.tags)))
+                              for tag in DIETARY_TAGS}
+        return self._tag_bits
+
+    def allowed_mask(self, restrictions: Iterable[str]) -> np.ndarray:
+        """
+        Return a boolean mask of the foods that satisfy every given restriction.
+
+        Args:
+            restrictions: Dietary restrictions such as "vegan" or "gluten-free"
+
+        Returns:
+            Boolean array with one entry per food row
+        """
+        tag_bits = self.tag_bits()
+        allowed = np.full((len(self) + 7) // 8, 0xFF, dtype=np.uint8)
+        for restriction in restrictions:
+            bits = tag_bits.get(restriction.lower())
+            if bits is not None:
+                allowed &= bits
+        return np.unpackbits(allowed, count=len(self)).astype(bool)
+
+    def violations(self, row: int, restrictions: Iterable[str]) -> List[str]:
+        """Return the checkable restrictions that the food in a row does not satisfy."""
+        return [restriction for restriction in restrictions
+                if restriction.lower() in DIETARY_TAGS and restriction.lower() not in self.tags[row]]
+
+    def row(self, food: str) -> Optional[int]:
+        """Return the matrix row for a food name, or None if it is unknown."""
+        return self.index.get(food.lower())
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, food: str) -> bool:
+        return food.lower() in self.index
+
+
+class FoodCatalog:
+    """
+    Read-only food database and its FoodTable, built once and shared by many agents.
+
+    Agents created with a catalog never write to it, so one catalog per process
+    serves every user that process handles.
+    """
+
+    def __init__(self, food_database: Dict[str, Dict[str, Union[float, str]]]):
+        self.food_database = MappingProxyType({name: MappingProxyType(dict(record))
+                                               for name, record in food_database.items()})
+        self.food_table = FoodTable.from_database(food_database)
+        self.food_table.matrix.setflags(write=False)
+        self.food_table.category_rows()
+        self.food_table.tag_bits()
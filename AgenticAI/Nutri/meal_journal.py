@@ -0,0 +1,140 @@
+import glob
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_PATTERN = "journal-*.log"
+
+
+class MealJournal:
+    """
+    Append-only write-ahead log of coach events with periodic snapshots.
+
+    Events are JSON lines appended to the current segment file and fsynced in
+    batches: after sync_every events, or on the first append once sync_interval
+    seconds have passed, and on close(). Every snapshot_every events the owner writes a compact snapshot
+    of its state (the profile, goals and per-day totals); the journal then starts a new segment and
+    deletes the old ones, so recovery reads one snapshot plus the events logged since, at most
+    snapshot_every plus the size of the last batch.
+    """
+
+    def __init__(self, directory: str, sync_every: int = 64, sync_interval: float = 1.0,
+                 snapshot_every: int = 10000):
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+
+        self.snapshot_seq = 0
+        self.last_seq = 0
+        self._segment = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def snapshot_due(self) -> bool:
+        """True once snapshot_every events have been logged since the last snapshot."""
+        return self.last_seq - self.snapshot_seq >= self.snapshot_every
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, SEGMENT_PATTERN)))
+
+    def recover(self) -> Tuple[Optional[Dict], Iterator[Dict]]:
+        """
+        Load the latest snapshot and iterate the events logged after it.
+
+        A torn last line left by a crash mid-write is skipped and cut off the
+        segment. Exhaust the returned iterator before appending, so new events
+        continue the sequence on a clean line.
+
+        Returns:
+            The snapshot state (or None) and an iterator over the later events
+        """
+        snapshot = None
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding="utf-8") as file:
+                snapshot = json.load(file)
+            self.snapshot_seq = self.last_seq = snapshot["seq"]
+        return (snapshot["state"] if snapshot else None), self._replay()
+
+    def _replay(self) -> Iterator[Dict]:
+        for path in self._segments():
+            complete = 0
+            with open(path, "rb") as file:
+                for line in file:
+                    # A line without its newline was cut short, even if what is there parses
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    complete += len(line)
+                    if event["seq"] > self.snapshot_seq:
+                        self.last_seq = event["seq"]
+                        yield event
+            if complete < os.path.getsize(path):
+                # The next append may reopen this segment; it must not continue the torn line
+                with open(path, "r+b") as file:
+                    file.truncate(complete)
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"journal-{self.last_seq + 1:012d}.log")
+        self._segment = open(path, "a", encoding="utf-8")
+
+    def append(self, event: Dict):
+        """
+        Append an event, fsyncing when the batch size or interval is reached.
+
+        Args:
+            event: JSON-serializable event; a "seq" number is added to it
+        """
+        if self._segment is None:
+            self._open_segment()
+        self.last_seq += 1
+        self._segment.write(json.dumps({"seq": self.last_seq, **event}, separators=(",", ":")) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Flush buffered events and fsync the current segment."""
+        if self._segment is None or not self._unsynced:
+            return
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def write_snapshot(self, state: Dict):
+        """
+        Atomically replace the snapshot with the given state and drop the segments it covers.
+
+        Args:
+            state: Full JSON-serializable state as of the last appended event
+        """
+        self.sync()
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"seq": self.last_seq, "state": state}, file, separators=(",", ":"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+        self.snapshot_seq = self.last_seq
+
+        # The next append starts a fresh segment after the snapshot's sequence number
+        self.close()
+        for segment in self._segments():
+            os.remove(segment)
+
+    def close(self):
+        """Sync and close the current segment."""
+        self.sync()
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
@@ -0,0 +1,89 @@
+import numpy as np
+
+from food_table import NUTRIENTS, FoodTable
+
+CALORIES = NUTRIENTS.index("calories")
+MACROS = [NUTRIENTS.index("protein"), NUTRIENTS.index("carbs"), NUTRIENTS.index("fat")]
+
+
+def candidate_rows(table: FoodTable, target: np.ndarray, allowed: np.ndarray, per_category: int = 8) -> np.ndarray:
+    """
+    Prune the catalog to the foods whose macro profile best matches the target.
+
+    Foods are ranked by cosine similarity between their protein/carbs/fat vector
+    and the target, and the best per_category foods of every category are kept,
+    so the solver sees a small but varied candidate set in O(catalog) time.
+
+    Args:
+        table: Food table to choose from
+        target: Remaining protein, carbs and fat in grams
+        allowed: Boolean mask over table rows of foods that may be suggested
+        per_category: Number of foods kept per category
+
+    Returns:
+        Row numbers of the candidate foods
+    """
+    macros = table.matrix[:len(table), MACROS]
+    norms = np.linalg.norm(macros, axis=1) * max(np.linalg.norm(target), 1e-9)
+    fit = np.divide(macros @ target, norms, out=np.full(len(table), -np.inf), where=norms > 0)
+    fit[~allowed] = -np.inf
+
+    candidates = []
+    for rows in table.category_rows().values():
+        scores = fit[rows]
+        if len(rows) > per_category:
+            best = np.argpartition(-scores, per_category)[:per_category]
+            rows, scores = rows[best], scores[best]
+        candidates.append(rows[np.isfinite(scores)])
+    return np.concatenate(candidates) if candidates else np.empty(0, dtype=np.intp)
+
+
+def solve_portions(nutrients: np.ndarray, target: np.ndarray, calorie_budget: float,
+                   step: float = 0.5, max_portion: float = 3, max_items: int = 4) -> np.ndarray:
+    """
+    Choose portions (multiples of step, at most max_portion) for a bounded knapsack.
+
+    Starting from an empty meal, repeatedly add one step of whichever food most
+    reduces the error against the target macros, until nothing improves it. The
+    error is the squared relative miss on each macro plus a penalty for going
+    over the calorie budget; at most max_items different foods are used.
+
+    Args:
+        nutrients: Candidate foods x NUTRIENTS matrix (one serving each)
+        target: Remaining protein, carbs and fat in grams
+        calorie_budget: Remaining calories
+        step: Portion increment in servings
+        max_portion: Largest portion of a single food in servings
+        max_items: Largest number of different foods
+
+    Returns:
+        Portion of each candidate food in servings
+    """
+    portions = np.zeros(len(nutrients))
+    if not len(nutrients):
+        return portions
+
+    scale = np.maximum(target, 1.0)
+    step_macros = step * nutrients[:, MACROS]
+    step_calories = step * nutrients[:, CALORIES]
+    calorie_scale = max(calorie_budget, 1.0)
+
+    def error(macros, calories):
+        over = np.maximum(calories - calorie_budget, 0) / calorie_scale
+        return (((macros - target) / scale) ** 2).sum(axis=-1) + 4 * over ** 2
+
+    macros, calories = np.zeros(len(target)), 0.0
+    current = error(macros, calories)
+    while True:
+        options = error(macros + step_macros, calories + step_calories)
+        options[portions >= max_portion] = np.inf
+        if np.count_nonzero(portions) >= max_items:
+            options[portions == 0] = np.inf
+
+        best = int(np.argmin(options))
+        if options[best] >= current:
+            return portions
+        portions[best] += step
+        macros += step_macros[best]
+        calories += step_calories[best]
+        current = options[best]
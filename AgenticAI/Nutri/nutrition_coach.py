@@ -2,39 +2,164 @@ import random
 import datetime
 from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
+
+from food_store import FoodStore
+from food_table import NUTRIENTS, FoodCatalog, FoodTable, round_nutrients
+from meal_journal import MealJournal
+from meal_planner import candidate_rows, solve_portions
+from progress import DailyProgress, TotalsHistory
+
 
 class NutritionCoachAgent:
-    def __init__(self):
+    def __init__(self, food_store: Optional[FoodStore] = None, catalog: Optional[FoodCatalog] = None,
+                 journal: Optional[MealJournal] = None):
+        if food_store is not None and catalog is not None:
+            raise ValueError("Pass either a food store or a shared catalog, not both")
+
         self.user_profile = {}
-        self.food_database = self._initialize_food_database()
+        # With a store, foods are fetched on first use instead of loaded up front
+        self.food_store = food_store
+        if catalog is not None:
+            self.food_database = catalog.food_database
+            self.food_table = catalog.food_table
+        else:
+            self.food_database = self._initialize_food_database() if food_store is None else {}
+            self.food_table = FoodTable.from_database(self.food_database)
         self.conversation_history = []
         self.daily_logs = {}
+        self.daily_progress = {}
+        self.history = TotalsHistory()
         self.goals = {}
+        self._goals_version = 0
 
-    def _initialize_food_database(self) -> Dict[str, Dict[str, Union[float, str]]]:
+        # Restore state from the latest snapshot plus the journal tail
+        self.journal = journal
+        if journal is not None:
+            self._restore(journal)
+
+    def _initialize_food_database(self) -> Dict[str, Dict[str, Union[float, str, List[str]]]]:
         """Initialize a simple food database with nutritional information."""
         return {
-            "apple": {"calories": 95, "protein": 0.5, "carbs": 25, "fat": 0.3, "fiber": 4, "category": "fruit"},
-            "banana": {"calories": 105, "protein": 1.3, "carbs": 27, "fat": 0.4, "fiber": 3.1, "category": "fruit"},
-            "chicken breast": {"calories": 165, "protein": 31, "carbs": 0, "fat": 3.6, "fiber": 0,
-                               "category": "protein"},
-            "salmon": {"calories": 206, "protein": 22, "carbs": 0, "fat": 13, "fiber": 0, "category": "protein"},
-            "brown rice": {"calories": 216, "protein": 5, "carbs": 45, "fat": 1.8, "fiber": 3.5, "category": "grain"},
-            "quinoa": {"calories": 222, "protein": 8, "carbs": 39, "fat": 3.6, "fiber": 5, "category": "grain"},
-            "spinach": {"calories": 23, "protein": 2.9, "carbs": 3.6, "fat": 0.4, "fiber": 2.2,
-                        "category": "vegetable"},
-            "broccoli": {"calories": 55, "protein": 3.7, "carbs": 11, "fat": 0.6, "fiber": 5.1,
-                         "category": "vegetable"},
-            "olive oil": {"calories": 119, "protein": 0, "carbs": 0, "fat": 13.5, "fiber": 0, "category": "fat"},
-            "avocado": {"calories": 240, "protein": 3, "carbs": 12, "fat": 22, "fiber": 10, "category": "fat"},
-            "greek yogurt": {"calories": 130, "protein": 12, "carbs": 5, "fat": 4, "fiber": 0, "category": "dairy"},
-            "almonds": {"calories": 164, "protein": 6, "carbs": 6, "fat": 14, "fiber": 3.5, "category": "nuts"},
-            "lentils": {"calories": 230, "protein": 18, "carbs": 40, "fat": 0.8, "fiber": 16, "category": "legume"},
-            "oats": {"calories": 307, "protein": 11, "carbs": 55, "fat": 5, "fiber": 8, "category": "grain"},
-            "sweet potato": {"calories": 112, "protein": 2, "carbs": 26, "fat": 0.1, "fiber": 3.8,
-                             "category": "vegetable"},
+            "apple": {"calories": 95, "protein": 0.5, "carbs": 25, "fat": 0.3, "fiber": 4, "category": "fruit",
+                      "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "banana": {"calories": 105, "protein": 1.3, "carbs": 27, "fat": 0.4, "fiber": 3.1, "category": "fruit",
+                       "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "chicken breast": {"calories": 165, "protein": 31, "carbs": 0, "fat": 3.6, "fiber": 0, "category": "protein",
+                               "tags": ["gluten-free", "dairy-free", "nut-free"]},
+            "salmon": {"calories": 206, "protein": 22, "carbs": 0, "fat": 13, "fiber": 0, "category": "protein",
+                       "tags": ["gluten-free", "dairy-free", "nut-free"]},
+            "brown rice": {"calories": 216, "protein": 5, "carbs": 45, "fat": 1.8, "fiber": 3.5, "category": "grain",
+                           "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "quinoa": {"calories": 222, "protein": 8, "carbs": 39, "fat": 3.6, "fiber": 5, "category": "grain",
+                       "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "spinach": {"calories": 23, "protein": 2.9, "carbs": 3.6, "fat": 0.4, "fiber": 2.2, "category": "vegetable",
+                        "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "broccoli": {"calories": 55, "protein": 3.7, "carbs": 11, "fat": 0.6, "fiber": 5.1, "category": "vegetable",
+                         "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "olive oil": {"calories": 119, "protein": 0, "carbs": 0, "fat": 13.5, "fiber": 0, "category": "fat",
+                          "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "avocado": {"calories": 240, "protein": 3, "carbs": 12, "fat": 22, "fiber": 10, "category": "fat",
+                        "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "greek yogurt": {"calories": 130, "protein": 12, "carbs": 5, "fat": 4, "fiber": 0, "category": "dairy",
+                             "tags": ["vegetarian", "gluten-free", "nut-free"]},
+            "almonds": {"calories": 164, "protein": 6, "carbs": 6, "fat": 14, "fiber": 3.5, "category": "nuts",
+                        "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free"]},
+            "lentils": {"calories": 230, "protein": 18, "carbs": 40, "fat": 0.8, "fiber": 16, "category": "legume",
+                        "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
+            "oats": {"calories": 307, "protein": 11, "carbs": 55, "fat": 5, "fiber": 8, "category": "grain",
+                     "tags": ["vegan", "vegetarian", "dairy-free", "nut-free"]},
+            "sweet potato": {"calories": 112, "protein": 2, "carbs": 26, "fat": 0.1, "fiber": 3.8, "category": "vegetable",
+                             "tags": ["vegan", "vegetarian", "gluten-free", "dairy-free", "nut-free"]},
         }
 
+    def _lookup_food(self, food: str) -> Optional[Dict[str, Union[float, str]]]:
+        """Return the nutrient record for a food, fetching it from the food store on a miss."""
+        food_lower = food.lower()
+        if food_lower in self.food_database:
+            return self.food_database[food_lower]
+
+        if self.food_store is None:
+            return None
+
+        record = self.food_store.lookup(food_lower)
+        if record is not None:
+            self.food_database[food_lower] = record
+        return record
+
+    def _food_row(self, food: str) -> Optional[int]:
+        """Return the food table row for a food, adding it from the food store on a miss."""
+        row = self.food_table.row(food)
+        if row is not None or self.food_store is None:
+            return row
+
+        record = self._lookup_food(food)
+        if record is None:
+            return None
+        row = self.food_table.add(record.get("name", food), record)
+        self.food_table.alias(food, row)
+        return row
+
+    def _day_progress(self, date: str) -> DailyProgress:
+        """Return the running progress for a day, creating its log entry if needed."""
+        if date not in self.daily_logs:
+            self.daily_logs[date] = {"meals": {},
+                                     "totals": {"calories": 0, "protein": 0, "carbs": 0, "fat": 0, "fiber": 0}}
+
+        progress = self.daily_progress.get(date)
+        if progress is None or progress.totals is not self.daily_logs[date]["totals"]:
+            progress = DailyProgress(self.daily_logs[date]["totals"])
+            self.daily_progress[date] = progress
+            self.history.track(date, progress.totals)
+        return progress
+
+    def _restore(self, journal: MealJournal):
+        """Load the journal's snapshot and replay the events logged after it."""
+        state, events = journal.recover()
+        if state is not None:
+            self.user_profile = state["user_profile"]
+            self.goals = state["goals"]
+            # Snapshots keep per-day totals only; meal entries logged before the snapshot are not restored
+            self.daily_logs = {date: {"meals": {}, "totals": totals} for date, totals in state["days"].items()}
+            for date in self.daily_logs:
+                self._day_progress(date)
+
+        for event in events:
+            if event["type"] == "meal":
+                self._apply_meal(event["date"], event["meal_type"], event["meal"])
+            else:
+                self.user_profile = event["user_profile"]
+                self.goals = event["goals"]
+        self._goals_version += 1
+
+    def _apply_meal(self, date: str, meal_type: str, meal_nutrients: Dict):
+        """Add an already computed meal to the daily log, e.g. when replaying the journal."""
+        progress = self._day_progress(date)
+        self.daily_logs[date]["meals"].setdefault(meal_type, []).append(meal_nutrients)
+        for item in meal_nutrients["items"].values():
+            progress.add(item)
+        self.history.touch(date)
+
+    def _journal_events(self, events: List[Dict]):
+        """
+        Append events to the journal, then snapshot the state if one is due.
+
+        The in-memory state already includes every event passed in, so the
+        snapshot is only taken once all of them are logged; otherwise it would
+        be tagged with an earlier sequence number and replay would apply the
+        later events twice.
+        """
+        if self.journal is None:
+            return
+        for event in events:
+            self.journal.append(event)
+        if self.journal.snapshot_due:
+            self.journal.write_snapshot({"user_profile": self.user_profile, "goals": self.goals,
+                                         "days": {date: log["totals"] for date, log in self.daily_logs.items()}})
+
+    def _journal_state(self):
+        self._journal_events([{"type": "state", "user_profile": self.user_profile, "goals": self.goals}])
+
     def setup_user_profile(self, name: str, age: int, weight: float, height: float,
                            gender: str, activity_level: str, dietary_restrictions: List[str] = None) -> str:
         """
@@ -83,6 +208,7 @@ class NutritionCoachAgent:
 
         daily_calories = bmr * activity_multipliers.get(activity_level.lower(), 1.2)
         self.user_profile["daily_calorie_needs"] = round(daily_calories)
+        self._journal_state()
 
         return f"Welcome {name}! Based on your profile, your estimated daily calorie needs are {round(daily_calories)} calories. Your BMI is {round(bmi, 1)}."
 
@@ -104,6 +230,7 @@ class NutritionCoachAgent:
             return "Please set up your profile first."
 
         self.goals = {}
+        self._goals_version += 1
 
         if weight_goal:
             self.goals["weight_goal"] = weight_goal
@@ -156,6 +283,7 @@ class NutritionCoachAgent:
         self.goals["protein_grams"] = round(protein_cals / 4)
         self.goals["carb_grams"] = round(carb_cals / 4)
         self.goals["fat_grams"] = round(fat_cals / 9)
+        self._journal_state()
 
         response = f"Goals set successfully!\n"
 
@@ -188,22 +316,20 @@ class NutritionCoachAgent:
             return "Please set up your profile first."
 
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-
-        if today not in self.daily_logs:
-            self.daily_logs[today] = {"meals": {},
-                                      "totals": {"calories": 0, "protein": 0, "carbs": 0, "fat": 0, "fiber": 0}}
+        progress = self._day_progress(today)
 
         if meal_type not in self.daily_logs[today]["meals"]:
             self.daily_logs[today]["meals"][meal_type] = []
 
         meal_nutrients = {"items": {}, "totals": {"calories": 0, "protein": 0, "carbs": 0, "fat": 0, "fiber": 0}}
         unknown_foods = []
+        restriction_warnings = []
+        restrictions = self.user_profile["dietary_restrictions"]
 
         for food, portion in foods.items():
-            food_lower = food.lower()
+            food_data = self._lookup_food(food)
 
-            if food_lower in self.food_database:
-                food_data = self.food_database[food_lower]
+            if food_data is not None:
                 meal_nutrients["items"][food] = {
                     "portion": portion,
                     "calories": round(food_data["calories"] * portion, 1),
@@ -217,8 +343,12 @@ class NutritionCoachAgent:
                 # Update meal totals
                 for nutrient in ["calories", "protein", "carbs", "fat", "fiber"]:
                     meal_nutrients["totals"][nutrient] += meal_nutrients["items"][food][nutrient]
-                    # Update daily totals
-                    self.daily_logs[today]["totals"][nutrient] += meal_nutrients["items"][food][nutrient]
+                # Update daily totals and progress
+                progress.add(meal_nutrients["items"][food])
+
+                violated = self.food_table.violations(self._food_row(food), restrictions)
+                if violated:
+                    restriction_warnings.append(f"{food} ({', '.join(violated)})")
             else:
                 unknown_foods.append(food)
 
@@ -228,6 +358,8 @@ class NutritionCoachAgent:
 
         # Add meal to daily log
         self.daily_logs[today]["meals"][meal_type].append(meal_nutrients)
+        self.history.touch(today)
+        self._journal_events([{"type": "meal", "date": today, "meal_type": meal_type, "meal": meal_nutrients}])
 
         # Prepare response
         response = f"{meal_type.capitalize()} logged successfully!\n\n"
@@ -240,28 +372,178 @@ class NutritionCoachAgent:
 
         # Add daily progress if goals exist
         if self.goals:
-            calories_remaining = self.goals["daily_calories"] - self.daily_logs[today]["totals"]["calories"]
             response += f"\nDaily progress:\n"
-            response += f"- Calories: {self.daily_logs[today]['totals']['calories']} / {self.goals['daily_calories']} ({calories_remaining} remaining)\n"
-
-            if "protein_grams" in self.goals:
-                protein_progress = round(
-                    (self.daily_logs[today]["totals"]["protein"] / self.goals["protein_grams"]) * 100)
-                response += f"- Protein: {self.daily_logs[today]['totals']['protein']}g / {self.goals['protein_grams']}g ({protein_progress}%)\n"
-
-            if "carb_grams" in self.goals:
-                carb_progress = round((self.daily_logs[today]["totals"]["carbs"] / self.goals["carb_grams"]) * 100)
-                response += f"- Carbs: {self.daily_logs[today]['totals']['carbs']}g / {self.goals['carb_grams']}g ({carb_progress}%)\n"
-
-            if "fat_grams" in self.goals:
-                fat_progress = round((self.daily_logs[today]["totals"]["fat"] / self.goals["fat_grams"]) * 100)
-                response += f"- Fat: {self.daily_logs[today]['totals']['fat']}g / {self.goals['fat_grams']}g ({fat_progress}%)"
+            response += "\n".join(progress.progress_lines(self.goals, self._goals_version))
 
         if unknown_foods:
             response += f"\n\nNote: The following foods were not found in the database: {', '.join(unknown_foods)}"
 
+        if restriction_warnings:
+            response += f"\n\nWarning: The following foods do not fit your dietary restrictions: {', '.join(restriction_warnings)}"
+
         return response
 
+    def log_meals(self, batch: List[Tuple]) -> Union[List[Dict], str]:
+        """
+        Log a batch of meals in one pass over the columnar food table.
+
+        Item nutrients for the whole batch come from a single gather-and-multiply
+        against the food matrix, rounded exactly like log_meal rounds each item.
+        Meal and daily totals are then accumulated in item order with np.add.at,
+        so they add up the same rounded values in the same order as log_meal.
+
+        Args:
+            batch: Sequence of (meal_type, foods) or (meal_type, foods, date) tuples,
+                where foods maps food names to portion sizes and date is YYYY-MM-DD
+                (defaults to today)
+
+        Returns:
+            One dict per logged meal with its date, meal type, stored meal entry, any
+            foods that were not found in the database and, as "food (restrictions)" like
+            log_meal's warning, any foods that do not fit the profile's dietary restrictions
+        """
+        if not self.user_profile:
+            return "Please set up your profile first."
+
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+
+        rows, portions, item_meals, item_names = [], [], [], []
+        meal_dates, unknown_foods = [], []
+        for meal_number, entry in enumerate(batch):
+            meal_type, foods = entry[0], entry[1]
+            meal_dates.append(entry[2] if len(entry) > 2 and entry[2] else today)
+            unknown_foods.append([])
+            for food, portion in foods.items():
+                row = self._food_row(food)
+                if row is None:
+                    unknown_foods[meal_number].append(food)
+                    continue
+                rows.append(row)
+                portions.append(portion)
+                item_meals.append(meal_number)
+                item_names.append(food)
+
+        dates = list(dict.fromkeys(meal_dates))
+        for date in dates:
+            self._day_progress(date)
+
+        item_meals = np.asarray(item_meals, dtype=np.intp)
+        item_rows = np.asarray(rows, dtype=np.intp)
+        items = round_nutrients(np.asarray(portions, dtype=np.float64)[:, None] * self.food_table.matrix[item_rows])
+
+        meal_totals = np.zeros((len(batch), len(NUTRIENTS)))
+        np.add.at(meal_totals, item_meals, items)
+        meal_totals = round_nutrients(meal_totals)
+
+        restrictions = self.user_profile["dietary_restrictions"]
+        allowed = self.food_table.allowed_mask(restrictions)
+        item_allowed = allowed[item_rows]
+
+        date_index = {date: position for position, date in enumerate(dates)}
+        day_totals = np.array([[self.daily_logs[date]["totals"][nutrient] for nutrient in NUTRIENTS]
+                               for date in dates], dtype=np.float64).reshape(len(dates), len(NUTRIENTS))
+        meal_days = np.asarray([date_index[date] for date in meal_dates], dtype=np.intp)
+        np.add.at(day_totals, meal_days[item_meals], items)
+
+        results = []
+        item_values = items.tolist()
+        item_number = 0
+        for meal_number, entry in enumerate(batch):
+            meal_type, date = entry[0], meal_dates[meal_number]
+            meal_nutrients = {"items": {}, "totals": dict(zip(NUTRIENTS, meal_totals[meal_number].tolist()))}
+            restriction_warnings = []
+            while item_number < len(item_names) and item_meals[item_number] == meal_number:
+                food = item_names[item_number]
+                meal_nutrients["items"][food] = {"portion": portions[item_number],
+                                                 **dict(zip(NUTRIENTS, item_values[item_number])),
+                                                 "category": self.food_table.categories[rows[item_number]]}
+                if not item_allowed[item_number]:
+                    violated = self.food_table.violations(rows[item_number], restrictions)
+                    restriction_warnings.append(f"{food} ({', '.join(violated)})")
+                item_number += 1
+
+            self.daily_logs[date]["meals"].setdefault(meal_type, []).append(meal_nutrients)
+            results.append({"date": date, "meal_type": meal_type, "meal": meal_nutrients,
+                            "unknown_foods": unknown_foods[meal_number],
+                            "restriction_warnings": restriction_warnings})
+
+        for date, totals in zip(dates, day_totals.tolist()):
+            self.daily_progress[date].update(dict(zip(NUTRIENTS, totals)))
+            self.history.touch(date)
+
+        self._journal_events([{"type": "meal", "date": result["date"], "meal_type": result["meal_type"],
+                               "meal": result["meal"]} for result in results])
+
+        return results
+
+    def search_foods(self, query: str, restrictions: Optional[List[str]] = None, limit: int = 10) -> List[str]:
+        """
+        Search the food database by name.
+
+        Args:
+            query: Full or partial food name
+            restrictions: Dietary restrictions results must satisfy; defaults to the profile's
+            limit: Maximum number of results
+
+        Returns:
+            Matching food names, names starting with the query first
+        """
+        if restrictions is None:
+            restrictions = self.user_profile.get("dietary_restrictions", [])
+        if self.food_store is not None:
+            return [record["name"] for record in self.food_store.search(query, restrictions, limit)]
+
+        query = query.strip().lower()
+        allowed = self.food_table.allowed_mask(restrictions)
+        matches = [name for row, name in enumerate(self.food_table.names) if allowed[row] and query in name]
+        matches.sort(key=lambda name: (not name.startswith(query), name))
+        return matches[:limit]
+
+    def suggest_meal(self, remaining_budget: Optional[Dict[str, float]] = None,
+                     restrictions: Optional[List[str]] = None) -> Union[Dict[str, Dict[str, float]], str]:
+        """
+        Suggest foods and portions that fill the remaining calorie and macro budget.
+        With a food store, only the foods already loaded into the food table are considered.
+
+        Args:
+            remaining_budget: Remaining "calories", "protein", "carbs" and "fat" (grams);
+                defaults to today's goals minus what has been logged
+            restrictions: Dietary restrictions to respect; defaults to the profile's
+
+        Returns:
+            Dict with "foods" (food name -> portion in servings, ready for log_meal)
+            and "totals" (nutrients of the suggested meal)
+        """
+        if remaining_budget is None:
+            if not self.goals:
+                return "Please set your goals first."
+            # A plain lookup: suggesting a meal must not create an empty log for today
+            today_log = self.daily_logs.get(datetime.datetime.now().strftime("%Y-%m-%d"))
+            totals = today_log["totals"] if today_log else dict.fromkeys(NUTRIENTS, 0)
+            remaining_budget = {
+                "calories": self.goals["daily_calories"] - totals["calories"],
+                "protein": self.goals["protein_grams"] - totals["protein"],
+                "carbs": self.goals["carb_grams"] - totals["carbs"],
+                "fat": self.goals["fat_grams"] - totals["fat"],
+            }
+        if restrictions is None:
+            restrictions = self.user_profile.get("dietary_restrictions", [])
+
+        target = np.maximum([remaining_budget.get("protein", 0), remaining_budget.get("carbs", 0),
+                             remaining_budget.get("fat", 0)], 0).astype(np.float64)
+        calorie_budget = max(remaining_budget.get("calories", 0), 0)
+        if not target.any() or not calorie_budget:
+            return {"foods": {}, "totals": {nutrient: 0 for nutrient in NUTRIENTS}}
+
+        rows = candidate_rows(self.food_table, target, self.food_table.allowed_mask(restrictions))
+        nutrients = self.food_table.matrix[rows]
+        portions = solve_portions(nutrients, target, calorie_budget)
+
+        chosen = np.flatnonzero(portions)
+        totals = round_nutrients(portions[chosen] @ nutrients[chosen]) if len(chosen) else np.zeros(len(NUTRIENTS))
+        return {"foods": {self.food_table.names[rows[i]]: float(portions[i]) for i in chosen},
+                "totals": dict(zip(NUTRIENTS, totals.tolist()))}
+
     def get_daily_summary(self, date: Optional[str] = None) -> str:
         """
         Get a summary of nutrition for a specific day.
@@ -288,19 +570,39 @@ class NutritionCoachAgent:
 
         if self.goals:
             response += "\nDaily progress:\n"
-            calories_remaining = self.goals["daily_calories"] - daily_totals["calories"]
-            response += f"- Calories: {daily_totals['calories']} / {self.goals['daily_calories']} ({calories_remaining} remaining)\n"
+            for line in self._day_progress(date).progress_lines(self.goals, self._goals_version):
+                response += f"{line}\n"
+
+        return response
 
-            if "protein_grams" in self.goals:
-                protein_progress = round((daily_totals["protein"] / self.goals["protein_grams"]) * 100)
-                response += f"- Protein: {daily_totals['protein']}g / {self.goals['protein_grams']}g ({protein_progress}%)\n"
+    def get_weekly_summary(self, end_date: Optional[str] = None) -> str:
+        """
+        Get average daily nutrition over the seven days ending on a given date.
+
+        Args:
+            end_date: Last day of the week in format YYYY-MM-DD (defaults to today)
 
-            if "carb_grams" in self.goals:
-                carb_progress = round((daily_totals["carbs"] / self.goals["carb_grams"]) * 100)
-                response += f"- Carbs: {daily_totals['carbs']}g / {self.goals['carb_grams']}g ({carb_progress}%)\n"
+        Returns:
+            Summary of the week's average daily nutrition
+        """
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.datetime.now()
+        start_date = (end - datetime.timedelta(days=6)).strftime("%Y-%m-%d")
+        end_date = end.strftime("%Y-%m-%d")
+
+        days, totals = self.history.range_totals(start_date, end_date)
+        if not days:
+            return f"No meal data found between {start_date} and {end_date}."
+
+        averages = {nutrient: round(total / days, 1) for nutrient, total in totals.items()}
+        response = f"Weekly Summary for {start_date} to {end_date} ({days} days logged):\n"
+        response += f"- Average calories: {averages['calories']}\n"
+        response += f"- Average protein: {averages['protein']}g\n"
+        response += f"- Average carbs: {averages['carbs']}g\n"
+        response += f"- Average fat: {averages['fat']}g\n"
+        response += f"- Average fiber: {averages['fiber']}g\n"
 
-            if "fat_grams" in self.goals:
-                fat_progress = round((daily_totals["fat"] / self.goals["fat_grams"]) * 100)
-                response += f"- Fat: {daily_totals['fat']}g / {self.goals['fat_grams']}g ({fat_progress}%)\n"
+        if self.goals:
+            calories_difference = round(averages["calories"] - self.goals["daily_calories"], 1)
+            response += f"\nAverage vs. daily calorie target: {calories_difference:+} calories\n"
 
         return response
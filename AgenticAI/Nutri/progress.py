@@ -0,0 +1,135 @@
+import bisect
+from typing import Dict, List, Tuple, Union
+
+from food_table import NUTRIENTS
+
+# Goal key holding the gram target for each macro shown in the progress report
+MACRO_GOALS = (("protein", "protein_grams", "Protein"),
+               ("carbs", "carb_grams", "Carbs"),
+               ("fat", "fat_grams", "Fat"))
+
+
+class DailyProgress:
+    """
+    Running nutrient totals for one day and the goal progress derived from them.
+
+    The totals dict is the same object stored in daily_logs, so adding an item
+    updates both. Remaining calories, macro percentages and the rendered report
+    lines are refreshed in place on every change, and recomputed against new
+    goals only when the goals version they were computed for goes stale.
+    """
+
+    def __init__(self, totals: Dict[str, float]):
+        self.totals = totals
+        self.calories_remaining = None
+        self.percentages = {}
+        self._goals = {}
+        self._goals_version = None
+        self._lines = None
+
+    def add(self, nutrients: Dict[str, Union[float, str]]):
+        """Add one food item's nutrients to the running totals."""
+        for nutrient in NUTRIENTS:
+            self.totals[nutrient] += nutrients[nutrient]
+        self._refresh()
+
+    def update(self, totals: Dict[str, float]):
+        """Replace the running totals, e.g. after a batch has been applied."""
+        self.totals.update(totals)
+        self._refresh()
+
+    def progress_lines(self, goals: Dict, goals_version: int) -> List[str]:
+        """
+        Return the "Daily progress" report lines for the given goals.
+
+        Args:
+            goals: The agent's current goals
+            goals_version: Counter bumped by every set_goals call
+
+        Returns:
+            One line per tracked goal, without trailing newlines
+        """
+        if goals_version != self._goals_version:
+            self._goals = goals
+            self._goals_version = goals_version
+            self._refresh()
+        if self._lines is None:
+            self._lines = self._render()
+        return self._lines
+
+    def _refresh(self):
+        self._lines = None
+        if not self._goals:
+            return
+
+        self.calories_remaining = self._goals["daily_calories"] - self.totals["calories"]
+        for nutrient, goal_key, _ in MACRO_GOALS:
+            if goal_key in self._goals:
+                self.percentages[nutrient] = round((self.totals[nutrient] / self._goals[goal_key]) * 100)
+
+    def _render(self) -> List[str]:
+        if not self._goals:
+            return []
+
+        lines = [f"- Calories: {self.totals['calories']} / {self._goals['daily_calories']} "
+                 f"({self.calories_remaining} remaining)"]
+        for nutrient, goal_key, label in MACRO_GOALS:
+            if goal_key in self._goals:
+                lines.append(f"- {label}: {self.totals[nutrient]}g / {self._goals[goal_key]}g "
+                             f"({self.percentages[nutrient]}%)")
+        return lines
+
+
+class TotalsHistory:
+    """
+    Per-day totals kept in date order with lazily maintained prefix sums.
+
+    Logging usually touches the latest day, which only invalidates the last
+    prefix entry, so range queries cost two bisects and a subtraction instead
+    of a scan over daily_logs.
+    """
+
+    def __init__(self):
+        self.dates = []
+        self.totals = []
+        # _prefix[i] holds the summed totals of days [0, i); entries past _valid are stale
+        self._prefix = [[0.0] * len(NUTRIENTS)]
+        self._valid = 1
+
+    def track(self, date: str, totals: Dict[str, float]):
+        """Start tracking a day's totals dict (dates are YYYY-MM-DD, so they sort chronologically)."""
+        position = bisect.bisect_left(self.dates, date)
+        if position < len(self.dates) and self.dates[position] == date:
+            self.totals[position] = totals
+        else:
+            self.dates.insert(position, date)
+            self.totals.insert(position, totals)
+            self._prefix.append(None)
+        self._valid = min(self._valid, position + 1)
+
+    def touch(self, date: str):
+        """Mark a tracked day's totals as changed."""
+        position = bisect.bisect_left(self.dates, date)
+        self._valid = min(self._valid, position + 1)
+
+    def _prefix_at(self, index: int) -> List[float]:
+        while self._valid <= index:
+            previous = self._prefix[self._valid - 1]
+            day = self.totals[self._valid - 1]
+            self._prefix[self._valid] = [total + day[nutrient] for total, nutrient in zip(previous, NUTRIENTS)]
+            self._valid += 1
+        return self._prefix[index]
+
+    def range_totals(self, start_date: str, end_date: str) -> Tuple[int, Dict[str, float]]:
+        """
+        Sum the totals of every logged day in [start_date, end_date].
+
+        Returns:
+            The number of logged days in the range and their summed totals
+        """
+        start = bisect.bisect_left(self.dates, start_date)
+        end = bisect.bisect_right(self.dates, end_date)
+        if end <= start:
+            return 0, {nutrient: 0 for nutrient in NUTRIENTS}
+        upper, lower = self._prefix_at(end), self._prefix_at(start)
+        return end - start, {nutrient: high - low for nutrient, high, low in zip(NUTRIENTS, upper, lower)}
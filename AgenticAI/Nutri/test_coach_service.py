@@ -0,0 +1,97 @@
+# Tests for the multi-process coach service: replies, errors and worker crashes
+#
+# Dependencies:
+# pip install pytest numpy
+
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+
+from coach_service import CoachService
+from nutrition_coach import NutritionCoachAgent
+
+PROFILE = dict(name="Ada", age=30, weight=70, height=175, gender="female", activity_level="moderate")
+MEAL = ("breakfast", {"oats": 1.5, "banana": 1, "almonds": 0.5})
+
+# The failure tests patch the agent in this process; forked workers inherit the patch
+needs_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="workers must be forked to inherit the patched agent")
+
+
+class NeedsTwoArguments(Exception):
+    """Pickles, but cannot be rebuilt on the other side: unpickling calls it with one argument."""
+
+    def __init__(self, code, detail):
+        super().__init__(f"{code}: {detail}")
+
+
+def _run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=30))
+
+
+def test_round_trip_matches_a_local_agent():
+    local = NutritionCoachAgent()
+    expected = [local.setup_user_profile(**PROFILE), local.set_goals(weight_goal=68), local.log_meal(*MEAL),
+                local.get_daily_summary(), NutritionCoachAgent().get_daily_summary()]
+
+    async def scenario():
+        async with CoachService(workers=2) as service:
+            replies = [await service.setup_user_profile("ada", **PROFILE),
+                       await service.set_goals("ada", weight_goal=68),
+                       await service.log_meal("ada", *MEAL),
+                       await service.get_daily_summary("ada")]
+            # Another user on the other worker has state of their own
+            other = "grace" if service.shard_for("grace") != service.shard_for("ada") else "linus"
+            replies.append(await service.get_daily_summary(other))
+            with pytest.raises(TypeError):
+                await service.call("ada", "log_meal", "lunch", {"oats": 1}, "extra", "arguments")
+            with pytest.raises(ValueError):
+                await service.call("ada", "delete_everything")
+            return replies
+
+    assert _run(scenario()) == expected
+
+
+@needs_fork
+def test_unpicklable_errors_and_results_come_back_as_text(monkeypatch):
+    def fail(self, date=None):
+        raise NeedsTwoArguments(404, f"nothing logged on {date}")
+
+    monkeypatch.setattr(NutritionCoachAgent, "get_daily_summary", fail)
+    monkeypatch.setattr(NutritionCoachAgent, "get_weekly_summary", lambda self, end_date=None: lambda: "not picklable")
+
+    async def scenario():
+        async with CoachService(workers=1) as service:
+            with pytest.raises(RuntimeError, match="NeedsTwoArguments: 404: nothing logged on 2024-01-01"):
+                await service.get_daily_summary("ada", "2024-01-01")
+            with pytest.raises(RuntimeError, match="unpicklable function result"):
+                await service.call("ada", "get_weekly_summary")
+            # The worker is still serving
+            return await service.setup_user_profile("ada", **PROFILE)
+
+    assert _run(scenario()).startswith("Welcome Ada!")
+
+
+@needs_fork
+def test_worker_crash_fails_its_calls_instead_of_hanging(monkeypatch):
+    monkeypatch.setattr(NutritionCoachAgent, "get_weekly_summary", lambda self, end_date=None: os._exit(3))
+
+    async def scenario():
+        async with CoachService(workers=2) as service:
+            crashed, survivor = "ada", next(user for user in ("grace", "linus", "alan", "edsger")
+                                           if service.shard_for(user) != service.shard_for("ada"))
+            await service.setup_user_profile(crashed, **PROFILE)
+            crash = asyncio.ensure_future(service.call(crashed, "get_weekly_summary"))
+            behind = asyncio.ensure_future(service.get_daily_summary(crashed))
+            with pytest.raises(RuntimeError, match="exited with code 3"):
+                await crash
+            # A call queued behind the crash fails too, and so do later calls for the same worker
+            with pytest.raises(RuntimeError, match="exited with code 3"):
+                await behind
+            with pytest.raises(RuntimeError, match="exited with code 3"):
+                await service.get_daily_summary(crashed)
+            return await service.setup_user_profile(survivor, **PROFILE)
+
+    assert _run(scenario()).startswith("Welcome Ada!")
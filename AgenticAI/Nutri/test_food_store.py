@@ -0,0 +1,121 @@
+# Tests for the SQLite food store: exact, prefix, fuzzy and tag-filtered search
+#
+# Dependencies:
+# pip install pytest numpy
+
+import pytest
+
+import food_store
+from food_store import FoodStore
+from nutrition_coach import NutritionCoachAgent
+
+EXTRA_FOODS = {
+    "roasted chicken with salt": {"calories": 190, "protein": 29, "tags": "gluten-free;dairy-free"},
+    "roasted chicken with salt and pepper": {"calories": 191, "protein": 29, "tags": "gluten-free"},
+    "roasted chickpeas": {"calories": 130, "protein": 7, "tags": "vegan;vegetarian"},
+    "chicken burrito": {"calories": 430, "protein": 22, "tags": ""},
+}
+
+
+@pytest.fixture
+def store():
+    store = FoodStore()
+    store.add_foods(NutritionCoachAgent().food_database.items())
+    store.add_foods(EXTRA_FOODS.items())
+    yield store
+    store.close()
+
+
+def _names(records):
+    return [record["name"] for record in records]
+
+
+def test_exact_lookup_is_case_insensitive(store):
+    assert len(store) == 19
+    record = store.get("  Chicken Breast ")
+    assert record["name"] == "chicken breast" and record["calories"] == 165
+    assert record["tags"] == ["gluten-free", "dairy-free", "nut-free"]
+    assert store.get("chicken") is None
+
+    # Re-adding a name replaces its values instead of adding a second food
+    store.add_foods([("CHICKEN BREAST", {"calories": 170, "protein": 32})])
+    assert store.get("chicken breast")["calories"] == 170 and len(store) == 19
+
+
+def test_prefix_search_in_name_or_length_order(store):
+    assert _names(store.search_prefix("roasted chick")) == [
+        "roasted chicken with salt", "roasted chicken with salt and pepper", "roasted chickpeas"]
+    assert _names(store.search_prefix("roasted chick", shortest_first=True, limit=1)) == ["roasted chickpeas"]
+    assert _names(store.search_prefix("roasted chick", restrictions=["Vegan"])) == ["roasted chickpeas"]
+    # Restrictions no food is tagged for cannot be checked and are ignored
+    assert len(store.search_prefix("roasted chick", restrictions=["low-sodium"])) == 3
+    assert store.search_prefix("  ") == []
+
+
+def test_fuzzy_search_ranks_by_trigram_similarity(store):
+    matches = store.search_fuzzy("chiken brest")
+    assert matches[0][1]["name"] == "chicken breast"
+    assert [score for score, _ in matches] == sorted((score for score, _ in matches), reverse=True)
+    assert store.search_fuzzy("chiken brest", min_similarity=0.5) == []
+
+    # A restriction filters the candidates before they are scored
+    assert _names(record for _, record in store.search_fuzzy("rosted chicken", restrictions=["vegan"])) == [
+        "roasted chickpeas"]
+
+
+def test_fuzzy_search_probes_rare_trigrams_within_the_postings_budget(store, monkeypatch):
+    # Thousands of names share the common trigrams of "brand"; only "kohlrabi"'s own are rare
+    store.add_foods((f"brand {i} kale", {"calories": 50}) for i in range(2000))
+    store.add_foods([("brand kohlrabi", {"calories": 27})])
+    monkeypatch.setattr(food_store, "MAX_POSTINGS", 10)
+
+    assert store.search_fuzzy("brand kohlrbi", limit=1)[0][1]["name"] == "brand kohlrabi"
+
+
+def test_corrects_misspelled_words_against_the_catalog_vocabulary(store):
+    assert store.correct_spelling("Chiken  Brest") == "chicken  breast"
+    assert store.correct_spelling("roasted chiken with slt") == "roasted chicken with slt"
+    assert store.correct_spelling("xyzzy oats") == "xyzzy oats"
+
+
+@pytest.mark.parametrize("typed, expected", [
+    ("Quinoa", "quinoa"),
+    ("quin", "quinoa"),
+    ("chiken brest", "chicken breast"),
+    ("brocoli", "broccoli"),
+    ("roasted chiken with salt", "roasted chicken with salt"),
+    ("rosted chicken", "roasted chicken with salt"),
+    ("swet potatoe", "sweet potato"),
+])
+def test_lookup_resolves_typos_and_partial_names(store, typed, expected):
+    assert store.lookup(typed)["name"] == expected
+
+
+def test_lookup_remembers_misses_until_foods_are_added(store, monkeypatch):
+    assert store.lookup("kohlrabi") is None
+    monkeypatch.setattr(store, "search_fuzzy", lambda *args, **kwargs: pytest.fail("searched again"))
+    assert store.lookup("Kohlrabi ") is None
+
+    store.add_foods([("kohlrabi", {"calories": 27})])
+    assert store.lookup("kohlrabi")["calories"] == 27
+
+
+def test_search_fills_prefix_matches_with_corrected_and_fuzzy_ones(store):
+    assert _names(store.search("roasted chick", limit=2)) == [
+        "roasted chicken with salt", "roasted chicken with salt and pepper"]
+    # No prefix match as typed: "roasted chicken" prefixes come first, then the fuzzy matches
+    assert _names(store.search("rosted chiken")) == [
+        "roasted chicken with salt", "roasted chicken with salt and pepper", "roasted chickpeas", "chicken breast"]
+    assert _names(store.search("chiken", restrictions=["dairy-free"])) == ["chicken breast"]
+
+
+def test_agent_resolves_foods_through_the_store(store):
+    agent = NutritionCoachAgent(food_store=store)
+    assert agent.food_database == {}
+    agent.setup_user_profile(name="Ada", age=30, weight=70, height=175, gender="female", activity_level="moderate")
+    agent.log_meal("lunch", {"Chiken Brest": 1, "kohlrabi": 1})
+
+    day = next(iter(agent.daily_logs.values()))
+    assert day["totals"]["calories"] == 165
+    assert list(day["meals"]["lunch"][0]["items"]) == ["Chiken Brest"]
+    assert agent.search_foods("roasted chick", restrictions=["vegetarian"]) == ["roasted chickpeas"]
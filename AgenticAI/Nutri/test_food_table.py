@@ -0,0 +1,76 @@
+# Tests for the dietary-tag bitsets of the food table and the agent's food search
+#
+# Dependencies:
+# pip install pytest numpy
+
+import random
+
+import numpy as np
+
+from food_table import DIETARY_TAGS, NUTRIENTS, FoodTable
+from nutrition_coach import NutritionCoachAgent
+
+
+def _random_table(size, seed=11):
+    rng = random.Random(seed)
+    tags = [[tag for tag in DIETARY_TAGS if rng.random() < 0.6] for _ in range(size)]
+    return FoodTable([f"food {row}" for row in range(size)], np.zeros((size, len(NUTRIENTS))),
+                     ["misc"] * size, tags), tags
+
+
+def test_allowed_mask_matches_a_scan_of_the_tags():
+    rng = random.Random(5)
+    # Sizes around the byte boundaries of the packed bitsets
+    for size in (0, 1, 7, 8, 9, 63, 1000):
+        table, tags = _random_table(size)
+        for _ in range(20):
+            restrictions = rng.sample(DIETARY_TAGS, rng.randint(0, 3))
+            expected = [all(restriction in food_tags for restriction in restrictions) for food_tags in tags]
+            mask = table.allowed_mask(restrictions)
+            assert mask.dtype == bool and mask.tolist() == expected
+
+
+def test_allowed_mask_ignores_case_and_uncheckable_restrictions():
+    table, tags = _random_table(50)
+    vegan = [("vegan" in food_tags) for food_tags in tags]
+    assert table.allowed_mask(["Vegan", "low-sodium"]).tolist() == vegan
+    assert table.allowed_mask(["paleo"]).all()
+
+
+def test_bitsets_are_rebuilt_when_a_food_is_added():
+    table, _ = _random_table(16)
+    before = table.allowed_mask(["nut-free"])
+    row = table.add("Kohlrabi", {"calories": 27, "protein": 1.7, "carbs": 6.2, "fat": 0.1, "fiber": 3.6,
+                                 "category": "vegetable", "tags": ["vegan", "nut-free"]})
+
+    after = table.allowed_mask(["nut-free"])
+    assert row == 16 and len(after) == 17
+    assert after[:16].tolist() == before.tolist() and after[16]
+    assert not table.allowed_mask(["dairy-free"])[16]
+    assert table.add("kohlrabi", {}) == row
+
+
+def test_violations_lists_only_checkable_unmet_restrictions():
+    table = NutritionCoachAgent().food_table
+    restrictions = ["Vegan", "nut-free", "keto"]
+    assert table.violations(table.row("greek yogurt"), restrictions) == ["Vegan"]
+    assert table.violations(table.row("almonds"), restrictions) == ["nut-free"]
+    assert table.violations(table.row("apple"), restrictions) == []
+
+
+def test_search_foods_filters_by_name_and_restrictions():
+    agent = NutritionCoachAgent()
+    # Names starting with the query come first, then the other matches, each in name order
+    assert agent.search_foods("o") == ["oats", "olive oil", "almonds", "avocado", "broccoli", "brown rice",
+                                       "greek yogurt", "quinoa", "salmon", "sweet potato"]
+    assert agent.search_foods("  RICE ") == ["brown rice"]
+    assert agent.search_foods("o", limit=3) == ["oats", "olive oil", "almonds"]
+    assert agent.search_foods("salmon", restrictions=["vegetarian"]) == []
+    assert agent.search_foods("yogurt", restrictions=["gluten-free"]) == ["greek yogurt"]
+
+    # Without restrictions given, the profile's are used
+    agent.setup_user_profile(name="Ada", age=30, weight=70, height=175, gender="female",
+                             activity_level="moderate", dietary_restrictions=["vegan", "nut-free"])
+    assert agent.search_foods("a", limit=100) == [
+        "apple", "avocado", "banana", "oats", "quinoa", "spinach", "sweet potato"]
+    assert "almonds" in agent.search_foods("a", restrictions=[])
@@ -0,0 +1,91 @@
+# Restart and replay tests for the meal journal
+#
+# Dependencies:
+# pip install pytest numpy
+
+import glob
+import json
+import os
+
+import pytest
+
+from meal_journal import SNAPSHOT_FILE, MealJournal
+from nutrition_coach import NutritionCoachAgent
+
+MEALS = [("breakfast", {"oats": 1, "banana": 1}), ("lunch", {"lentils": 1}), ("dinner", {"salmon": 0.5})]
+
+
+def _agent(directory, snapshot_every=10000):
+    return NutritionCoachAgent(journal=MealJournal(str(directory), snapshot_every=snapshot_every))
+
+
+def _setup(agent):
+    agent.setup_user_profile(name="Ada", age=30, weight=70, height=175, gender="female",
+                             activity_level="moderate", dietary_restrictions=["vegetarian"])
+    agent.set_goals(weight_goal=68)
+
+
+def _totals(agent):
+    return {date: log["totals"] for date, log in agent.daily_logs.items()}
+
+
+@pytest.mark.parametrize("snapshot_every", [1, 2, 3, 4, 10000])
+def test_restart_restores_batched_meals_exactly_once(tmp_path, snapshot_every):
+    agent = _agent(tmp_path, snapshot_every)
+    _setup(agent)
+    agent.log_meals(MEALS)
+    agent.log_meal("snack", {"almonds": 1})
+    agent.journal.close()
+
+    restored = _agent(tmp_path, snapshot_every)
+    assert _totals(restored) == _totals(agent)
+    assert restored.user_profile == agent.user_profile and restored.goals == agent.goals
+    assert restored.get_daily_summary() == agent.get_daily_summary()
+
+
+def test_snapshot_is_compact_and_bounds_the_replayed_tail(tmp_path):
+    agent = _agent(tmp_path, snapshot_every=3)
+    _setup(agent)
+    agent.log_meals(MEALS)
+    agent.journal.close()
+
+    with open(os.path.join(tmp_path, SNAPSHOT_FILE), encoding="utf-8") as file:
+        snapshot = json.load(file)
+    # Profile and goals plus the three meals were all logged before the snapshot was taken
+    assert snapshot["seq"] == 5
+    assert snapshot["state"]["days"] == _totals(agent)
+    assert "daily_logs" not in snapshot["state"]
+    assert glob.glob(os.path.join(tmp_path, "journal-*.log")) == []
+
+
+def test_replays_the_tail_and_skips_a_torn_last_line(tmp_path):
+    agent = _agent(tmp_path)
+    _setup(agent)
+    agent.log_meal("lunch", {"quinoa": 1})
+    agent.journal.close()
+    expected = _totals(agent)
+
+    segment, = glob.glob(os.path.join(tmp_path, "journal-*.log"))
+    with open(segment, "a", encoding="utf-8") as file:
+        file.write('{"seq": 4, "type": "meal", "da')
+
+    restored = _agent(tmp_path)
+    assert _totals(restored) == expected
+    assert restored.daily_logs[next(iter(expected))]["meals"]["lunch"][0]["items"]["quinoa"]["calories"] == 222
+
+
+@pytest.mark.parametrize("torn", ['{"seq": 3, "type": "meal", "da', '{"seq": 3, "type": "goals", "goals": {}}'])
+def test_events_logged_after_a_torn_line_survive_the_next_restart(tmp_path, torn):
+    # The snapshot after set_goals deletes the segments; the crash tears the first line of the next one
+    _setup(_agent(tmp_path, snapshot_every=2))
+    assert glob.glob(os.path.join(tmp_path, "journal-*.log")) == []
+    with open(os.path.join(tmp_path, "journal-000000000003.log"), "w", encoding="utf-8") as file:
+        file.write(torn)
+
+    agent = _agent(tmp_path)
+    agent.log_meals(MEALS[:2])
+    agent.journal.close()
+
+    restored = _agent(tmp_path)
+    assert _totals(restored) == _totals(agent) != {}
+    assert restored.goals == agent.goals
@@ -0,0 +1,128 @@
+# Tests for the meal planner and NutritionCoachAgent.suggest_meal
+#
+# Dependencies:
+# pip install pytest numpy
+
+import itertools
+
+import numpy as np
+import pytest
+
+from food_table import NUTRIENTS
+from meal_planner import MACROS, candidate_rows, solve_portions
+from nutrition_coach import NutritionCoachAgent
+
+
+def _table():
+    return NutritionCoachAgent().food_table
+
+
+def _error(nutrients, portions, target, calorie_budget):
+    # The objective solve_portions minimizes
+    totals = portions @ nutrients
+    over = max(totals[0] - calorie_budget, 0) / max(calorie_budget, 1.0)
+    return (((totals[MACROS] - target) / np.maximum(target, 1.0)) ** 2).sum() + 4 * over ** 2
+
+
+def test_solve_portions_hits_a_reachable_target_exactly():
+    table = _table()
+    rows = np.array([table.row("lentils"), table.row("olive oil"), table.row("apple")])
+    nutrients = table.matrix[rows]
+    target = 1.5 * nutrients[0, MACROS] + 1.0 * nutrients[1, MACROS]
+
+    portions = solve_portions(nutrients, target, calorie_budget=2000)
+    assert portions.tolist() == [1.5, 1.0, 0.0]
+
+
+def test_solve_portions_respects_its_limits_and_stops_at_a_local_optimum():
+    table = _table()
+    nutrients = table.matrix[:len(table)]
+    target, budget = np.array([120.0, 250.0, 70.0]), 1800.0
+
+    for max_portion, max_items in [(3, 4), (1, 2), (2, 6)]:
+        portions = solve_portions(nutrients, target, budget, max_portion=max_portion, max_items=max_items)
+        assert np.all(portions % 0.5 == 0) and portions.max() <= max_portion
+        assert 0 < np.count_nonzero(portions) <= max_items
+
+        best = _error(nutrients, portions, target, budget)
+        assert best < _error(nutrients, np.zeros(len(nutrients)), target, budget)
+        # No single step more of a usable food would have helped
+        for food in range(len(nutrients)):
+            if portions[food] >= max_portion or (not portions[food] and np.count_nonzero(portions) >= max_items):
+                continue
+            more = portions.copy()
+            more[food] += 0.5
+            assert _error(nutrients, more, target, budget) >= best
+
+
+def test_solve_portions_is_close_to_an_exhaustive_search_on_small_inputs():
+    table = _table()
+    rows = np.array([table.row(name) for name in ("chicken breast", "brown rice", "avocado", "broccoli")])
+    nutrients, target, budget = table.matrix[rows], np.array([45.0, 80.0, 25.0]), 700.0
+
+    greedy = _error(nutrients, solve_portions(nutrients, target, budget), target, budget)
+    steps = np.arange(0, 3.5, 0.5)
+    optimum = min(_error(nutrients, np.array(portions), target, budget)
+                  for portions in itertools.product(steps, repeat=len(rows)))
+    assert greedy <= optimum + 0.05
+
+
+def test_solve_portions_without_candidates():
+    assert solve_portions(np.zeros((0, len(NUTRIENTS))), np.array([10.0, 10.0, 10.0]), 500).shape == (0,)
+
+
+def test_candidate_rows_keep_the_best_allowed_foods_of_each_category():
+    table = _table()
+    target = np.array([30.0, 5.0, 5.0])
+    allowed = table.allowed_mask(["vegan"])
+
+    rows = candidate_rows(table, target, allowed, per_category=1)
+    assert all(allowed[rows])
+    assert len({table.categories[row] for row in rows}) == len(rows)
+    # Lentils are the most protein-heavy vegan food; dairy and fish are never allowed
+    assert "lentils" in {table.names[row] for row in rows}
+    assert not {"greek yogurt", "salmon", "chicken breast"} & {table.names[row] for row in rows}
+
+    everything = candidate_rows(table, target, np.ones(len(table), dtype=bool))
+    assert sorted(everything.tolist()) == list(range(len(table)))
+
+
+def _agent(restrictions=()):
+    agent = NutritionCoachAgent()
+    agent.setup_user_profile(name="Ada", age=30, weight=70, height=175, gender="female",
+                             activity_level="moderate", dietary_restrictions=list(restrictions))
+    return agent
+
+
+def test_suggest_meal_fills_the_remaining_goals_and_can_be_logged():
+    agent = _agent(["vegan"])
+    assert agent.suggest_meal() == "Please set your goals first."
+    agent.set_goals(daily_calories=2000, macros={"protein": 25, "carbs": 50, "fat": 25})
+
+    suggestion = agent.suggest_meal()
+    # Suggesting does not start a log for today
+    assert agent.daily_logs == {}
+    foods, totals = suggestion["foods"], suggestion["totals"]
+    assert foods and all(0 < portion <= 3 for portion in foods.values())
+    assert all("vegan" in agent.food_database[food]["tags"] for food in foods)
+
+    agent.log_meal("lunch", foods)
+    logged = next(iter(agent.daily_logs.values()))["totals"]
+    assert logged == pytest.approx(totals, abs=0.11)
+    assert totals["calories"] <= 2000 * 1.1
+
+    # What is left after the meal is smaller, so the next suggestion is too
+    assert agent.suggest_meal()["totals"]["calories"] < totals["calories"]
+
+
+def test_suggest_meal_with_an_explicit_budget_and_restrictions():
+    agent = _agent()
+    empty = {"foods": {}, "totals": dict.fromkeys(NUTRIENTS, 0)}
+    assert agent.suggest_meal({"calories": 0, "protein": 30}) == empty
+    assert agent.suggest_meal({"calories": 500, "protein": -5, "carbs": 0, "fat": 0}) == empty
+
+    suggestion = agent.suggest_meal({"calories": 500, "protein": 40, "carbs": 20, "fat": 10},
+                                    restrictions=["gluten-free", "dairy-free"])
+    assert suggestion["foods"]
+    assert not {"oats", "greek yogurt"} & set(suggestion["foods"])
+    assert suggestion["totals"]["calories"] <= 500 and suggestion["totals"]["protein"] > 0
@@ -0,0 +1,83 @@
+# Benchmarks for NutritionCoachAgent
+#
+# Dependencies:
+# pip install pytest-benchmark numpy
+#
+# With --benchmark-gate, conftest.py compares the run against benchmark_baseline.json
+# and fails on a median more than 15% slower. log_meal and get_daily_summary run
+# 1 and 10k times per round, and 1M times with --benchmark-large; the 1-item cases
+# are not gated. log_meals runs the same meals
+# as a single batch for comparison.
+
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from nutrition_coach import NutritionCoachAgent
+
+LARGE = 1_000_000
+SMALL = 10_000
+SIZES = [pytest.param(1, marks=pytest.mark.ungated), SMALL, pytest.param(LARGE, marks=pytest.mark.large)]
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+
+def _rounds(size):
+    return 20 if size < LARGE else 2
+
+
+def _new_agent():
+    agent = NutritionCoachAgent()
+    agent.setup_user_profile(name="Benchmark", age=30, weight=70, height=175, gender="male",
+                             activity_level="moderate", dietary_restrictions=["vegetarian"])
+    agent.set_goals(weight_goal=68)
+    return agent
+
+
+@pytest.fixture(scope="module")
+def meals(request):
+    rng = random.Random(42)
+    foods = list(NutritionCoachAgent().food_database)
+    count = LARGE if request.config.getoption("--benchmark-large") else SMALL
+    return [(rng.choice(MEAL_TYPES), {food: rng.choice([0.5, 1, 1.5, 2]) for food in rng.sample(foods, 3)})
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_log_meal(benchmark, meals, size):
+    def log_meals(agent):
+        for meal_type, foods in meals[:size]:
+            agent.log_meal(meal_type, foods)
+        return agent
+
+    agent = benchmark.pedantic(log_meals, setup=lambda: ((_new_agent(),), {}), rounds=_rounds(size))
+    assert sum(len(entries) for day in agent.daily_logs.values() for entries in day["meals"].values()) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_log_meals_batch(benchmark, meals, size):
+    def log_batch(agent):
+        agent.log_meals(meals[:size])
+        return agent
+
+    agent = benchmark.pedantic(log_batch, setup=lambda: ((_new_agent(),), {}), rounds=_rounds(size))
+    if size <= 10_000:
+        reference = _new_agent()
+        for meal_type, foods in meals[:size]:
+            reference.log_meal(meal_type, foods)
+        assert agent.daily_logs == reference.daily_logs
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_get_daily_summary(benchmark, meals, size):
+    agent = _new_agent()
+    agent.log_meals(meals[:100])
+
+    def summarize():
+        for _ in range(size):
+            summary = agent.get_daily_summary()
+        return summary
+
+    summary = benchmark.pedantic(summarize, rounds=_rounds(size))
+    assert "Daily progress" in summary
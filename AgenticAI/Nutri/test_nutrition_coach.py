@@ -0,0 +1,72 @@
+# Tests for NutritionCoachAgent's meal logging: log_meals must store exactly
+# what the same meals logged one by one with log_meal would.
+#
+# Dependencies:
+# pip install pytest numpy
+
+import datetime
+import random
+
+from nutrition_coach import NutritionCoachAgent
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+
+def _agent(restrictions=("vegetarian",)):
+    agent = NutritionCoachAgent()
+    agent.setup_user_profile(name="Ada", age=30, weight=70, height=175, gender="female",
+                             activity_level="moderate", dietary_restrictions=list(restrictions))
+    agent.set_goals(weight_goal=68)
+    return agent
+
+
+def _meals(count, seed=42):
+    rng = random.Random(seed)
+    foods = list(NutritionCoachAgent().food_database) + ["Banana", "dragon fruit"]
+    return [(rng.choice(MEAL_TYPES), {food: rng.choice([0.25, 0.5, 1, 1.5, 2, 3.3]) for food in rng.sample(foods, 4)})
+            for _ in range(count)]
+
+
+def test_log_meals_matches_log_meal():
+    meals = _meals(500)
+    batched, reference = _agent(), _agent()
+    results = batched.log_meals(meals)
+    logged = []
+    for meal_type, foods in meals:
+        reference.log_meal(meal_type, foods)
+        logged.append(next(iter(reference.daily_logs.values()))["meals"][meal_type][-1])
+
+    assert batched.daily_logs == reference.daily_logs
+    assert batched.get_daily_summary() == reference.get_daily_summary()
+    assert [result["meal"] for result in results] == logged
+
+
+def test_log_meals_reports_unknown_foods_and_restrictions_like_log_meal():
+    agent = _agent(restrictions=["vegan", "nut-free"])
+    foods = {"almonds": 1, "greek yogurt": 2, "oats": 1, "dragon fruit": 1}
+    [result] = agent.log_meals([("breakfast", foods)])
+    message = _agent(restrictions=["vegan", "nut-free"]).log_meal("breakfast", foods)
+
+    assert result["unknown_foods"] == ["dragon fruit"]
+    assert result["restriction_warnings"] == ["almonds (nut-free)", "greek yogurt (vegan)"]
+    assert "not found in the database: dragon fruit" in message
+    assert "do not fit your dietary restrictions: almonds (nut-free), greek yogurt (vegan)" in message
+
+
+def test_log_meals_files_meals_under_their_own_dates():
+    agent = _agent()
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    agent.log_meals([("lunch", {"lentils": 1}, "2024-03-01"), ("dinner", {"salmon": 1}, "2024-03-02"),
+                     ("snack", {"apple": 2}, "2024-03-01"), ("breakfast", {"oats": 1})])
+
+    assert sorted(agent.daily_logs) == ["2024-03-01", "2024-03-02", today]
+    assert agent.daily_logs["2024-03-01"]["totals"] == {
+        "calories": 420.0, "protein": 19.0, "carbs": 90.0, "fat": 1.4, "fiber": 24.0}
+    assert list(agent.daily_logs["2024-03-01"]["meals"]) == ["lunch", "snack"]
+    assert "Calories: 206.0" in agent.get_daily_summary("2024-03-02")
+
+
+def test_log_meals_needs_a_profile():
+    agent = NutritionCoachAgent()
+    assert agent.log_meals([("lunch", {"apple": 1})]) == "Please set up your profile first."
+    assert agent.daily_logs == {}
@@ -0,0 +1,110 @@
+# Tests for the cached progress report and the prefix-sum totals history
+#
+# Dependencies:
+# pip install pytest numpy
+
+import random
+
+import pytest
+
+from food_table import NUTRIENTS
+from nutrition_coach import NutritionCoachAgent
+from progress import DailyProgress, TotalsHistory
+
+
+def _day(rng):
+    return {nutrient: round(rng.uniform(0, 500), 1) for nutrient in NUTRIENTS}
+
+
+def test_range_totals_match_a_scan_while_days_are_added_and_changed():
+    rng = random.Random(3)
+    history, days = TotalsHistory(), {}
+    dates = [f"2024-{month:02d}-{day:02d}" for month in (1, 2) for day in range(1, 29)]
+
+    for step in range(400):
+        date = rng.choice(dates)
+        if date in days and step % 3:
+            # Changed in place, as DailyProgress does, then touched
+            days[date]["calories"] += 100
+            history.touch(date)
+        else:
+            days[date] = _day(rng)
+            history.track(date, days[date])
+
+        start, end = sorted(rng.sample(dates, 2))
+        inside = [totals for day, totals in days.items() if start <= day <= end]
+        count, totals = history.range_totals(start, end)
+        assert count == len(inside)
+        for nutrient in NUTRIENTS:
+            assert totals[nutrient] == pytest.approx(sum(day[nutrient] for day in inside))
+
+
+def test_range_totals_of_an_empty_range():
+    history = TotalsHistory()
+    assert history.range_totals("2024-01-01", "2024-01-07") == (0, dict.fromkeys(NUTRIENTS, 0))
+    history.track("2024-01-10", dict.fromkeys(NUTRIENTS, 1.0))
+    assert history.range_totals("2024-01-01", "2024-01-07")[0] == 0
+    assert history.range_totals("2024-01-07", "2024-01-01")[0] == 0
+
+
+def _agent():
+    agent = NutritionCoachAgent()
+    agent.setup_user_profile(name="Ada", age=30, weight=70, height=175, gender="female", activity_level="moderate")
+    return agent
+
+
+def test_weekly_summary_averages_the_logged_days_of_the_week():
+    agent = _agent()
+    agent.log_meals([("lunch", {"lentils": 1}, "2024-03-01"), ("dinner", {"salmon": 1}, "2024-03-07"),
+                     ("lunch", {"oats": 1}, "2024-03-07"), ("snack", {"apple": 1}, "2024-03-08"),
+                     ("snack", {"apple": 1}, "2024-02-29")])
+
+    summary = agent.get_weekly_summary("2024-03-07")
+    assert summary.startswith("Weekly Summary for 2024-03-01 to 2024-03-07 (2 days logged):")
+    # (230 + 206 + 307) / 2
+    assert "- Average calories: 371.5\n" in summary
+    assert "Average vs. daily calorie target" not in summary
+
+    # A later meal on a day inside the week changes the averages
+    agent.log_meals([("snack", {"apple": 1}, "2024-03-01")])
+    agent.set_goals(daily_calories=2000)
+    summary = agent.get_weekly_summary("2024-03-07")
+    assert "- Average calories: 419.0\n" in summary
+    assert "Average vs. daily calorie target: -1581.0 calories" in summary
+
+    assert agent.get_weekly_summary("2024-01-07") == "No meal data found between 2024-01-01 and 2024-01-07."
+
+
+def test_progress_is_recomputed_when_the_goals_change():
+    agent = _agent()
+    agent.set_goals(daily_calories=2000, macros={"protein": 30, "carbs": 40, "fat": 30})
+    agent.log_meal("lunch", {"chicken breast": 2})
+    assert "- Calories: 330 / 2000 (1670 remaining)" in agent.get_daily_summary()
+    assert "- Protein: 62g / 150g (41%)" in agent.get_daily_summary()
+
+    agent.set_goals(daily_calories=1500, macros={"protein": 20, "carbs": 50, "fat": 30})
+    summary = agent.get_daily_summary()
+    assert "- Calories: 330 / 1500 (1170 remaining)" in summary
+    assert "- Protein: 62g / 75g (83%)" in summary and "- Carbs: 0g / 188g (0%)" in summary
+
+    # And when food is logged, for the already computed goals
+    agent.log_meal("snack", {"banana": 1})
+    assert "- Calories: 435 / 1500 (1065 remaining)" in agent.get_daily_summary()
+
+
+def test_daily_progress_caches_its_lines_until_something_changes():
+    totals = dict.fromkeys(NUTRIENTS, 0.0)
+    progress = DailyProgress(totals)
+    goals = {"daily_calories": 2000, "protein_grams": 100}
+
+    lines = progress.progress_lines(goals, 1)
+    assert lines == ["- Calories: 0.0 / 2000 (2000.0 remaining)", "- Protein: 0.0g / 100g (0%)"]
+    assert progress.progress_lines(goals, 1) is lines
+
+    progress.add({"calories": 500, "protein": 25, "carbs": 0, "fat": 0, "fiber": 0})
+    assert totals["calories"] == 500.0
+    assert progress.progress_lines(goals, 1)[1] == "- Protein: 25.0g / 100g (25%)"
+
+    # Same goals version, different dict: the cached goals are kept until the version changes
+    assert progress.progress_lines({"daily_calories": 1000}, 1)[0] == "- Calories: 500.0 / 2000 (1500.0 remaining)"
+    assert progress.progress_lines({"daily_calories": 1000}, 2) == ["- Calories: 500.0 / 1000 (500.0 remaining)"]
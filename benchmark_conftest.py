@@ -0,0 +1,64 @@
+# pytest configuration shared by the benchmark suites in AgenticAI/Nutri and
+# personal-health-advisor. Each folder's conftest.py loads this file and passes
+# it the path of its own benchmark_baseline.json.
+#
+# Benchmarks marked "large" (the 1M sizes) are skipped unless --benchmark-large
+# is given. Garbage collection is disabled while timing, as it was for the baselines.
+#
+# The regression gate is opt-in, for CI on the machine type that recorded the
+# baseline: with --benchmark-gate, a run is compared against the baseline and
+# fails if a benchmark's median time is more than 15% slower. Unlike the mean,
+# the median is not moved by a stray slow round, and unlike the minimum, not by
+# a stray fast one. Benchmarks marked "ungated"
+# (the 1-item cases, whose microsecond timings swing by more than that between
+# runs) are skipped in a gated run. So are the large ones: after a 1M run the
+# heap is in a different state, and the 10k timings that follow it are not
+# comparable with those of a default run.
+# To refresh a baseline, run in its folder on the reference machine:
+#   python -m pytest --benchmark-json=benchmark_baseline.json
+
+import os
+
+import pytest
+
+MAX_REGRESSION = "median:15%"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark-large", action="store_true", default=False,
+                     help="Also run the benchmarks marked large (1M inputs)")
+    parser.addoption("--benchmark-gate", action="store_true", default=False,
+                     help="Fail if a benchmark is more than 15%% slower than benchmark_baseline.json")
+
+
+def configure(config, baseline):
+    """pytest_configure for a benchmark folder whose baseline is at the given path."""
+    config.addinivalue_line("markers", "large: benchmark over 1M inputs; only runs with --benchmark-large")
+    config.addinivalue_line("markers", "ungated: benchmark too noisy for the regression gate")
+    if not config.pluginmanager.hasplugin("benchmark"):
+        return
+    # How often the collector runs depends on how much else is alive (such as the
+    # inputs of a --benchmark-large run), which would skew comparisons between runs
+    config.option.benchmark_disable_gc = True
+    if not config.getoption("--benchmark-gate"):
+        return
+    if config.getoption("--benchmark-large"):
+        raise pytest.UsageError("--benchmark-gate compares default runs; drop --benchmark-large")
+    if not os.path.exists(baseline):
+        raise pytest.UsageError(f"--benchmark-gate needs a baseline at {baseline}")
+    # pytest-benchmark loads the comparison in its own (trylast) pytest_configure, after this one
+    if not config.option.benchmark_compare:
+        config.option.benchmark_compare = baseline
+    if not config.option.benchmark_compare_fail:
+        from pytest_benchmark.utils import parse_compare_fail
+        config.option.benchmark_compare_fail = [parse_compare_fail(MAX_REGRESSION)]
+
+
+def pytest_collection_modifyitems(config, items):
+    skip_large = pytest.mark.skip(reason="large benchmark; run with --benchmark-large")
+    skip_ungated = pytest.mark.skip(reason="too noisy for --benchmark-gate")
+    for item in items:
+        if "large" in item.keywords and not config.getoption("--benchmark-large"):
+            item.add_marker(skip_large)
+        elif "ungated" in item.keywords and config.getoption("--benchmark-gate"):
+            item.add_marker(skip_ungated)
@@ -0,0 +1,212 @@
+"""
+Bulk sending over pooled SMTP sessions
+======================================
+
+Opening a connection, running STARTTLS and logging in costs far more than
+sending one message. A BulkMailer therefore keeps a fixed set of worker
+threads for its whole life, gives each one authenticated session and sends
+many messages over it, across any number of send_all calls. A session that
+breaks is replaced, and the message it was sending is retried once on the new
+session. All threads share a per-server rate limit.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the session is unusable and a fresh one should be tried
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+# Replies meaning "service closing the transmission channel"
+RECONNECT_CODES = {421}
+
+
+class RateLimiter:
+    """Spread sends so no more than `rate` per second start, across all threads."""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Block until the caller may send."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SmtpPool:
+    """Authenticated SMTP sessions to one server, one per thread, reused across messages."""
+
+    def __init__(self, host, port, username=None, password=None, starttls=True, timeout=30,
+                 rate=None, max_messages_per_session=1000):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate)
+        self.max_messages_per_session = max_messages_per_session
+        self.connections = 0
+        self._local = threading.local()
+        self._sessions = set()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        with self._lock:
+            self.connections += 1
+            self._sessions.add(server)
+        self._local.sent = 0
+        return server
+
+    def _session(self):
+        server = getattr(self._local, 'server', None)
+        if server is None:
+            server = self._local.server = self._connect()
+        return server
+
+    def _discard(self):
+        server = getattr(self._local, 'server', None)
+        self._local.server = None
+        if server is None:
+            return
+        with self._lock:
+            self._sessions.discard(server)
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def send(self, msg):
+        """Send a message on this thread's session, reconnecting and retrying once if the session broke."""
+        for attempt in (1, 2):
+            self.rate_limiter.wait()
+            try:
+                self._session().send_message(msg)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code not in RECONNECT_CODES or attempt == 2:
+                    raise
+                logger.info("Server closed the session (%s), reconnecting", e.smtp_code)
+                self._discard()
+                continue
+            except CONNECTION_ERRORS as e:
+                self._discard()
+                if attempt == 2:
+                    raise
+                logger.info("Lost the SMTP session (%s), reconnecting", e)
+                continue
+            self._local.sent += 1
+            if self._local.sent >= self.max_messages_per_session:
+                # Servers cap messages per connection; start a fresh session before hitting the cap
+                self._discard()
+            return
+
+    def close(self):
+        """Log out of every session."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, set()
+        for server in sessions:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+
+class BulkSendResult:
+    """Outcome of a bulk send."""
+
+    def __init__(self):
+        self.sent = 0
+        self.failures = []
+        self.elapsed_seconds = 0.0
+
+    @property
+    def messages_per_second(self):
+        return (self.sent + len(self.failures)) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self):
+        return (f"Sent {self.sent} messages, {len(self.failures)} failed, in {self.elapsed_seconds:.1f}s "
+                f"({self.messages_per_second:.1f} messages/s)")
+
+
+class BulkMailer:
+    """Send many messages concurrently through an SmtpPool."""
+
+    def __init__(self, pool, workers=8, max_pending=None):
+        self.pool = pool
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        # Sessions belong to threads, so the same threads serve every send_all call
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='smtp')
+
+    def _send(self, msg):
+        started = time.perf_counter()
+        try:
+            self.pool.send(msg)
+            error = None
+        except (smtplib.SMTPException, OSError) as e:
+            error = e
+        return msg, error, time.perf_counter() - started
+
+    def send_all(self, messages, on_result=None):
+        """
+        Send every message from an iterable, pulling only a bounded number ahead of the senders.
+
+        on_result, if given, is called as on_result(msg, error, seconds) for each
+        message as it completes, on the calling thread. error is None on success.
+        """
+        result = BulkSendResult()
+        started = time.perf_counter()
+        pending = set()
+
+        def collect(done):
+            for future in done:
+                msg, error, seconds = future.result()
+                if error is None:
+                    result.sent += 1
+                else:
+                    reason = f"{type(error).__name__}: {error}"
+                    logger.error("Failed to send to %s: %s", msg['To'], reason)
+                    result.failures.append((msg['To'], reason))
+                if on_result is not None:
+                    on_result(msg, error, seconds)
+
+        for msg in messages:
+            if len(pending) >= self.max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(self._executor.submit(self._send, msg))
+        collect(wait(pending).done)
+
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
+
+    def close(self):
+        """Wait for the worker threads to finish, then log out of every session."""
+        self._executor.shutdown()
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
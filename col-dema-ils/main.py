@@ -20,14 +20,12 @@ Usage
 
 """
 
-import smtplib
-import os
+import sys
 import logging
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email.mime.text import MIMEText
-from email.utils import formatdate
-from email import encoders
+from bulk_mailer import BulkMailer, SmtpPool
+from message_builder import MessageBuilder
+from recipients import read_recipients
+from send_queue import SendQueue, send_campaign
 from settings import EMAIL_SETTINGS
 
 # Set up logging
@@ -35,34 +33,14 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def send_email_with_attachment(subject, message, from_addr, to_addr, attachment=None):
-    """Send an email with an optional attachment"""
-    msg = MIMEMultipart()
-    msg['From'] = from_addr
-    msg['To'] = to_addr
-    msg['Date'] = formatdate(localtime=True)
-    msg['Subject'] = subject
-
-    msg.attach(MIMEText(message))
-
-    if attachment:
-        with open(attachment, 'rb') as f:
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(f.read())
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                'attachment; filename="%s"' % os.path.basename(attachment)
-            )
-            msg.attach(part)
-
-    with smtplib.SMTP(EMAIL_SETTINGS['SMTP_SERVER'], EMAIL_SETTINGS['SMTP_PORT']) as server:
-        server.starttls()
-        server.login(EMAIL_SETTINGS['FROM_EMAIL'], EMAIL_SETTINGS['FROM_PASSWORD'])
-        server.send_message(msg)
+def default_fields(address):
+    """Fields every recipient has unless their row overrides them"""
+    return {'name': address.split('@')[0]}
 
 
 if __name__ == '__main__':
+    # A .csv or .jsonl recipient list (an "email" column plus any template fields), or the list below
+    recipients_file = sys.argv[1] if len(sys.argv) > 1 else EMAIL_SETTINGS.get('RECIPIENTS_FILE')
     # Replace with your own email list
     emails = ['email1@example.com', 'email2@example.com']
 
@@ -70,15 +48,29 @@ if __name__ == '__main__':
     with open('template.html', 'r') as f:
         template = f.read()
 
-    for email in emails:
-        # Replace with your own dynamic content
-        name = email.split('@')[0]
-        subject = 'Hello {}!'.format(name)
-        message = template.format(name=name)
-
-        # Replace with your own attachment
-        attachment = 'attachment.txt'
-
-        send_email_with_attachment(
-            subject, message, EMAIL_SETTINGS['FROM_EMAIL'], email, attachment
-        )
\ No newline at end of file
+    # Replace with your own attachment; it is read and encoded once for all recipients
+    builder = MessageBuilder(
+        EMAIL_SETTINGS['FROM_EMAIL'], 'Hello {name}!', template, attachments=['attachment.txt']
+    )
+
+    def recipients():
+        if recipients_file:
+            # Streamed row by row into the queue, so the whole list is never in memory
+            yield from read_recipients(recipients_file, defaults=default_fields)
+            return
+        for email in emails:
+            yield email, default_fields(email)
+
+    # Sessions are opened once per worker and reused for every message it sends
+    pool = SmtpPool(
+        EMAIL_SETTINGS['SMTP_SERVER'], EMAIL_SETTINGS['SMTP_PORT'],
+        EMAIL_SETTINGS['FROM_EMAIL'], EMAIL_SETTINGS['FROM_PASSWORD'],
+        rate=EMAIL_SETTINGS.get('MAX_PER_SECOND'),
+    )
+    # Who has been sent what is kept on disk, so a rerun after a crash resumes instead of double-sending
+    campaign = EMAIL_SETTINGS.get('CAMPAIGN', 'default')
+    with SendQueue(EMAIL_SETTINGS.get('QUEUE_FILE', 'outbox.sqlite3')) as queue, \
+            BulkMailer(pool, workers=EMAIL_SETTINGS.get('CONNECTIONS', 4)) as mailer:
+        logger.info("Queued %d new recipients", queue.enqueue(campaign, recipients()))
+        logger.info(send_campaign(queue, campaign, builder, mailer))
+        logger.info("Campaign %s: %s", campaign, queue.counts(campaign))
@@ -0,0 +1,105 @@
+"""
+Per-recipient messages from shared, pre-encoded parts
+=====================================================
+
+When the same attachment goes to every recipient, the file should be read and
+base64-encoded once rather than once per message. A MessageBuilder encodes its
+attachments when it is created and attaches the same MIME parts to every
+message it builds. Large files are memory-mapped for the encode, so they are
+never copied into memory before encoding. Subject and body templates are
+parsed once too. Each message therefore only costs its own headers and its
+rendered body.
+"""
+
+import base64
+import mmap
+import os
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate
+from string import Formatter
+
+# Files at least this large are memory-mapped instead of read
+MMAP_THRESHOLD = 1 << 20
+# What rendering a template raises when a recipient lacks a field or has an unusable value
+RENDER_ERRORS = (KeyError, IndexError, AttributeError, TypeError, ValueError)
+
+
+class CompiledTemplate:
+    """A str.format template parsed once and rendered many times."""
+
+    _formatter = Formatter()
+
+    def __init__(self, text):
+        self.text = text
+        # (literal, field name, conversion, format spec) for each segment
+        self._segments = [
+            (literal, field, conversion, spec)
+            for literal, field, spec, conversion in self._formatter.parse(text)
+        ]
+        if any(field == '' or (field or '').isdigit() for _, field, _, _ in self._segments):
+            raise ValueError("Templates take named fields only, e.g. {name}")
+
+    def render(self, fields):
+        """Fill in the template, as text.format(**fields) would."""
+        parts = []
+        for literal, field, conversion, spec in self._segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            if field in fields:
+                value = fields[field]
+            else:
+                value, _ = self._formatter.get_field(field, (), fields)
+            if conversion:
+                value = self._formatter.convert_field(value, conversion)
+            if spec and '{' in spec:
+                spec = CompiledTemplate(spec).render(fields)
+            parts.append(format(value, spec))
+        return ''.join(parts)
+
+
+def encode_file(path):
+    """Base64 text of a file, exactly as email.encoders.encode_base64 would produce it."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                encoded = base64.encodebytes(data)
+        else:
+            encoded = base64.encodebytes(f.read())
+    return encoded.decode('ascii')
+
+
+def attachment_part(path):
+    """A base64 application/octet-stream part for a file, ready to attach to any number of messages."""
+    part = MIMEBase('application', 'octet-stream')
+    part.set_payload(encode_file(path))
+    part['Content-Transfer-Encoding'] = 'base64'
+    part.add_header('Content-Disposition', 'attachment; filename="%s"' % os.path.basename(path))
+    return part
+
+
+class MessageBuilder:
+    """Builds one message per recipient from a subject template, a body template and shared attachments."""
+
+    def __init__(self, from_addr, subject, body, attachments=(), subtype='plain'):
+        self.from_addr = from_addr
+        self.subject = CompiledTemplate(subject)
+        self.body = CompiledTemplate(body)
+        self.subtype = subtype
+        self.attachments = [attachment_part(path) for path in attachments]
+
+    def build(self, to_addr, /, **fields):
+        """The message for one recipient, with the templates filled in from fields."""
+        msg = MIMEMultipart()
+        msg['From'] = self.from_addr
+        msg['To'] = to_addr
+        msg['Date'] = formatdate(localtime=True)
+        msg['Subject'] = self.subject.render(fields)
+
+        msg.attach(MIMEText(self.body.render(fields), self.subtype))
+        for part in self.attachments:
+            msg.attach(part)
+        return msg
+
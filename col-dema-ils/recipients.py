@@ -0,0 +1,74 @@
+"""
+Streaming recipient lists
+=========================
+
+Recipients are read from CSV (one header row, one recipient per row) or JSONL
+(one JSON object per line). Every column or key becomes a template field, so
+any per-recipient value can be used in the subject or body. Rows are yielded
+one at a time, so a list of millions of recipients is never held in memory.
+"""
+
+import csv
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def read_recipients(path, address_field='email', defaults=None):
+    """
+    Yield (address, fields) for every recipient in a .csv or .jsonl file.
+
+    Args:
+        path: The recipient list; the format is chosen by its extension
+        address_field: Column or key holding the email address
+        defaults: Optional function of the address returning fields a row may override
+
+    Rows without an address are skipped with a warning.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(path)
+    elif extension in ('.jsonl', '.ndjson'):
+        rows = _jsonl_rows(path)
+    else:
+        raise ValueError(f"Unsupported recipient list {path!r}: expected .csv or .jsonl")
+
+    for line, row in rows:
+        address = str(row.get(address_field) or '').strip()
+        if not address:
+            logger.warning("%s:%d: no %r, skipped", path, line, address_field)
+            continue
+        fields = defaults(address) if defaults else {}
+        for key, value in row.items():
+            # A short CSV row gives None for its missing cells; like an empty cell, that means "not given"
+            if value is None:
+                value = ''
+            if value != '' or key not in fields:
+                fields[key] = value
+        yield address, fields
+
+
+def _csv_rows(path):
+    # utf-8-sig drops the byte order mark spreadsheets put at the start of exported CSV
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _jsonl_rows(path):
+    with open(path, encoding='utf-8') as f:
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                logger.warning("%s:%d: invalid JSON (%s), skipped", path, line, e)
+                continue
+            if not isinstance(row, dict):
+                logger.warning("%s:%d: not a JSON object, skipped", path, line)
+                continue
+            yield line, row
@@ -0,0 +1,275 @@
+"""
+Durable, resumable send queue
+=============================
+
+A campaign's recipients are written to a SQLite queue before anything is sent,
+and each one moves through these states:
+
+    pending -> sending -> sent
+                       -> retry (until next_attempt) -> sending -> ...
+                       -> failed
+
+Senders claim recipients in bulk. Outcomes are buffered and committed in
+batches, so the database is not synced once per message. If the process dies,
+a rerun enqueues the same recipients again, and anyone already queued is
+ignored. Recipients that were sent are skipped. Those left mid-send are put
+back to pending, so at most the last uncommitted batch can be sent twice.
+Failures are retried with exponential backoff. A recipient fails for good
+when the server refuses that address permanently (a 5xx reply to RCPT TO) or
+it runs out of attempts. A 5xx for our sender address or for the message
+itself says nothing about the recipient, so it is retried like any other error.
+"""
+
+import json
+import logging
+import smtplib
+import sqlite3
+import time
+
+from message_builder import RENDER_ERRORS
+
+logger = logging.getLogger(__name__)
+
+PENDING, SENDING, RETRY, SENT, FAILED = 'pending', 'sending', 'retry', 'sent', 'failed'
+
+
+def is_permanent(error):
+    """Whether a send error will not go away by retrying (a 5xx reply refusing the recipient)."""
+    # Anything else, such as a refused sender, a rejected DATA or bad credentials,
+    # is about our side or this one attempt and must not fail the recipient for good
+    return (isinstance(error, smtplib.SMTPRecipientsRefused)
+            and all(code >= 500 for code, _ in error.recipients.values()))
+
+
+class QueuedRecipient:
+    """A recipient claimed for sending."""
+
+    def __init__(self, address, fields, attempts):
+        self.address = address
+        self.fields = fields
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"QueuedRecipient({self.address!r}, attempts={self.attempts})"
+
+
+class SendQueue:
+    """SQLite-backed outbound queue with per-recipient delivery state."""
+
+    def __init__(self, path, max_attempts=5, backoff=60.0, max_backoff=3600.0, batch_size=100):
+        """
+        Args:
+            path: SQLite file holding the queue (created if missing)
+            max_attempts: Sends tried per recipient before it is marked failed
+            backoff: Seconds before the first retry, doubled for every later one up to max_backoff
+            batch_size: Outcomes buffered before they are committed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self._outcomes = []
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS recipients (
+                campaign TEXT NOT NULL,
+                address TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                queued_at REAL NOT NULL,
+                sent_at REAL,
+                send_seconds REAL,
+                PRIMARY KEY (campaign, address)
+            )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS recipients_due ON recipients (campaign, state, next_attempt)")
+        self.conn.commit()
+
+    def enqueue(self, campaign, recipients):
+        """
+        Add (address, fields) pairs to a campaign, skipping addresses it already has.
+
+        Returns the number of recipients added.
+        """
+        before = self.conn.total_changes
+        now = time.time()
+        batch = []
+        for address, fields in recipients:
+            batch.append((campaign, address, json.dumps(fields), now))
+            if len(batch) >= self.batch_size:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+        return self.conn.total_changes - before
+
+    def _insert(self, batch):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO recipients (campaign, address, fields, queued_at) VALUES (?, ?, ?, ?)", batch)
+
+    def recover(self, campaign):
+        """Put recipients left mid-send by a previous run back to pending. Returns how many."""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE recipients SET state = ? WHERE campaign = ? AND state = ?",
+                (PENDING, campaign, SENDING)).rowcount
+
+    def claim(self, campaign, limit):
+        """Mark up to limit recipients that are due as sending and return them."""
+        self.flush()
+        with self.conn:
+            rows = self.conn.execute(
+                "SELECT rowid, address, fields, attempts FROM recipients"
+                " WHERE campaign = ? AND state IN (?, ?) AND next_attempt <= ?"
+                " ORDER BY next_attempt, rowid LIMIT ?",
+                (campaign, PENDING, RETRY, time.time(), limit)).fetchall()
+            self.conn.executemany("UPDATE recipients SET state = ? WHERE rowid = ?",
+                                  [(SENDING, rowid) for rowid, _, _, _ in rows])
+        return [QueuedRecipient(address, json.loads(fields), attempts) for _, address, fields, attempts in rows]
+
+    def next_retry(self, campaign):
+        """When the earliest waiting retry is due, or None if nothing is waiting."""
+        self.flush()
+        return self.conn.execute(
+            "SELECT MIN(next_attempt) FROM recipients WHERE campaign = ? AND state IN (?, ?)",
+            (campaign, PENDING, RETRY)).fetchone()[0]
+
+    def mark_sent(self, campaign, address, seconds):
+        """Record a delivery (committed with the next batch)."""
+        self._outcomes.append(("UPDATE recipients SET state = ?, attempts = attempts + 1, sent_at = ?,"
+                               " send_seconds = ?, last_error = NULL WHERE campaign = ? AND address = ?",
+                               (SENT, time.time(), seconds, campaign, address)))
+        self._flush_if_full()
+
+    def mark_failed(self, campaign, recipient, error, permanent=False):
+        """Record a failed send: schedule a retry with backoff, or fail the recipient for good."""
+        attempts = recipient.attempts + 1
+        if permanent or attempts >= self.max_attempts:
+            state, next_attempt = FAILED, 0
+        else:
+            state = RETRY
+            next_attempt = time.time() + min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        self._outcomes.append(("UPDATE recipients SET state = ?, attempts = ?, next_attempt = ?, last_error = ?"
+                               " WHERE campaign = ? AND address = ?",
+                               (state, attempts, next_attempt, error, campaign, recipient.address)))
+        self._flush_if_full()
+        return state
+
+    def _flush_if_full(self):
+        if len(self._outcomes) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commit buffered outcomes in one transaction."""
+        if not self._outcomes:
+            return
+        with self.conn:
+            for sql, params in self._outcomes:
+                self.conn.execute(sql, params)
+        self._outcomes = []
+
+    def counts(self, campaign):
+        """Number of recipients in each state."""
+        self.flush()
+        return dict(self.conn.execute(
+            "SELECT state, COUNT(*) FROM recipients WHERE campaign = ? GROUP BY state", (campaign,)))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CampaignStats:
+    """Throughput and per-message latency of one run of a campaign."""
+
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.latencies = []
+        self.started = time.perf_counter()
+        self.elapsed_seconds = 0.0
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def __str__(self):
+        rate = self.sent / self.elapsed_seconds if self.elapsed_seconds else 0.0
+        return (f"Sent {self.sent}, scheduled {self.retried} retries, {self.failed} failed for good, "
+                f"in {self.elapsed_seconds:.1f}s ({rate:.1f} messages/s); send latency "
+                f"p50 {self.percentile(0.5) * 1000:.0f} ms, p95 {self.percentile(0.95) * 1000:.0f} ms, "
+                f"max {max(self.latencies, default=0.0) * 1000:.0f} ms")
+
+
+def send_campaign(queue, campaign, builder, mailer, claim_size=500, wait_for_retries=True):
+    """
+    Send every due recipient of a campaign, resuming wherever an earlier run stopped.
+
+    Recipients are claimed claim_size at a time. Each one is built with
+    builder.build(address, **fields) and sent through the mailer. If
+    wait_for_retries is set, the function then sleeps until scheduled retries
+    are due and sends them too, until nothing is left to retry. Otherwise the
+    retries stay queued for the next run.
+
+    Returns the CampaignStats of this run.
+    """
+    stats = CampaignStats()
+    recovered = queue.recover(campaign)
+    if recovered:
+        logger.warning("Resending %d recipients left mid-send by an earlier run", recovered)
+
+    try:
+        while True:
+            batch = queue.claim(campaign, claim_size)
+            if not batch:
+                due = queue.next_retry(campaign) if wait_for_retries else None
+                if due is None:
+                    break
+                time.sleep(max(due - time.time(), 0))
+                continue
+
+            claimed = {recipient.address: recipient for recipient in batch}
+
+            def record(msg, error, seconds):
+                recipient = claimed[msg['To']]
+                if error is None:
+                    queue.mark_sent(campaign, recipient.address, seconds)
+                    stats.sent += 1
+                    stats.latencies.append(seconds)
+                    return
+                state = queue.mark_failed(campaign, recipient, f"{type(error).__name__}: {error}", is_permanent(error))
+                if state == FAILED:
+                    stats.failed += 1
+                else:
+                    stats.retried += 1
+
+            def messages():
+                for recipient in batch:
+                    try:
+                        yield builder.build(recipient.address, **recipient.fields)
+                    except RENDER_ERRORS as e:
+                        # The row itself is wrong; retrying cannot help
+                        queue.mark_failed(campaign, recipient, f"{type(e).__name__}: {e}", permanent=True)
+                        stats.failed += 1
+
+            mailer.send_all(messages(), on_result=record)
+    finally:
+        # Outcomes of messages already handed to the server must not be lost
+        queue.flush()
+    stats.elapsed_seconds = time.perf_counter() - stats.started
+    return stats
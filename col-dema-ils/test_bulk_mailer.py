@@ -0,0 +1,156 @@
+# Tests for the pooled bulk mailer, run against a local aiosmtpd server.
+#
+# Dependencies:
+# pip install pytest aiosmtpd
+
+import socket
+import time
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from bulk_mailer import BulkMailer, SmtpPool
+
+
+class RecordingHandler:
+    """Keeps every delivered message and counts SMTP sessions."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+        self.refuse = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos[0], envelope.content))
+        return "250 Message accepted"
+
+
+def _authenticator(server, session, envelope, mechanism, auth_data):
+    ok = auth_data.login == b"user" and auth_data.password == b"secret"
+    return AuthResult(success=ok, handled=False)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(handler, port):
+    controller = Controller(handler, hostname="127.0.0.1", port=port,
+                            authenticator=_authenticator, auth_require_tls=False)
+    controller.start()
+    return controller
+
+
+@pytest.fixture
+def smtp_server():
+    controller = _start_server(RecordingHandler(), _free_port())
+    yield controller
+    controller.stop()
+
+
+def _messages(count, start=0):
+    for i in range(start, start + count):
+        msg = EmailMessage()
+        msg["From"] = "sender@example.com"
+        msg["To"] = f"user{i}@example.com"
+        msg["Subject"] = f"Hello {i}"
+        msg.set_content(f"Message {i}")
+        yield msg
+
+
+def _pool(controller, **options):
+    return SmtpPool(controller.hostname, controller.port, "user", "secret", starttls=False, **options)
+
+
+def test_sends_every_message_over_a_few_reused_sessions(smtp_server):
+    with BulkMailer(_pool(smtp_server), workers=4) as mailer:
+        result = mailer.send_all(_messages(100))
+
+    assert result.sent == 100 and result.failures == []
+    assert sorted(to for to, _ in smtp_server.handler.messages) == sorted(f"user{i}@example.com" for i in range(100))
+    # One authenticated session per worker thread, not one per message
+    assert mailer.pool.connections <= 4
+    assert smtp_server.handler.sessions <= 4
+
+
+def test_batches_reuse_the_same_sessions(smtp_server):
+    with BulkMailer(_pool(smtp_server), workers=4) as mailer:
+        for batch in range(5):
+            assert mailer.send_all(_messages(40, start=batch * 40)).sent == 40
+        # Sessions stay open between batches instead of piling up
+        assert len(mailer.pool._sessions) == smtp_server.handler.sessions
+
+    assert len(smtp_server.handler.messages) == 200
+    assert smtp_server.handler.sessions == 4
+
+
+def test_reconnects_after_the_server_drops_the_session():
+    handler, port = RecordingHandler(), _free_port()
+    server = _start_server(handler, port)
+    mailer = BulkMailer(_pool(server), workers=1)
+    assert mailer.send_all(_messages(5)).sent == 5
+
+    # Restart the server: the pooled session is now dead
+    server.stop()
+    server = _start_server(handler, port)
+    try:
+        result = mailer.send_all(_messages(5, start=5))
+        mailer.close()
+    finally:
+        server.stop()
+
+    assert result.sent == 5 and result.failures == []
+    assert mailer.pool.connections == 2
+    assert len(handler.messages) == 10
+
+
+def test_recycles_sessions_after_max_messages(smtp_server):
+    with BulkMailer(_pool(smtp_server, max_messages_per_session=10), workers=1) as mailer:
+        assert mailer.send_all(_messages(25)).sent == 25
+
+    assert mailer.pool.connections == 3
+
+
+def test_rate_limit_is_shared_by_all_workers(smtp_server):
+    with BulkMailer(_pool(smtp_server, rate=50), workers=4) as mailer:
+        started = time.perf_counter()
+        result = mailer.send_all(_messages(20))
+        elapsed = time.perf_counter() - started
+
+    assert result.sent == 20
+    # 20 sends at 50/s need at least 19 intervals of 20ms
+    assert elapsed >= 0.38
+
+
+def test_reports_refused_recipients_and_bad_logins(smtp_server):
+    smtp_server.handler.refuse.add("user3@example.com")
+    with BulkMailer(_pool(smtp_server), workers=2) as mailer:
+        result = mailer.send_all(_messages(6))
+
+    assert result.sent == 5
+    assert [to for to, _ in result.failures] == ["user3@example.com"]
+    assert "SMTPRecipientsRefused" in result.failures[0][1]
+    assert "Sent 5 messages, 1 failed" in str(result)
+
+    bad_login = SmtpPool(smtp_server.hostname, smtp_server.port, "user", "wrong", starttls=False)
+    with BulkMailer(bad_login, workers=1) as mailer:
+        result = mailer.send_all(_messages(1))
+    assert result.sent == 0 and "SMTPAuthenticationError" in result.failures[0][1]
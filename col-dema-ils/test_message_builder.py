@@ -0,0 +1,91 @@
+# Tests for building messages from pre-encoded attachments and compiled templates.
+#
+# Dependencies:
+# pip install pytest
+
+import os
+import re
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+
+import message_builder
+from message_builder import CompiledTemplate, MessageBuilder, encode_file
+
+
+def _legacy_email(subject, message, from_addr, to_addr, attachment):
+    # The MIME tree main.py used to build, re-reading and re-encoding the attachment for every recipient
+    msg = MIMEMultipart()
+    msg['From'] = from_addr
+    msg['To'] = to_addr
+    msg['Subject'] = subject
+    msg.attach(MIMEText(message))
+    with open(attachment, 'rb') as f:
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(f.read())
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', 'attachment; filename="%s"' % os.path.basename(attachment))
+        msg.attach(part)
+    return msg
+
+
+def _normalized(msg):
+    del msg['Date']
+    text = msg.as_string()
+    return text.replace(msg.get_boundary(), 'BOUNDARY')
+
+
+@pytest.mark.parametrize("text", [
+    "Hello {name}!", "<p>{name!r:>12} owes {amount:,.2f}</p>", "{{literal}} {user.upper} {items[0]}",
+    "no fields", "", "{name:{width}}",
+])
+def test_compiled_template_matches_str_format(text):
+    fields = {"name": "Ada", "amount": 1234.5, "user": "ada", "items": ["x", "y"], "width": 6}
+    assert CompiledTemplate(text).render(fields) == text.format(**fields)
+
+
+def test_compiled_template_rejects_positional_fields_and_reports_missing_ones():
+    with pytest.raises(ValueError):
+        CompiledTemplate("Hello {}!")
+    with pytest.raises(KeyError):
+        CompiledTemplate("Hello {name}!").render({})
+
+
+@pytest.mark.parametrize("content", [b"", b"short", b"ends with newline\n", os.urandom(5000), b"x" * 57],
+                         ids=["empty", "short", "newline", "random", "one-line"])
+@pytest.mark.parametrize("threshold", [0, 1 << 20])
+def test_encode_file_matches_encode_base64(tmp_path, monkeypatch, content, threshold):
+    # A threshold of 0 sends every non-empty file through mmap
+    monkeypatch.setattr(message_builder, "MMAP_THRESHOLD", threshold or 1)
+    path = tmp_path / "attachment.bin"
+    path.write_bytes(content)
+
+    part = MIMEBase('application', 'octet-stream')
+    part.set_payload(content)
+    encoders.encode_base64(part)
+    assert encode_file(str(path)) == part.get_payload()
+
+
+def test_messages_match_the_per_recipient_build_and_share_one_encoding(tmp_path):
+    attachment = tmp_path / "attachment.txt"
+    attachment.write_bytes(os.urandom(200_000))
+    template = "<p>Dear {name},</p>\n<p>Your report is attached.</p>\n"
+    builder = MessageBuilder("me@example.com", "Hello {name}!", template, attachments=[str(attachment)])
+
+    expected = {}
+    for name in ("ada", "grace"):
+        expected[name] = _normalized(_legacy_email(
+            'Hello {}!'.format(name), template.format(name=name), "me@example.com",
+            f"{name}@example.com", str(attachment)))
+
+    # The file is not read again once the builder exists
+    attachment.unlink()
+    messages = {name: builder.build(f"{name}@example.com", name=name) for name in ("ada", "grace")}
+
+    assert re.match(r"\w{3}, \d{2} \w{3} \d{4}", messages["ada"]["Date"])
+    for name, msg in messages.items():
+        assert _normalized(msg) == expected[name]
+    assert messages["ada"].get_payload()[1] is messages["grace"].get_payload()[1]
@@ -0,0 +1,98 @@
+# Tests for streaming recipient lists into the message builder and mailer.
+#
+# Dependencies:
+# pip install pytest
+
+import json
+import threading
+import time
+
+import pytest
+
+from bulk_mailer import BulkMailer
+from message_builder import MessageBuilder
+from recipients import read_recipients
+
+
+def _name(address):
+    return {"name": address.split("@")[0]}
+
+
+def test_reads_csv_with_arbitrary_fields(tmp_path):
+    path = tmp_path / "list.csv"
+    # Spreadsheet exports start with a byte order mark
+    path.write_text("\ufeffemail,name,plan,city\n"
+                    "ada@example.com,Ada,pro,London\n"
+                    ",Nobody,free,Paris\n"
+                    "grace@example.com,,team,\"Arlington, VA\"\n"
+                    # A short row: DictReader gives None for the missing cells
+                    "linus@example.com\n", encoding="utf-8")
+
+    assert list(read_recipients(str(path), defaults=_name)) == [
+        ("ada@example.com", {"name": "Ada", "email": "ada@example.com", "plan": "pro", "city": "London"}),
+        ("grace@example.com", {"name": "grace", "email": "grace@example.com", "plan": "team",
+                               "city": "Arlington, VA"}),
+        ("linus@example.com", {"name": "linus", "email": "linus@example.com", "plan": "", "city": ""}),
+    ]
+
+
+def test_reads_jsonl_and_skips_bad_lines(tmp_path, caplog):
+    path = tmp_path / "list.jsonl"
+    path.write_text(json.dumps({"address": "ada@example.com", "orders": [1, 2], "vip": True}) + "\n"
+                    "\n"
+                    "{not json\n"
+                    "[1, 2]\n"
+                    + json.dumps({"address": "grace@example.com"}) + "\n", encoding="utf-8")
+
+    assert list(read_recipients(str(path), address_field="address", defaults=_name)) == [
+        ("ada@example.com", {"name": "ada", "address": "ada@example.com", "orders": [1, 2], "vip": True}),
+        ("grace@example.com", {"name": "grace", "address": "grace@example.com"}),
+    ]
+    assert "list.jsonl:3: invalid JSON" in caplog.text and "list.jsonl:4: not a JSON object" in caplog.text
+
+    with pytest.raises(ValueError):
+        list(read_recipients(str(tmp_path / "list.xlsx")))
+
+
+class SlowPool:
+    """Stands in for SmtpPool; records how far ahead of the senders the list has been read."""
+
+    def __init__(self, read):
+        self.read = read
+        self.sent = 0
+        self.ahead = []
+        self._lock = threading.Lock()
+
+    def send(self, msg):
+        time.sleep(0.001)
+        with self._lock:
+            self.sent += 1
+            self.ahead.append(self.read[0] - self.sent)
+
+    def close(self):
+        pass
+
+
+def test_renders_lazily_with_bounded_buffering(tmp_path):
+    path = tmp_path / "list.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("email,first,balance\n")
+        for i in range(2000):
+            f.write(f"user{i}@example.com,User {i},{i * 1.5}\n")
+    read = [0]
+
+    def counted(rows):
+        for row in rows:
+            read[0] += 1
+            yield row
+
+    builder = MessageBuilder("me@example.com", "Hi {first}", "Your balance is {balance}.\n")
+    pool = SlowPool(read)
+    with BulkMailer(pool, workers=4, max_pending=16) as mailer:
+        result = mailer.send_all(builder.build(address, **fields)
+                                 for address, fields in counted(read_recipients(str(path))))
+
+    assert result.sent == 2000
+    # Rows read but not yet sent never exceed the mailer's bound
+    assert max(pool.ahead) <= 16
+
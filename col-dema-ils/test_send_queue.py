@@ -0,0 +1,168 @@
+# Tests for the durable send queue and resumable campaigns.
+#
+# Dependencies:
+# pip install pytest
+
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+import send_queue
+from message_builder import MessageBuilder
+from send_queue import SendQueue, is_permanent, send_campaign
+
+
+class Builder:
+    def build(self, to_addr, **fields):
+        msg = EmailMessage()
+        msg['To'] = to_addr
+        msg.set_content(f"Hi {fields['name']}")
+        return msg
+
+
+class ScriptedMailer:
+    """Stands in for BulkMailer: fails the addresses it is told to, delivers the rest."""
+
+    def __init__(self, failures=None, crash_after=None):
+        self.failures = failures or {}
+        self.crash_after = crash_after
+        self.delivered = []
+
+    def send_all(self, messages, on_result=None):
+        for msg in messages:
+            if self.crash_after is not None and len(self.delivered) >= self.crash_after:
+                raise KeyboardInterrupt
+            errors = self.failures.get(msg['To'])
+            if errors:
+                on_result(msg, errors.pop(0), 0.01)
+            else:
+                self.delivered.append(msg['To'])
+                on_result(msg, None, 0.02)
+
+
+def _recipients(count):
+    return [(f"user{i}@example.com", {"name": f"user{i}"}) for i in range(count)]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with SendQueue(str(tmp_path / "outbox.sqlite3"), backoff=0.01, batch_size=7) as queue:
+        yield queue
+
+
+def test_sends_each_recipient_once_and_reports(queue):
+    assert queue.enqueue("spring", _recipients(20)) == 20
+    # Enqueuing the same list again adds nobody
+    assert queue.enqueue("spring", _recipients(25)) == 5
+
+    mailer = ScriptedMailer()
+    stats = send_campaign(queue, "spring", Builder(), mailer, claim_size=6)
+
+    assert sorted(mailer.delivered) == sorted(address for address, _ in _recipients(25))
+    assert queue.counts("spring") == {"sent": 25}
+    assert stats.sent == 25 and stats.failed == 0
+    assert "Sent 25" in str(stats) and "p95 20 ms" in str(stats)
+
+    # Nothing is left to send on a rerun
+    assert send_campaign(queue, "spring", Builder(), ScriptedMailer()).sent == 0
+
+
+def test_resumes_after_a_crash_without_resending_committed_deliveries(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    queue = SendQueue(path, batch_size=5)
+    queue.enqueue("spring", _recipients(30))
+    crashing = ScriptedMailer(crash_after=12)
+    with pytest.raises(KeyboardInterrupt):
+        send_campaign(queue, "spring", Builder(), crashing, claim_size=10)
+    queue.conn.close()
+
+    with SendQueue(path, batch_size=5) as queue:
+        assert queue.counts("spring") == {"sent": 12, "sending": 8, "pending": 10}
+        mailer = ScriptedMailer()
+        send_campaign(queue, "spring", Builder(), mailer)
+        assert queue.counts("spring") == {"sent": 30}
+
+    assert not set(crashing.delivered) & set(mailer.delivered)
+    assert len(crashing.delivered) + len(mailer.delivered) == 30
+
+
+def test_retries_with_exponential_backoff_then_gives_up(queue, monkeypatch):
+    queue.max_attempts = 3
+    queue.enqueue("spring", _recipients(3))
+    busy = smtplib.SMTPResponseException(451, b"try later")
+    mailer = ScriptedMailer(failures={
+        "user0@example.com": [busy],
+        "user1@example.com": [busy, busy, busy],
+        "user2@example.com": [smtplib.SMTPRecipientsRefused({"user2@example.com": (550, b"no such user")})],
+    })
+    # A fake clock: sleeping advances it instead of waiting
+    sleeps, clock = [], [send_queue.time.time()]
+    monkeypatch.setattr(send_queue.time, "time", lambda: clock[0])
+
+    def advance(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(send_queue.time, "sleep", advance)
+    stats = send_campaign(queue, "spring", Builder(), mailer)
+
+    assert mailer.delivered == ["user0@example.com"]
+    assert queue.counts("spring") == {"sent": 1, "failed": 2}
+    assert (stats.sent, stats.retried, stats.failed) == (1, 3, 2)
+    # Waits of 10 ms then 20 ms: the backoff doubles per attempt
+    assert sleeps == pytest.approx([0.01, 0.02])
+    attempts, error = queue.conn.execute(
+        "SELECT attempts, last_error FROM recipients WHERE address = 'user2@example.com'").fetchone()
+    assert attempts == 1 and "no such user" in error
+
+
+def test_sender_and_message_rejections_are_retried(queue, monkeypatch):
+    queue.enqueue("spring", _recipients(3))
+    mailer = ScriptedMailer(failures={
+        "user0@example.com": [smtplib.SMTPSenderRefused(553, b"relay quota exceeded", "me@example.com")],
+        "user1@example.com": [smtplib.SMTPDataError(554, b"transaction failed")],
+    })
+    monkeypatch.setattr(send_queue.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(queue, "backoff", 0.0)
+    stats = send_campaign(queue, "spring", Builder(), mailer)
+
+    assert sorted(mailer.delivered) == ["user0@example.com", "user1@example.com", "user2@example.com"]
+    assert queue.counts("spring") == {"sent": 3}
+    assert (stats.retried, stats.failed) == (2, 0)
+
+
+def test_leaves_retries_queued_when_not_waiting(queue):
+    queue.enqueue("spring", _recipients(2))
+    mailer = ScriptedMailer(failures={"user1@example.com": [smtplib.SMTPServerDisconnected("gone")]})
+    send_campaign(queue, "spring", Builder(), mailer, wait_for_retries=False)
+
+    assert queue.counts("spring") == {"sent": 1, "retry": 1}
+    # Other campaigns in the same file are independent
+    assert queue.counts("autumn") == {}
+
+
+def test_fails_recipients_whose_fields_do_not_fit_the_template(queue):
+    queue.enqueue("spring", [
+        ("ada@example.com", {"name": "Ada", "plan": "pro"}),
+        ("bob@example.com", {"name": "Bob"}),
+        ("cy@example.com", {"name": "Cy", "plan": "free", "to_addr": "not a keyword clash"}),
+    ])
+    mailer = ScriptedMailer()
+    builder = MessageBuilder("me@example.com", "Hi {name}", "Plan: {plan}\n")
+    stats = send_campaign(queue, "spring", builder, mailer)
+
+    assert mailer.delivered == ["ada@example.com", "cy@example.com"]
+    assert queue.counts("spring") == {"sent": 2, "failed": 1}
+    assert stats.failed == 1
+
+
+def test_permanent_errors():
+    assert is_permanent(smtplib.SMTPRecipientsRefused({"a@x": (550, b"unknown")}))
+    assert not is_permanent(smtplib.SMTPRecipientsRefused({"a@x": (450, b"mailbox busy")}))
+    # A 5xx for the sender or the message is not the recipient's fault
+    assert not is_permanent(smtplib.SMTPSenderRefused(553, b"sender not allowed", "me@example.com"))
+    assert not is_permanent(smtplib.SMTPDataError(554, b"rejected"))
+    assert not is_permanent(smtplib.SMTPDataError(452, b"insufficient storage"))
+    assert not is_permanent(smtplib.SMTPAuthenticationError(535, b"bad credentials"))
+    assert not is_permanent(ConnectionResetError())
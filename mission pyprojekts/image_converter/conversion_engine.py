@@ -0,0 +1,108 @@
+# Conversion engine for large image folders.
+#
+# Streams the input folder with os.scandir and converts files in a process pool
+# through the stages in pipeline.py. Only a bounded number of chunks are in flight
+# at once, so memory stays flat no matter how many files the folder holds.
+# Instead of printing per file, the engine returns a ConversionSummary with
+# counts, failures and throughput.
+#
+# With incremental=True, a ConversionManifest in the output folder records what was
+# converted from what. Unchanged sources are skipped, and with delete_orphans=True
+# the outputs of sources that have since disappeared are removed. Each source's
+# output is looked up when the source is checked, so the output folder is never walked.
+#
+# How images are decoded and encoded is set by a ConversionProfile (see profiles.py).
+# Sources that would overwrite each other's output (a.jpg and a.png) are reported as
+# failures rather than converted.
+
+import os
+import time
+from typing import Callable, Iterator, Optional, Sequence
+
+from PIL import Image
+
+from manifest import ConversionManifest
+from pipeline import (JPEG_PATTERNS, ConversionSummary, FolderSink, FolderSource, ImageJob, Pipeline, claim_outputs,
+                      stages_for_profile)
+from profiles import PROFILES, ConversionProfile
+
+
+def convert_folder(input_folder_path_dir: str, output_folder_path_dir: str, workers: Optional[int] = None,
+                   max_pending: Optional[int] = None,
+                   progress: Optional[Callable[[ConversionSummary], None]] = None,
+                   progress_every: int = 1000, incremental: bool = False,
+                   delete_orphans: bool = False,
+                   profile: ConversionProfile = PROFILES['legacy'], recursive: bool = False,
+                   patterns: Sequence[str] = JPEG_PATTERNS,
+                   transforms: Sequence[Callable[[Image.Image], Image.Image]] = (),
+                   chunk_size: int = 16) -> ConversionSummary:
+    """
+    Convert every matching image in a folder using all cores.
+
+    Args:
+        input_folder_path_dir: Folder containing the images
+        output_folder_path_dir: Folder the converted files are written to (created if missing)
+        workers: Worker processes (defaults to the number of CPUs)
+        max_pending: Chunks in flight at once (defaults to 2 per worker)
+        progress: Called with the running summary every progress_every files
+        progress_every: Number of files between progress callbacks
+        incremental: Skip sources that are unchanged since the last incremental run
+        delete_orphans: In incremental mode, delete outputs whose source is gone
+        profile: Decode and encode settings; the default converts to full-size RGBA PNG
+        recursive: Also convert images in nested folders, mirroring them in the output
+        patterns: Case-insensitive file name patterns of the images to convert
+        transforms: Extra transforms (e.g. pipeline.StripExif()), run after the profile's;
+            incremental runs need them to have a stable repr, as the pipeline's own do
+        chunk_size: Files sent to a worker at once
+
+    Returns:
+        A ConversionSummary of the run
+    """
+    os.makedirs(output_folder_path_dir, exist_ok=True)
+    sink = FolderSink(output_folder_path_dir)
+    stages = stages_for_profile(profile, sink, transforms, hash_source=incremental)
+    pipeline = Pipeline(stages, workers, chunk_size, max_pending)
+    source = FolderSource(input_folder_path_dir, tuple(patterns), recursive, with_stat=incremental)
+
+    summary = ConversionSummary()
+    started = time.perf_counter()
+    manifest = ConversionManifest(output_folder_path_dir, stages.signature) if incremental else None
+
+    def report():
+        summary.elapsed_seconds = time.perf_counter() - started
+        if progress and (summary.converted + summary.failed + summary.skipped) % progress_every == 0:
+            progress(summary)
+
+    def jobs_to_run() -> Iterator[ImageJob]:
+        for job in claim_outputs(source, sink, stages.encode.extension):
+            if manifest is not None and job.error is None:
+                up_to_date, job.known_hash = manifest.check(job.relative_path, job.stat)
+                if up_to_date:
+                    summary.skipped += 1
+                    report()
+                    continue
+            yield job
+
+    try:
+        for job in pipeline.results(jobs_to_run()):
+            summary.add(job)
+            if manifest is not None and job.error is None:
+                manifest.record(job.relative_path, job.stat, job.digest,
+                                sink.output_relative_path(job, stages.encode.extension))
+            report()
+
+        if manifest is not None and delete_orphans:
+            for name, output_name in list(manifest.orphans()):
+                if output_name is not None:
+                    try:
+                        os.remove(os.path.join(output_folder_path_dir, output_name))
+                        summary.deleted += 1
+                    except FileNotFoundError:
+                        pass
+                manifest.forget(name)
+    finally:
+        if manifest is not None:
+            manifest.save()
+
+    summary.elapsed_seconds = time.perf_counter() - started
+    return summary
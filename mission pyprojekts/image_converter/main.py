@@ -1,37 +1,31 @@
 # This program will convert all the JPEG images in a given folder to PNG format and save them in a different folder.
 
-from PIL import Image
-import os
+from conversion_engine import convert_folder
+from profiles import PROFILES
 
-def convert_jpeg_images_to_png(input_folder_path_dir, output_folder_path_dir):
-    # Create the output folder if it doesn't already exist
-    if not os.path.exists(output_folder_path_dir):
-        os.makedirs(output_folder_path_dir)
-
-    # Loop through all the files in the input folder
-    for filename in os.listdir(input_folder_path_dir):
-        # Check if the file is a JPEG image
-        if filename.lower().endswith(('.jpg', '.jpeg')):
-            # Get the paths to the JPEG file and the PNG file that will be created
-            jpeg_file_path = os.path.join(input_folder_path_dir, filename)
-            png_file_path = os.path.join(output_folder_path_dir, os.path.splitext(filename)[0] + '.png')
-
-            # Attempt to open the JPEG image and convert it to PNG
-            try:
-                with Image.open(jpeg_file_path) as img:
-                    # Convert the image to RGBA format which supports transparency
-                    img = img.convert('RGBA')
-                    img.save(png_file_path, 'png')
-                # Print a message to indicate that the file has been converted
-                print(f"Converted {jpeg_file_path} to {png_file_path}")
-            except Exception as e:
-                # Print an error message if there is a problem
-                print(f"Error converting {jpeg_file_path}: {e}")
+def convert_jpeg_images_to_png(input_folder_path_dir, output_folder_path_dir, workers=None, progress=None,
+                               incremental=False, delete_orphans=False, profile='legacy', **pipeline_options):
+    # Stream the input folder and convert the images on all cores; returns a ConversionSummary
+    # with the number of converted files, the (path, error) of every failure and the throughput.
+    # In incremental mode, files unchanged since the last run are skipped and, with
+    # delete_orphans, PNGs whose JPEG was removed are deleted.
+    # The profile picks the output: 'legacy' (RGBA PNG), 'rgb', 'fast', 'thumbnail' or 'webp-lossless'.
+    # With the defaults this is the JPEG -> PNG preset of the pipeline in pipeline.py; pipeline_options
+    # (recursive, patterns, transforms, chunk_size) turn it into a nested, multi-format conversion
+    return convert_folder(input_folder_path_dir, output_folder_path_dir, workers=workers, progress=progress,
+                          incremental=incremental, delete_orphans=delete_orphans, profile=PROFILES[profile],
+                          **pipeline_options)
 
 if __name__ == "__main__":
     # Get the input and output folder paths from the user
     input_folder_path = input("Enter the path to the folder containing JPEG images: ").strip()
     output_folder_path = input("Enter the path to the folder where PNG images will be saved: ").strip()
+    profile = input(f"Conversion profile ({', '.join(PROFILES)}) [legacy]: ").strip() or 'legacy'
+    incremental = input("Skip images converted by a previous run? [y/N]: ").strip().lower() == 'y'
 
-    # Call the function to convert the images
-    convert_jpeg_images_to_png(input_folder_path, output_folder_path)
\ No newline at end of file
+    # Call the function to convert the images, printing throughput as it goes
+    summary = convert_jpeg_images_to_png(input_folder_path, output_folder_path, progress=print,
+                                         incremental=incremental, delete_orphans=incremental, profile=profile)
+    print(summary)
+    for jpeg_file_path, error in summary.failures:
+        print(f"Error converting {jpeg_file_path}: {error}")
@@ -0,0 +1,95 @@
+# Manifest of converted files for incremental runs.
+#
+# The manifest lives in the output folder. It maps each source path (relative to the
+# input folder) to the mtime, size and SHA-256 of the source it was converted from,
+# the output path and a signature of the conversion settings used. Changing the
+# profile or transforms therefore reconverts everything.
+# A file whose mtime and size still match is skipped without being read. A file
+# that was touched but whose content hash is unchanged is skipped too; only its
+# manifest entry is refreshed.
+# The manifest is saved every SAVE_EVERY recorded conversions as well as at the
+# end of a run, so a killed run loses at most that many entries.
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MANIFEST_NAME = '.conversion-manifest.json'
+SAVE_EVERY = 1000
+
+
+def file_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ConversionManifest:
+    """Source fingerprints of the files already converted into an output folder."""
+
+    def __init__(self, output_folder_path_dir: str, signature: str = '', save_every: Optional[int] = None):
+        self.folder = output_folder_path_dir
+        self.path = os.path.join(output_folder_path_dir, MANIFEST_NAME)
+        self.signature = signature
+        # Recorded conversions between saves (defaults to SAVE_EVERY)
+        self.save_every = save_every or SAVE_EVERY
+        self._unsaved = 0
+        # source path -> [mtime_ns, size, sha256, output path, signature]
+        self.entries: Dict[str, List] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        self.seen = set()
+
+    def check(self, name: str, stat: os.stat_result) -> Tuple[bool, Optional[str]]:
+        """
+        Decide whether a source file needs converting.
+
+        Args:
+            name: Source path relative to the input folder
+            stat: Result of stat() on the source file
+
+        Returns:
+            Whether the file is up to date, and the hash it was last converted
+            from (None if it was never converted with these settings or its output
+            is missing)
+        """
+        self.seen.add(name)
+        entry = self.entries.get(name)
+        if (entry is None or entry[4:] != [self.signature]
+                or not os.path.isfile(os.path.join(self.folder, entry[3]))):
+            return False, None
+        if entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return True, entry[2]
+        return False, entry[2]
+
+    def record(self, name: str, stat: os.stat_result, digest: str, output_name: str):
+        """Remember that a source file with this fingerprint was converted to output_name."""
+        self.entries[name] = [stat.st_mtime_ns, stat.st_size, digest, output_name, self.signature]
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def orphans(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Yield (source name, output name) for sources not seen during this run.
+
+        The output name is None when a source that still exists converts to the
+        same output, so that output must be kept.
+        """
+        live_outputs = {self.entries[name][3] for name in self.seen if name in self.entries}
+        for name, entry in self.entries.items():
+            if name not in self.seen:
+                yield name, (None if entry[3] in live_outputs else entry[3])
+
+    def forget(self, name: str):
+        """Drop a source file from the manifest."""
+        self.entries.pop(name, None)
+
+    def save(self):
+        """Write the manifest atomically."""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+        self._unsaved = 0
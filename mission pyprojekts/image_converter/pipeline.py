@@ -0,0 +1,375 @@
+# Generator-based image conversion pipeline.
+#
+#   source -> decode -> transforms -> encode -> sink
+#
+# A source is any iterable of ImageJobs, such as FolderSource (a recursive scandir
+# walk) or GlobSource. It is consumed lazily and cut into chunks of chunk_size jobs.
+# Each chunk is decoded, transformed, encoded and written by one worker process.
+# Fusing the CPU stages per chunk means pixels never travel between processes:
+# only the small job records are pickled. At most max_pending chunks are in flight,
+# and Pipeline.results only submits more work as its caller consumes results. A
+# slow consumer therefore throttles the source instead of letting work pile up.
+#
+# Two sources that differ only in their extension would be written to the same output;
+# wrapping the source in claim_outputs turns every such collision into a failed job.
+#
+# Stages are small frozen dataclasses, so they pickle to the workers and their
+# repr can serve as a signature for incremental runs. Any picklable callable that
+# takes and returns a PIL image can be used as a transform.
+
+import fnmatch
+import glob
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from manifest import file_hash
+from profiles import PROFILES, ConversionProfile
+
+JPEG_PATTERNS = ('*.jpg', '*.jpeg')
+IMAGE_PATTERNS = JPEG_PATTERNS + ('*.png', '*.webp', '*.gif', '*.bmp', '*.tif', '*.tiff')
+
+# Modes PNG and WebP cannot store; these are converted to RGB even when the mode is kept
+_UNSAVEABLE_MODES = ('CMYK', 'YCbCr', 'LAB', 'HSV')
+
+
+@dataclass
+class ImageJob:
+    """One source file moving through the pipeline."""
+    source_path: str
+    # Path relative to the source root; the output keeps the same relative location
+    relative_path: str
+    stat: Optional[os.stat_result] = None
+    # Hash the existing output was converted from; the file is skipped if it still matches
+    known_hash: Optional[str] = None
+    # Filled in by the stages
+    digest: Optional[str] = None
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    unchanged: bool = False
+
+
+@dataclass
+class ConversionSummary:
+    """Outcome of converting a folder."""
+    converted: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+    @property
+    def files_per_second(self) -> float:
+        processed = self.converted + self.failed + self.skipped
+        return processed / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def add(self, job: ImageJob):
+        """Count a job that came out of the pipeline."""
+        if job.error is not None:
+            self.failures.append((job.source_path, job.error))
+        elif job.unchanged:
+            self.skipped += 1
+        else:
+            self.converted += 1
+
+    def __str__(self):
+        return (f"Converted {self.converted} files, {self.failed} failed, {self.skipped} unchanged, "
+                f"{self.deleted} orphans deleted, in {self.elapsed_seconds:.1f}s ({self.files_per_second:.1f} files/s)")
+
+
+# Sources
+
+def _matches(name: str, patterns: Sequence[str]) -> bool:
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+@dataclass(frozen=True)
+class FolderSource:
+    """Files under root whose name matches one of the patterns (case-insensitive)."""
+    root: str
+    patterns: Tuple[str, ...] = JPEG_PATTERNS
+    recursive: bool = True
+    # Whether to stat each file (needed for incremental runs)
+    with_stat: bool = False
+
+    def __iter__(self) -> Iterator[ImageJob]:
+        folders = [self.root]
+        while folders:
+            folder = folders.pop()
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    # Symlinked folders are not followed, so a link back to an ancestor cannot loop forever
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.recursive:
+                            folders.append(entry.path)
+                    elif _matches(entry.name, self.patterns) and entry.is_file():
+                        yield ImageJob(entry.path, os.path.relpath(entry.path, self.root),
+                                       entry.stat() if self.with_stat else None)
+
+
+@dataclass(frozen=True)
+class GlobSource:
+    """Files matching a glob pattern relative to root; ** matches nested folders."""
+    root: str
+    pattern: str = '**/*.jpg'
+
+    def __iter__(self) -> Iterator[ImageJob]:
+        for path in glob.iglob(os.path.join(glob.escape(self.root), self.pattern), recursive=True):
+            if os.path.isfile(path):
+                yield ImageJob(path, os.path.relpath(path, self.root))
+
+
+# Decode
+
+@dataclass(frozen=True)
+class Decode:
+    """Read and decode a source file."""
+    # Decode JPEGs at a reduced scale that still covers this size
+    draft_size: Optional[Tuple[int, int]] = None
+    draft_mode: Optional[str] = None
+    # Hash the source bytes, skipping the job if they match job.known_hash
+    hash_source: bool = False
+
+    def __call__(self, job: ImageJob) -> Optional[Image.Image]:
+        with open(job.source_path, 'rb') as f:
+            data = f.read()
+        if self.hash_source:
+            job.digest = file_hash(data)
+            if job.digest == job.known_hash:
+                job.unchanged = True
+                return None
+        img = Image.open(io.BytesIO(data))
+        if self.draft_size is not None:
+            # Only JPEG supports draft mode; other formats ignore it
+            img.draft(self.draft_mode, self.draft_size)
+        img.load()
+        return img
+
+
+# Transforms
+
+@dataclass(frozen=True)
+class Resize:
+    """Shrink to fit within max_size, keeping the aspect ratio; never enlarges."""
+    max_size: Tuple[int, int]
+
+    def __call__(self, img: Image.Image) -> Image.Image:
+        img.thumbnail(self.max_size)
+        return img
+
+
+@dataclass(frozen=True)
+class ConvertMode:
+    """Convert to a mode; None keeps the mode unless the encoders cannot store it."""
+    mode: Optional[str] = None
+
+    def __call__(self, img: Image.Image) -> Image.Image:
+        if self.mode is not None:
+            return img.convert(self.mode)
+        if img.mode in _UNSAVEABLE_MODES:
+            return img.convert('RGB')
+        return img
+
+
+@dataclass(frozen=True)
+class StripExif:
+    """Drop EXIF and XMP metadata so the encoder does not carry it over."""
+
+    def __call__(self, img: Image.Image) -> Image.Image:
+        for key in ('exif', 'xmp', 'XML:com.adobe.xmp'):
+            img.info.pop(key, None)
+        return img
+
+
+# Encode
+
+@dataclass(frozen=True)
+class Encode:
+    """Encode to bytes in a format."""
+    format: str = 'PNG'
+    options: Tuple[Tuple[str, object], ...] = ()
+    # Carry EXIF metadata over to the output if the source had any
+    keep_exif: bool = True
+
+    @property
+    def extension(self) -> str:
+        return '.' + self.format.lower()
+
+    def __call__(self, img: Image.Image) -> bytes:
+        options = dict(self.options)
+        if self.keep_exif and 'exif' in img.info:
+            options['exif'] = img.info['exif']
+        buffer = io.BytesIO()
+        img.save(buffer, self.format, **options)
+        return buffer.getvalue()
+
+
+# Sink
+
+@dataclass(frozen=True)
+class FolderSink:
+    """Write outputs under root, mirroring the source's relative paths."""
+    root: str
+
+    def output_relative_path(self, job: ImageJob, extension: str) -> str:
+        return os.path.splitext(job.relative_path)[0] + extension
+
+    def __call__(self, job: ImageJob, data: bytes, extension: str) -> str:
+        path = os.path.join(self.root, self.output_relative_path(job, extension))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+def claim_outputs(jobs: Iterable[ImageJob], sink: FolderSink, extension: str) -> Iterator[ImageJob]:
+    """
+    Pass jobs through, failing any whose output another job already writes.
+
+    Sources that differ only in their extension, such as a.jpg and a.png, map to
+    the same output. The first one seen keeps it; the others get an error and are
+    not converted, instead of silently overwriting it.
+    """
+    claimed = {}
+    for job in jobs:
+        output_name = sink.output_relative_path(job, extension)
+        first = claimed.setdefault(output_name, job.source_path)
+        if first != job.source_path:
+            job.error = f"Output {output_name} is already written from {first}"
+        yield job
+
+
+@dataclass(frozen=True)
+class PipelineStages:
+    """Everything a worker runs for each job."""
+    decode: Decode = Decode()
+    transforms: Tuple[Callable[[Image.Image], Image.Image], ...] = ()
+    encode: Encode = Encode()
+    sink: Optional[FolderSink] = None
+
+    @property
+    def signature(self) -> str:
+        """A string that changes whenever the output would change; used by incremental runs."""
+        return repr((self.transforms, self.encode, self.decode.draft_size, self.decode.draft_mode))
+
+
+def stages_for_profile(profile: ConversionProfile, sink: FolderSink,
+                       transforms: Sequence[Callable[[Image.Image], Image.Image]] = (),
+                       hash_source: bool = False) -> PipelineStages:
+    """
+    Build the stages that convert files according to a ConversionProfile.
+
+    Args:
+        profile: Decode and encode settings
+        sink: Where outputs are written
+        transforms: Extra transforms, run after the profile's resize and mode conversion
+        hash_source: Whether the decoder hashes sources for incremental runs
+
+    Returns:
+        The pipeline stages
+    """
+    steps = []
+    draft_size = draft_mode = None
+    if profile.max_size is not None:
+        draft_size = profile.max_size
+        draft_mode = profile.mode if profile.mode in ('RGB', 'L') else None
+        steps.append(Resize(profile.max_size))
+    steps.append(ConvertMode(profile.mode))
+    steps.extend(transforms)
+    return PipelineStages(
+        decode=Decode(draft_size, draft_mode, hash_source),
+        transforms=tuple(steps),
+        encode=Encode(profile.format, tuple(profile.save_options().items()), keep_exif=False),
+        sink=sink,
+    )
+
+
+def run_chunk(jobs: List[ImageJob], stages: PipelineStages) -> List[ImageJob]:
+    """Decode, transform, encode and write a chunk of jobs; runs in a worker process."""
+    for job in jobs:
+        if job.error is not None:
+            continue
+        try:
+            img = stages.decode(job)
+            if img is None:
+                continue
+            for transform in stages.transforms:
+                img = transform(img)
+            job.output_path = stages.sink(job, stages.encode(img), stages.encode.extension)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+    return jobs
+
+
+class Pipeline:
+    """Runs stages over a stream of jobs in a process pool."""
+
+    def __init__(self, stages: PipelineStages, workers: Optional[int] = None, chunk_size: int = 16,
+                 max_pending: Optional[int] = None):
+        """
+        Args:
+            stages: What each worker runs for each job
+            workers: Worker processes (defaults to the number of CPUs)
+            chunk_size: Jobs sent to a worker at once
+            max_pending: Chunks in flight at once (defaults to 2 per worker)
+        """
+        self.stages = stages
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or self.workers * 2
+
+    def results(self, jobs: Iterable[ImageJob]) -> Iterator[ImageJob]:
+        """Yield each job once it has been through every stage, in completion order."""
+        jobs = iter(jobs)
+        pending = set()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                while len(pending) < self.max_pending:
+                    chunk = list(islice(jobs, self.chunk_size))
+                    if not chunk:
+                        break
+                    pending.add(executor.submit(run_chunk, chunk, self.stages))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+    def run(self, jobs: Iterable[ImageJob], progress: Optional[Callable[[ConversionSummary], None]] = None,
+            progress_every: int = 1000) -> ConversionSummary:
+        """
+        Run every job and summarize the outcome.
+
+        Args:
+            jobs: Source of jobs, e.g. a FolderSource
+            progress: Called with the running summary every progress_every files
+            progress_every: Number of files between progress callbacks
+
+        Returns:
+            A ConversionSummary of the run
+        """
+        summary = ConversionSummary()
+        started = time.perf_counter()
+        for count, job in enumerate(self.results(jobs), 1):
+            summary.add(job)
+            summary.elapsed_seconds = time.perf_counter() - started
+            if progress and count % progress_every == 0:
+                progress(summary)
+        summary.elapsed_seconds = time.perf_counter() - started
+        return summary
+
+
+def default_stages(output_folder_path_dir: str) -> PipelineStages:
+    """The stages of convert_jpeg_images_to_png: full-size RGBA PNG."""
+    return stages_for_profile(PROFILES['legacy'], FolderSink(output_folder_path_dir))
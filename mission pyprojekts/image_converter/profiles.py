@@ -0,0 +1,50 @@
+# Conversion profiles: what a source image is decoded to and how it is encoded.
+#
+# The "legacy" profile reproduces the original converter, which produced a
+# full-size RGBA PNG. The other profiles keep the decoded RGB mode, because a JPEG
+# never has an alpha channel. The thumbnail profile uses JPEG draft mode, so the
+# decoder produces a 1/2, 1/4 or 1/8 scale image directly instead of decoding the
+# full image and shrinking it afterwards.
+#
+# pipeline.stages_for_profile turns a profile into pipeline stages.
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ConversionProfile:
+    """Decode and encode settings for a conversion."""
+    format: str = 'PNG'
+    # Mode to convert to; None keeps the decoded mode
+    mode: Optional[str] = 'RGBA'
+    # Largest output size; the aspect ratio is kept and images are never enlarged
+    max_size: Optional[Tuple[int, int]] = None
+    # PNG zlib level: 0 (none) to 9 (smallest); 1 is much faster than the default 6 but larger
+    compress_level: int = 6
+    # WebP settings; with lossless=True, quality is the compression effort rather than fidelity
+    lossless: bool = True
+    quality: int = 80
+    method: int = 4
+
+    @property
+    def extension(self) -> str:
+        return '.' + self.format.lower()
+
+    def save_options(self) -> Dict:
+        """Keyword arguments for Image.save."""
+        if self.format == 'PNG':
+            return {'compress_level': self.compress_level}
+        if self.format == 'WEBP':
+            return {'lossless': self.lossless, 'quality': self.quality, 'method': self.method}
+        return {}
+
+
+PROFILES = {
+    'legacy': ConversionProfile(),
+    'rgb': ConversionProfile(mode=None),
+    'fast': ConversionProfile(mode=None, compress_level=1),
+    'thumbnail': ConversionProfile(mode=None, max_size=(256, 256), compress_level=1),
+    # Low effort is an order of magnitude faster than the defaults at a similar size
+    'webp-lossless': ConversionProfile(format='WEBP', mode=None, quality=25, method=0),
+}
@@ -0,0 +1,179 @@
+# Behaviour tests for the folder conversion engine and its pipeline.
+#
+# Dependencies:
+# pip install pytest Pillow
+
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from conversion_engine import convert_folder
+import manifest
+from manifest import MANIFEST_NAME
+from pipeline import IMAGE_PATTERNS
+from profiles import PROFILES
+
+
+def _jpeg(path, size=(640, 480), color=(200, 40, 90)):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', size, color).save(path, 'JPEG')
+    return path
+
+
+def _convert(source, output, **options):
+    return convert_folder(str(source), str(output), workers=1, **options)
+
+
+def _manifest(output):
+    with open(os.path.join(output, MANIFEST_NAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('name, expected_format, expected_mode, max_size', [
+    ('legacy', 'PNG', 'RGBA', None),
+    ('rgb', 'PNG', 'RGB', None),
+    ('fast', 'PNG', 'RGB', None),
+    ('thumbnail', 'PNG', 'RGB', (256, 256)),
+    ('webp-lossless', 'WEBP', 'RGB', None),
+])
+def test_each_profile_writes_its_format_and_mode(tmp_path, name, expected_format, expected_mode, max_size):
+    _jpeg(str(tmp_path / 'in' / 'photo.jpg'))
+    summary = _convert(tmp_path / 'in', tmp_path / 'out', profile=PROFILES[name])
+
+    assert (summary.converted, summary.failed) == (1, 0)
+    output = tmp_path / 'out' / ('photo' + PROFILES[name].extension)
+    with Image.open(output) as img:
+        assert img.format == expected_format
+        assert img.mode == expected_mode
+        if max_size is None:
+            assert img.size == (640, 480)
+        else:
+            assert img.width <= max_size[0] and img.height <= max_size[1]
+            # The aspect ratio is kept
+            assert img.size == (256, 192)
+
+
+def test_incremental_skips_sources_whose_content_is_unchanged(tmp_path):
+    source = _jpeg(str(tmp_path / 'in' / 'a.jpg'))
+    _jpeg(str(tmp_path / 'in' / 'b.jpg'), color=(0, 0, 255))
+    first = _convert(tmp_path / 'in', tmp_path / 'out', incremental=True)
+    assert first.converted == 2
+
+    output = tmp_path / 'out' / 'a.png'
+    written = output.stat().st_mtime_ns
+    # Touched but not modified: the hash still matches, so the file is not reconverted
+    os.utime(source, ns=(written + 10 ** 9, written + 10 ** 9))
+    second = _convert(tmp_path / 'in', tmp_path / 'out', incremental=True)
+
+    assert (second.converted, second.skipped) == (0, 2)
+    assert output.stat().st_mtime_ns == written
+    # The refreshed fingerprint lets the next run skip the file without reading it
+    assert _manifest(tmp_path / 'out')['a.jpg'][0] == os.stat(source).st_mtime_ns
+
+    _jpeg(source, color=(10, 200, 10))
+    third = _convert(tmp_path / 'in', tmp_path / 'out', incremental=True)
+    assert (third.converted, third.skipped) == (1, 1)
+
+
+def test_incremental_reconverts_when_the_profile_changes(tmp_path):
+    _jpeg(str(tmp_path / 'in' / 'a.jpg'))
+    assert _convert(tmp_path / 'in', tmp_path / 'out', incremental=True).converted == 1
+    assert _convert(tmp_path / 'in', tmp_path / 'out', incremental=True).skipped == 1
+
+    summary = _convert(tmp_path / 'in', tmp_path / 'out', incremental=True, profile=PROFILES['rgb'])
+    assert (summary.converted, summary.skipped) == (1, 0)
+    with Image.open(tmp_path / 'out' / 'a.png') as img:
+        assert img.mode == 'RGB'
+
+
+def test_deletes_outputs_whose_source_is_gone(tmp_path):
+    kept = _jpeg(str(tmp_path / 'in' / 'kept.jpg'))
+    gone = _jpeg(str(tmp_path / 'in' / 'gone.jpg'))
+    _convert(tmp_path / 'in', tmp_path / 'out', incremental=True)
+    os.remove(gone)
+
+    summary = _convert(tmp_path / 'in', tmp_path / 'out', incremental=True, delete_orphans=True)
+
+    assert summary.deleted == 1
+    assert sorted(os.listdir(tmp_path / 'out')) == sorted([MANIFEST_NAME, 'kept.png'])
+    assert list(_manifest(tmp_path / 'out')) == [os.path.basename(kept)]
+
+
+def test_recursive_runs_mirror_nested_folders(tmp_path):
+    _jpeg(str(tmp_path / 'in' / 'top.jpg'))
+    _jpeg(str(tmp_path / 'in' / 'trips' / '2024' / 'beach.JPEG'))
+    _jpeg(str(tmp_path / 'in' / 'trips' / 'notes' / 'skipped.gif'))
+
+    flat = _convert(tmp_path / 'in', tmp_path / 'flat')
+    nested = _convert(tmp_path / 'in', tmp_path / 'nested', recursive=True)
+
+    assert flat.converted == 1 and os.listdir(tmp_path / 'flat') == ['top.png']
+    assert nested.converted == 2
+    assert (tmp_path / 'nested' / 'top.png').is_file()
+    assert (tmp_path / 'nested' / 'trips' / '2024' / 'beach.png').is_file()
+    assert not (tmp_path / 'nested' / 'trips' / 'notes').exists()
+
+
+def test_recursive_walk_does_not_follow_symlinked_folders(tmp_path):
+    _jpeg(str(tmp_path / 'in' / 'a.jpg'))
+    _jpeg(str(tmp_path / 'in' / 'sub' / 'b.jpg'))
+    # A link back to the root would otherwise be walked forever
+    os.symlink(tmp_path / 'in', tmp_path / 'in' / 'sub' / 'loop', target_is_directory=True)
+
+    summary = _convert(tmp_path / 'in', tmp_path / 'out', recursive=True)
+
+    assert (summary.converted, summary.failed) == (2, 0)
+    assert not (tmp_path / 'out' / 'sub' / 'loop').exists()
+
+
+def test_reports_sources_that_would_write_the_same_output(tmp_path):
+    _jpeg(str(tmp_path / 'in' / 'a.jpg'))
+    Image.new('RGB', (32, 32)).save(tmp_path / 'in' / 'a.png')
+    _jpeg(str(tmp_path / 'in' / 'b.jpg'))
+
+    summary = _convert(tmp_path / 'in', tmp_path / 'out', patterns=IMAGE_PATTERNS, incremental=True)
+
+    assert (summary.converted, summary.failed) == (2, 1)
+    (failed_path, error), = summary.failures
+    failed_name = os.path.basename(failed_path)
+    owner = 'a.png' if failed_name == 'a.jpg' else 'a.jpg'
+    assert error == f"Output a.png is already written from {tmp_path / 'in' / owner}"
+    # Only the source that owns the output is recorded for incremental runs
+    assert sorted(_manifest(tmp_path / 'out')) == sorted(['b.jpg', owner])
+
+
+def test_manifest_is_saved_during_the_run(tmp_path, monkeypatch):
+    for index in range(5):
+        _jpeg(str(tmp_path / 'in' / f'{index}.jpg'))
+    monkeypatch.setattr(manifest, 'SAVE_EVERY', 2)
+    on_disk = []
+
+    def progress(summary):
+        path = tmp_path / 'out' / MANIFEST_NAME
+        on_disk.append(len(_manifest(tmp_path / 'out')) if path.exists() else 0)
+
+    _convert(tmp_path / 'in', tmp_path / 'out', incremental=True, progress=progress, progress_every=1)
+
+    # A run killed after the fourth file would only have to redo the fifth
+    assert on_disk == [0, 2, 2, 4, 4]
+    assert len(_manifest(tmp_path / 'out')) == 5
+
+
+def test_incremental_flat_runs_do_not_walk_the_output_folder(tmp_path, monkeypatch):
+    _jpeg(str(tmp_path / 'in' / 'a.jpg'))
+    _jpeg(str(tmp_path / 'in' / 'b.jpg'))
+    _convert(tmp_path / 'in', tmp_path / 'out', incremental=True)
+    os.makedirs(tmp_path / 'out' / 'archive')
+    os.remove(tmp_path / 'out' / 'b.png')
+
+    scanned = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scanned.append(str(path)) or scandir(path))
+    summary = _convert(tmp_path / 'in', tmp_path / 'out', incremental=True)
+
+    assert scanned == [str(tmp_path / 'in')]
+    # The missing output is noticed all the same
+    assert (summary.converted, summary.skipped) == (1, 1)
+    assert (tmp_path / 'out' / 'b.png').exists()
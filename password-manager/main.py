@@ -11,14 +11,24 @@ Key Features:
 import string
 import random
 import getpass
-import base64
-import hashlib
 import os
 
+from vault import Vault
+
+VAULT_FILE = os.environ.get('PASSWORD_VAULT', 'passwords.vault')
+
 class PasswordManager:
-    def __init__(self, master_password):
-        self.master_password = master_password
-        self.storage = {}
+    def __init__(self, master_password, path=None):
+        """
+        Open the password vault.
+
+        The master password is turned into the vault key once, here; every
+        password set or read afterwards reuses it.
+
+        :param master_password: The master password.
+        :param path: The vault file, or None to keep passwords in memory only.
+        """
+        self.vault = Vault(master_password, path)
 
     def generate_password(self, length=12):
         """
@@ -37,8 +47,7 @@ class PasswordManager:
         :param key: The key for the password.
         :param password: The password.
         """
-        encrypted_password = self.encrypt(password)
-        self.storage[key] = encrypted_password
+        self.vault.set(key, password)
 
     def get_password(self, key):
         """
@@ -47,40 +56,48 @@ class PasswordManager:
         :param key: The key for the password.
         :return: The password.
         """
-        encrypted_password = self.storage.get(key)
-        if encrypted_password is None:
-            return None
-        return self.decrypt(encrypted_password)
+        return self.vault.get(key)
 
-    def encrypt(self, password):
+    def get_passwords(self, keys):
+        """
+        Get the passwords for many keys at once.
+
+        :param keys: The keys for the passwords.
+        :return: A dict of key -> password for the keys that exist.
+        """
+        return self.vault.get_many(keys)
+
+    def encrypt(self, password, key=''):
         """
         Encrypt a password.
 
         :param password: The password.
+        :param key: The key the password is stored under.
         :return: The encrypted password.
         """
-        salt = os.urandom(16)
-        cipher = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000)
-        return base64.b64encode(salt + cipher).decode()
+        return self.vault.encrypt(key, password)
 
-    def decrypt(self, encrypted_password):
+    def decrypt(self, encrypted_password, key=''):
         """
         Decrypt a password.
 
         :param encrypted_password: The encrypted password.
+        :param key: The key the password was encrypted for.
         :return: The decrypted password.
         """
-        encrypted_password = base64.b64decode(encrypted_password)
-        salt = encrypted_password[:16]
-        cipher = encrypted_password[16:]
-        decrypted_password = hashlib.pbkdf2_hmac('sha256', self.master_password.encode(), salt, 100000)
-        if decrypted_password != cipher:
-            raise ValueError('Invalid master password')
-        return decrypted_password.hex()
+        return self.vault.decrypt(key, encrypted_password)
+
+    def save(self):
+        """Write the vault to its file."""
+        self.vault.save()
 
 def main():
     master_password = getpass.getpass('Enter master password: ')
-    manager = PasswordManager(master_password)
+    try:
+        manager = PasswordManager(master_password, VAULT_FILE)
+    except ValueError as e:
+        print(e)
+        return
     while True:
         print('1. Set password')
         print('2. Get password')
@@ -91,6 +108,7 @@ def main():
             key = input('Enter key: ')
             password = getpass.getpass('Enter password: ')
             manager.set_password(key, password)
+            manager.save()
         elif choice == '2':
             key = input('Enter key: ')
             password = manager.get_password(key)
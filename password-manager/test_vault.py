@@ -0,0 +1,123 @@
+# Tests for the encrypted password vault.
+#
+# Dependencies:
+# pip install pytest cryptography
+
+import base64
+import json
+
+import pytest
+
+import vault
+from vault import Vault
+
+# Cheap scrypt costs keep the tests fast; the format and code paths are the same
+FAST_KDF = {'n': 2 ** 10, 'r': 8, 'p': 1}
+SECRETS = {
+    'email': 'correct horse battery staple',
+    'bank': 'Pässwörd-ñ-日本語-🔑',
+    'empty': '',
+    'spaces': '  leading and trailing  \n',
+}
+
+
+def _filled(path=None):
+    v = Vault('master', path, kdf=FAST_KDF)
+    for name, secret in SECRETS.items():
+        v.set(name, secret)
+    return v
+
+
+def test_round_trips_secrets_exactly():
+    v = _filled()
+    assert {name: v.get(name) for name in SECRETS} == SECRETS
+    assert v.get('missing') is None
+    assert v.names() == sorted(SECRETS) and len(v) == len(SECRETS) and 'bank' in v
+    # Every encryption uses a fresh nonce
+    assert v.encrypt('bank', SECRETS['bank']) != v.encrypt('bank', SECRETS['bank'])
+    assert v.delete('email') and not v.delete('email') and v.get('email') is None
+
+
+def test_save_and_reopen(tmp_path):
+    path = str(tmp_path / 'vault.json')
+    _filled(path).save()
+    # Written atomically: no temporary file is left behind
+    assert [p.name for p in tmp_path.iterdir()] == ['vault.json']
+    with open(path, encoding='utf-8') as f:
+        stored = f.read()
+    assert not any(secret and secret in stored for secret in SECRETS.values())
+
+    reopened = Vault('master', path)
+    assert reopened.get_many(SECRETS) == SECRETS
+    assert reopened.kdf['n'] == FAST_KDF['n']
+
+
+def test_rejects_a_wrong_master_password(tmp_path):
+    path = str(tmp_path / 'vault.json')
+    _filled(path).save()
+    with pytest.raises(ValueError, match='Invalid master password'):
+        Vault('Master', path)
+
+
+def test_tampered_or_swapped_entries_fail(tmp_path):
+    path = str(tmp_path / 'vault.json')
+    _filled(path).save()
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    raw = bytearray(base64.b64decode(data['entries']['email']))
+    raw[-1] ^= 1
+    data['entries']['email'] = base64.b64encode(bytes(raw)).decode()
+    # A valid ciphertext moved to another name is rejected too: the name is bound in
+    data['entries']['bank'], data['entries']['spaces'] = data['entries']['spaces'], data['entries']['bank']
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    reopened = Vault('master', path)
+    assert reopened.get('empty') == ''
+    for name in ('email', 'bank', 'spaces'):
+        with pytest.raises(ValueError, match='corrupt or belongs to another entry'):
+            reopened.get(name)
+
+
+def test_get_many_costs_a_single_key_derivation(tmp_path, monkeypatch):
+    path = str(tmp_path / 'vault.json')
+    v = Vault('master', path, kdf=FAST_KDF)
+    names = ['site%d' % i for i in range(500)]
+    for name in names:
+        v.set(name, 'secret for ' + name)
+    v.save()
+
+    calls = []
+    derive_key = vault.derive_key
+    monkeypatch.setattr(vault, 'derive_key', lambda *args: calls.append(args) or derive_key(*args))
+    reopened = Vault('master', path)
+    secrets = reopened.get_many(names + ['missing'])
+
+    assert len(calls) == 1
+    assert secrets == {name: 'secret for ' + name for name in names}
+
+
+@pytest.mark.parametrize('kdf', [
+    {'n': 2 ** 40, 'r': 8, 'p': 1},
+    {'n': 2 ** 14, 'r': 1 << 20, 'p': 1},
+    {'n': 2 ** 14, 'r': 8, 'p': 10 ** 6},
+    {'n': 1000, 'r': 8, 'p': 1},
+    {'n': 1, 'r': 8, 'p': 1},
+    {'n': 2 ** 14, 'r': 0, 'p': 1},
+    {'n': '16384', 'r': 8, 'p': 1},
+    {'n': 2 ** 14, 'r': 8.0, 'p': 1},
+    {'r': 8, 'p': 1},
+])
+def test_rejects_unsafe_kdf_parameters_before_deriving(tmp_path, monkeypatch, kdf):
+    path = str(tmp_path / 'vault.json')
+    _filled(path).save()
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    data['kdf'] = {'salt': data['kdf']['salt'], **kdf}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    monkeypatch.setattr(vault, 'derive_key', lambda *args: pytest.fail('derived a key with %r' % (kdf,)))
+    with pytest.raises(ValueError, match='scrypt'):
+        Vault('master', path)
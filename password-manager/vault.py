@@ -0,0 +1,182 @@
+"""
+Encrypted password vault
+
+The master password is stretched into a 256-bit key with scrypt once, when the
+vault is unlocked. Every entry is then encrypted with AES-GCM under that key,
+using its own random nonce. The entry's name is bound in as associated data,
+so a ciphertext cannot be moved to another name. Reading or writing an entry
+costs microseconds, and looking up thousands of entries costs a single key
+derivation.
+
+Vault file format (JSON):
+- version: format version (1)
+- kdf: the scrypt salt and cost parameters the key was derived with
+- check: an encrypted marker used to tell a wrong master password from a corrupt entry
+- entries: name -> base64(nonce + ciphertext + tag)
+
+Dependencies:
+pip install cryptography
+"""
+import base64
+import hashlib
+import json
+import os
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+VERSION = 1
+NONCE_SIZE = 12
+KEY_SIZE = 32
+# scrypt costs: about 0.1 s and 32 MiB per derivation
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+# Upper bounds for costs read from a vault file, so a crafted file cannot exhaust memory or CPU
+MAX_SCRYPT_MEMORY = 256 * 1024 * 1024
+MAX_SCRYPT_P = 16
+CHECK_NAME = b'\x00vault-check'
+
+
+def derive_key(master_password, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """
+    Derive the vault key from the master password.
+
+    :param master_password: The master password.
+    :param salt: The vault's random salt.
+    :return: The 32-byte key.
+    """
+    return hashlib.scrypt(master_password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * n, dklen=KEY_SIZE)
+
+
+def check_kdf(kdf):
+    """
+    Check scrypt parameters before deriving a key with them.
+
+    :param kdf: The {'salt', 'n', 'r', 'p'} of a vault.
+    :raises ValueError: If a parameter is malformed or the costs exceed the limits.
+    """
+    if not isinstance(kdf, dict):
+        raise ValueError('Invalid scrypt parameters: %r' % (kdf,))
+    n, r, p = kdf.get('n'), kdf.get('r'), kdf.get('p')
+    if not all(type(value) is int and value >= 1 for value in (n, r, p)) or n < 2 or n & (n - 1):
+        raise ValueError('Invalid scrypt parameters: n=%r r=%r p=%r' % (n, r, p))
+    if 128 * r * n > MAX_SCRYPT_MEMORY or p > MAX_SCRYPT_P:
+        raise ValueError('scrypt parameters exceed the limits: n=%d r=%d p=%d' % (n, r, p))
+    if not isinstance(kdf.get('salt'), str):
+        raise ValueError('Invalid scrypt salt')
+
+
+class Vault:
+    def __init__(self, master_password, path=None, kdf=None):
+        """
+        Unlock a vault, or create a new one if path does not exist yet.
+
+        :param master_password: The master password.
+        :param path: The vault file, or None for a vault kept only in memory.
+        :param kdf: scrypt parameters {'n', 'r', 'p'} for a new vault (defaults to SCRYPT_*).
+        :raises ValueError: If the master password does not open an existing vault,
+            or its key derivation parameters are invalid.
+        """
+        self.path = path
+        data = None
+        if path is not None and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != VERSION:
+                raise ValueError('Unsupported vault version: %r' % data.get('version'))
+            self.kdf = data['kdf']
+        else:
+            self.kdf = {'salt': base64.b64encode(os.urandom(16)).decode(),
+                        'n': SCRYPT_N, 'r': SCRYPT_R, 'p': SCRYPT_P, **(kdf or {})}
+
+        check_kdf(self.kdf)
+        # The one expensive step: every entry below reuses this key
+        key = derive_key(master_password, base64.b64decode(self.kdf['salt']),
+                         self.kdf['n'], self.kdf['r'], self.kdf['p'])
+        self._aead = AESGCM(key)
+
+        if data is None:
+            self._check = self._seal(CHECK_NAME, b'')
+            self._entries = {}
+        else:
+            self._check = data['check']
+            try:
+                self._open(CHECK_NAME, self._check)
+            except InvalidTag:
+                raise ValueError('Invalid master password') from None
+            self._entries = dict(data['entries'])
+
+    def _seal(self, name, plaintext):
+        nonce = os.urandom(NONCE_SIZE)
+        return base64.b64encode(nonce + self._aead.encrypt(nonce, plaintext, name)).decode()
+
+    def _open(self, name, token):
+        raw = base64.b64decode(token)
+        return self._aead.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], name)
+
+    def encrypt(self, name, secret):
+        """
+        Encrypt a secret for the entry called name.
+
+        :param name: The entry name, bound into the ciphertext.
+        :param secret: The secret.
+        :return: The encrypted secret as base64 text.
+        """
+        return self._seal(name.encode(), secret.encode())
+
+    def decrypt(self, name, token):
+        """
+        Decrypt a secret encrypted for the entry called name.
+
+        :param name: The entry name it was encrypted for.
+        :param token: The encrypted secret.
+        :return: The secret, exactly as it was stored.
+        :raises ValueError: If the token was tampered with or belongs to another entry.
+        """
+        try:
+            return self._open(name.encode(), token).decode()
+        except InvalidTag:
+            raise ValueError('Entry %r is corrupt or belongs to another entry' % name) from None
+
+    def set(self, name, secret):
+        self._entries[name] = self.encrypt(name, secret)
+
+    def get(self, name):
+        """Return the secret stored under name, or None."""
+        token = self._entries.get(name)
+        return None if token is None else self.decrypt(name, token)
+
+    def get_many(self, names):
+        """
+        Look up many entries at once.
+
+        :param names: The entry names.
+        :return: A dict of name -> secret for the names that exist.
+        """
+        return {name: self.decrypt(name, self._entries[name]) for name in names if name in self._entries}
+
+    def delete(self, name):
+        return self._entries.pop(name, None) is not None
+
+    def names(self):
+        return sorted(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """Write the vault to its file, atomically."""
+        if self.path is None:
+            return
+        data = {'version': VERSION, 'kdf': self.kdf, 'check': self._check, 'entries': self._entries}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
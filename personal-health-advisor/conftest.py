@@ -0,0 +1,18 @@
+# pytest configuration for the benchmarks; the shared part is benchmark_conftest.py
+# at the repository root (see there for --benchmark-large and --benchmark-gate)
+
+import importlib.util
+import os
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_spec = importlib.util.spec_from_file_location(
+    "benchmark_conftest", os.path.join(_HERE, "..", "benchmark_conftest.py"))
+benchmark_conftest = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(benchmark_conftest)
+
+pytest_addoption = benchmark_conftest.pytest_addoption
+pytest_collection_modifyitems = benchmark_conftest.pytest_collection_modifyitems
+
+
+def pytest_configure(config):
+    benchmark_conftest.configure(config, os.path.join(_HERE, "benchmark_baseline.json"))
@@ -0,0 +1,435 @@
+# Batch Health Reports
+#
+# Scores a whole cohort from a CSV or Parquet file with NumPy-vectorized versions
+# of the calculators in personal-health-advisor.py. The file is streamed in chunks
+# and each chunk's reports are written out before the next one is read, so memory
+# stays bounded by the chunk size.
+#
+# With --workers N the input is split into parts (newline-aligned byte ranges of a
+# CSV file, or groups of Parquet row groups) that a process pool scores in
+# parallel. Each worker writes its reports to a part file next to the output, and
+# the parts are concatenated in input order, so only file paths cross processes.
+#
+# Input columns: age, gender, height_cm, weight, activity_level and, optionally,
+# resting_heart_rate. Every input column is copied to the output as it was read
+# (CSV text as written; Parquet values with their own types), and only the copies
+# handed to score_chunk are converted to numbers. A header-only input still gets
+# an output file with the header.
+#
+# Usage: python health_batch.py cohort.csv reports.csv --chunk-size 100000 --workers 8
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+NUMERIC_COLUMNS = ("age", "height_cm", "weight", "resting_heart_rate")
+
+ACTIVITY_FACTORS = {'sedentary': 1.2, 'moderate': 1.55, 'active': 1.75, 'very active': 2.0}
+
+# get_bmi_recommendation / recommend_exercises branch on bmi < 18.5, [18.5, 24.9) and
+# [25, 29.9); everything else (including the 24.9-25 and 29.9-30 gaps) falls through
+# to the last branch. searchsorted over these edges reproduces those branches.
+BMI_EDGES = np.array([18.5, 24.9, 25, 29.9])
+BMI_RECOMMENDATIONS = np.array(["Underweight", "Normal weight", "Obese", "Overweight", "Obese"], dtype=object)
+EXERCISE_RECOMMENDATIONS = np.array([
+    "Focus on muscle-building exercises like weightlifting and yoga.",
+    "Maintain your fitness with a mix of cardio and strength training.",
+    "Low-impact exercises like water aerobics or walking are recommended.",
+    "Prioritize cardio exercises like walking, swimming, or cycling.",
+    "Low-impact exercises like water aerobics or walking are recommended.",
+], dtype=object)
+
+# Columns added by score_chunk, in output order
+REPORT_COLUMNS = ("bmi", "bmi_recommendation", "water_intake_l", "calories", "protein_g", "carbs_g", "fats_g",
+                  "sleep_recommendation", "exercise_recommendation", "moderate_hr_low", "moderate_hr_high",
+                  "vigorous_hr_low", "vigorous_hr_high")
+
+SLEEP_RECOMMENDATIONS = (
+    "Toddlers need about 11-14 hours of sleep daily.",
+    "Children need 9-11 hours of sleep daily.",
+    "Teenagers need 8-10 hours of sleep daily.",
+    "Adults need 7-9 hours of sleep daily.",
+    "Older adults need 7-8 hours of sleep daily.",
+)
+
+def round_like_builtin(values, digits):
+    """Round an array like round(value, digits), which np.round misses on near-ties such as 2.675."""
+    rounded = np.round(values, digits)
+    scaled = values * 10.0 ** digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(value), digits) for value in values[near_tie]]
+    return rounded
+
+
+def calculate_bmi(weights, heights):
+    """Vectorized calculate_bmi: weight in kg, height in meters."""
+    return round_like_builtin(weights / (heights ** 2), 2)
+
+
+def get_bmi_recommendation(bmis):
+    """Vectorized get_bmi_recommendation."""
+    return BMI_RECOMMENDATIONS[np.searchsorted(BMI_EDGES, bmis, side='right')]
+
+
+def recommend_exercises(bmis):
+    """Vectorized recommend_exercises."""
+    return EXERCISE_RECOMMENDATIONS[np.searchsorted(BMI_EDGES, bmis, side='right')]
+
+
+def calculate_daily_water_intake(weights, ages):
+    """Vectorized calculate_daily_water_intake."""
+    water_intake = weights * 0.033
+    water_intake = np.select([ages < 18, ages > 55], [water_intake + 0.5, water_intake - 0.3], water_intake)
+    return round_like_builtin(water_intake, 2)
+
+
+def recommend_calories(ages, genders, heights_cm, weights, activity_levels):
+    """Vectorized recommend_calories; NaN where the scalar version returns "Invalid activity level"."""
+    bmr = 10 * weights + 6.25 * heights_cm - 5 * ages + np.where(genders == 'male', 5, -161)
+    levels, inverse = np.unique(activity_levels.astype(str), return_inverse=True)
+    multipliers = np.array([ACTIVITY_FACTORS.get(level, np.nan) for level in levels])[inverse]
+    return round_like_builtin(bmr * multipliers, 2)
+
+
+def recommend_sleep(ages):
+    """Vectorized recommend_sleep."""
+    conditions = [ages < 6, (ages >= 6) & (ages <= 13), (ages >= 14) & (ages <= 17), (ages >= 18) & (ages <= 64)]
+    return np.select(conditions, SLEEP_RECOMMENDATIONS[:-1], SLEEP_RECOMMENDATIONS[-1]).astype(object)
+
+
+def calculate_heart_rate_zones(ages, resting_heart_rates):
+    """Vectorized calculate_heart_rate_zones: moderate low/high and vigorous low/high arrays."""
+    reserve = (220 - ages) - resting_heart_rates
+    moderate_low = np.rint(reserve * 0.5 + resting_heart_rates)
+    moderate_high = np.rint(reserve * 0.7 + resting_heart_rates)
+    vigorous_high = np.rint(reserve * 0.85 + resting_heart_rates)
+    return moderate_low, moderate_high, moderate_high.copy(), vigorous_high
+
+
+def calculate_macros(calories):
+    """Vectorized calculate_macros: protein, carbs and fats in grams."""
+    return (round_like_builtin(0.3 * calories / 4, 2),
+            round_like_builtin(0.4 * calories / 4, 2),
+            round_like_builtin(0.3 * calories / 9, 2))
+
+
+def score_chunk(columns):
+    """
+    Compute the health report columns for one chunk of the cohort.
+
+    :param columns: Dict of column name to NumPy array (numeric columns as float).
+    :return: Dict of report column name to NumPy array.
+    """
+    ages, weights, heights_cm = columns["age"], columns["weight"], columns["height_cm"]
+    bmis = calculate_bmi(weights, heights_cm / 100)
+    calories = recommend_calories(ages, columns["gender"], heights_cm, weights, columns["activity_level"])
+    protein, carbs, fats = calculate_macros(calories)
+
+    resting_heart_rates = columns.get("resting_heart_rate")
+    if resting_heart_rates is None:
+        resting_heart_rates = np.full(len(ages), np.nan)
+    moderate_low, moderate_high, vigorous_low, vigorous_high = calculate_heart_rate_zones(ages, resting_heart_rates)
+
+    return {
+        "bmi": bmis,
+        "bmi_recommendation": get_bmi_recommendation(bmis),
+        "water_intake_l": calculate_daily_water_intake(weights, ages),
+        "calories": calories,
+        "protein_g": protein,
+        "carbs_g": carbs,
+        "fats_g": fats,
+        "sleep_recommendation": recommend_sleep(ages),
+        "exercise_recommendation": recommend_exercises(bmis),
+        "moderate_hr_low": moderate_low,
+        "moderate_hr_high": moderate_high,
+        "vigorous_hr_low": vigorous_low,
+        "vigorous_hr_high": vigorous_high,
+    }
+
+
+def _as_float(values):
+    if values.dtype != object:
+        return values.astype(float)
+    return np.array([float(value) if value is not None and str(value).strip() else np.nan for value in values])
+
+
+def scoring_columns(columns):
+    """
+    Convert a chunk as read from the input into the form score_chunk expects.
+
+    :param columns: Dict of column name to NumPy array, as read_chunks yields them.
+    :return: Dict with the numeric columns as float and surrounding spaces stripped from text.
+    """
+    return {name: _as_float(values) if name in NUMERIC_COLUMNS
+            else np.array([value.strip() if isinstance(value, str) else value for value in values], dtype=object)
+            for name, values in columns.items()}
+
+
+def _to_columns(rows, fieldnames):
+    return {name: np.array([row[index] for row in rows], dtype=object) for index, name in enumerate(fieldnames)}
+
+
+def _chunk_rows(reader, fieldnames, chunk_size, at_least_one=False):
+    rows, chunks = [], 0
+    for row in reader:
+        rows.append(row)
+        if len(rows) == chunk_size:
+            yield _to_columns(rows, fieldnames)
+            rows, chunks = [], chunks + 1
+    if rows or (at_least_one and not chunks):
+        yield _to_columns(rows, fieldnames)
+
+
+def read_csv_chunks(path, chunk_size):
+    """Yield the cohort CSV file as dicts of column arrays, chunk_size rows at a time (one empty chunk if it has no rows)."""
+    with open(path, newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        fieldnames = [name.strip() for name in next(reader)]
+        yield from _chunk_rows(reader, fieldnames, chunk_size, at_least_one=True)
+
+
+def read_csv_header(path):
+    """Return the column names of a CSV file and the byte offset where its rows start."""
+    with open(path, 'rb') as file:
+        header = file.readline()
+        return [name.strip() for name in next(csv.reader([header.decode('utf-8')]))], file.tell()
+
+
+def split_csv(path, parts):
+    """
+    Split the rows of a CSV file into byte ranges that start and end on line boundaries.
+
+    Rows must not contain quoted newlines, which cohort exports do not.
+
+    :param path: CSV file.
+    :param parts: Number of ranges wanted.
+    :return: List of (start, end) byte offsets, in file order.
+    """
+    _, start = read_csv_header(path)
+    size = os.path.getsize(path)
+    bounds = [start]
+    with open(path, 'rb') as file:
+        for part in range(1, parts):
+            file.seek(max(start + (size - start) * part // parts, bounds[-1]))
+            file.readline()
+            bounds.append(min(file.tell(), size))
+    bounds.append(size)
+    return [(low, high) for low, high in zip(bounds, bounds[1:]) if high > low]
+
+
+def read_csv_range(path, start, end, fieldnames, chunk_size):
+    """Yield the rows in a byte range of a CSV file as dicts of column arrays."""
+    with open(path, 'rb') as file:
+        file.seek(start)
+
+        def lines():
+            position = start
+            while position < end:
+                line = file.readline()
+                if not line:
+                    return
+                position += len(line)
+                yield line.decode('utf-8')
+
+        yield from _chunk_rows(csv.reader(lines()), fieldnames, chunk_size)
+
+
+def _arrow_columns(batch):
+    import pyarrow as pa
+
+    # Numbers without nulls stay NumPy numbers; anything else keeps its Python values, nulls as None
+    return {name: array.to_numpy(zero_copy_only=False)
+            if array.null_count == 0 and (pa.types.is_integer(array.type) or pa.types.is_floating(array.type))
+            else np.array(array.to_pylist(), dtype=object)
+            for name, array in zip(batch.schema.names, batch.columns)}
+
+
+def read_parquet_chunks(path, chunk_size, row_groups=None):
+    """Yield the cohort Parquet file (or some of its row groups) as dicts of column arrays (one empty chunk if it has no rows)."""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    empty = True
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups):
+        empty = False
+        yield _arrow_columns(batch)
+    if empty and row_groups is None:
+        yield _arrow_columns(parquet_file.schema_arrow.empty_table())
+
+
+def read_chunks(path, chunk_size):
+    """Yield chunks of a CSV or Parquet cohort file, chosen by file extension."""
+    if path.lower().endswith('.parquet'):
+        return read_parquet_chunks(path, chunk_size)
+    return read_csv_chunks(path, chunk_size)
+
+
+def _parquet_values(name, values):
+    import pyarrow as pa
+
+    # Parquet columns are typed, so numbers read from CSV text are written as floats, as score_chunk reads them
+    if values.dtype != object:
+        return values
+    if all(isinstance(value, str) for value in values):
+        return _as_float(values) if name in NUMERIC_COLUMNS else pa.array(values.tolist(), type=pa.string())
+    return values.tolist()
+
+
+def _format(value):
+    if isinstance(value, float) and value != value:
+        return ''
+    return value
+
+
+class ReportWriter:
+    """Write report chunks to a CSV or Parquet file, chosen by file extension."""
+
+    def __init__(self, path, header=True):
+        self.path = path
+        self.header = header
+        self.parquet = path.lower().endswith('.parquet')
+        self._file = None
+        self._writer = None
+
+    def write(self, columns):
+        names = list(columns)
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.table({name: _parquet_values(name, columns[name]) for name in names})
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+            return
+
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            if self.header:
+                self._writer.writerow(names)
+        self._writer.writerows([_format(value) for value in row]
+                               for row in zip(*(columns[name].tolist() for name in names)))
+
+    def close(self):
+        if self._writer is not None and self.parquet:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def _score_chunks(chunks, writer):
+    rows = 0
+    try:
+        for columns in chunks:
+            writer.write({**columns, **score_chunk(scoring_columns(columns))})
+            rows += len(columns["age"])
+    finally:
+        writer.close()
+    return rows
+
+
+def _score_part(input_path, part, part_path, chunk_size, fieldnames):
+    """Worker task: score one part of the input into its own part file."""
+    if fieldnames is None:
+        chunks = read_parquet_chunks(input_path, chunk_size, row_groups=part)
+    else:
+        chunks = read_csv_range(input_path, part[0], part[1], fieldnames, chunk_size)
+    return _score_chunks(chunks, ReportWriter(part_path, header=False))
+
+
+def _merge_parts(part_paths, output_path, fieldnames):
+    if output_path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for part_path in part_paths:
+                if not os.path.exists(part_path):
+                    continue
+                part = pq.ParquetFile(part_path)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, part.schema_arrow)
+                for group in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(group).cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as output:
+        csv.writer(output).writerow(fieldnames)
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                with open(part_path, encoding='utf-8', newline='') as part:
+                    shutil.copyfileobj(part, output, 1 << 20)
+
+
+def score_file(input_path, output_path, chunk_size=100000, workers=1):
+    """
+    Score every row of a cohort file and write the reports, one chunk at a time.
+
+    :param input_path: CSV or Parquet cohort file.
+    :param output_path: CSV or Parquet report file.
+    :param chunk_size: Rows per chunk.
+    :param workers: Number of worker processes; 1 scores in this process.
+    :return: Number of rows scored.
+    """
+    if workers <= 1:
+        return _score_chunks(read_chunks(input_path, chunk_size), ReportWriter(output_path))
+
+    # A few parts per worker so a slow part does not leave the other workers idle
+    if input_path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(input_path)
+        input_names = parquet_file.schema_arrow.names
+        row_groups = [group for group in range(parquet_file.num_row_groups)
+                      if parquet_file.metadata.row_group(group).num_rows]
+        size = -(-len(row_groups) // (workers * 4)) or 1
+        parts = [row_groups[index:index + size] for index in range(0, len(row_groups), size)]
+        input_fieldnames = None
+    else:
+        input_fieldnames, _ = read_csv_header(input_path)
+        input_names = input_fieldnames
+        parts = split_csv(input_path, workers * 4)
+    if not parts:
+        # No rows to split: score in this process, which still writes the header
+        return _score_chunks(read_chunks(input_path, chunk_size), ReportWriter(output_path))
+
+    extension = '.parquet' if output_path.lower().endswith('.parquet') else '.csv'
+    part_directory = tempfile.mkdtemp(prefix='health_batch_', dir=os.path.dirname(os.path.abspath(output_path)))
+    part_paths = [os.path.join(part_directory, f"part-{index:05d}{extension}") for index in range(len(parts))]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = sum(executor.map(_score_part, [input_path] * len(parts), parts, part_paths,
+                                    [chunk_size] * len(parts), [input_fieldnames] * len(parts)))
+
+        _merge_parts(part_paths, output_path,
+                     list(input_names) + [name for name in REPORT_COLUMNS if name not in input_names])
+    finally:
+        shutil.rmtree(part_directory, ignore_errors=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a cohort file with the personal health advisor.")
+    parser.add_argument("input", help="CSV or Parquet file with age, gender, height_cm, weight and activity_level")
+    parser.add_argument("output", help="CSV or Parquet file to write the reports to")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Rows scored per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes scoring parts of the file in parallel")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        parser.error(f"Input file not found: {args.input}")
+    rows = score_file(args.input, args.output, args.chunk_size, args.workers)
+    print(f"Scored {rows} rows into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 # Personal Health Advisor
 
+from types import MappingProxyType
+
 def calculate_bmi(_weight, _height):
     """Calculate BMI given weight in kg and height in meters."""
     _bmi = _weight / (_height ** 2)
@@ -78,50 +80,73 @@ def calculate_macros(_calories):
         "Fats (g)": round(0.3 * _calories / 9, 2)
     }
 
-def suggest_meal_plan(_bmi, _food_preference):
-    """Suggest a simple meal plan based on BMI and food preference."""
-    meal_plans = {
-        "underweight": {
-            "Breakfast": "Avocado toast with eggs (400 kcal)",
-            "Lunch": "Grilled chicken salad with quinoa and nuts (600 kcal)",
-            "Snack": "Banana smoothie with almond milk and protein powder (300 kcal)",
-            "Dinner": "Grilled salmon with sweet potatoes and broccoli (550 kcal)"
-        },
-        "normal": {
-            "Breakfast": "Oatmeal with fruits and nuts (350 kcal)",
-            "Lunch": "Grilled chicken salad with quinoa and avocado (500 kcal)",
-            "Snack": "Greek yogurt with berries and honey (200 kcal)",
-            "Dinner": "Baked salmon with roasted vegetables and quinoa (450 kcal)"
-        },
-        "overweight": {
-            "Breakfast": "Low-fat yogurt with fruits and granola (250 kcal)",
-            "Lunch": "Grilled chicken salad with mixed greens and vinaigrette (400 kcal)",
-            "Snack": "Carrot sticks with hummus (150 kcal)",
-            "Dinner": "Grilled chicken breast with roasted vegetables and brown rice (350 kcal)"
-        },
-        "obese": {
-            "Breakfast": "Black coffee with sugar-free sweetener (0 kcal)",
-            "Lunch": "Salad with mixed greens, cherry tomatoes, and vinaigrette (200 kcal)",
-            "Snack": "Raw vegetables with low-fat ranch dressing (100 kcal)",
-            "Dinner": "Grilled chicken breast with steamed broccoli and brown rice (250 kcal)"
-        }
+_MEAL_PLAN_TEMPLATES = {
+    "underweight": {
+        "Breakfast": "Avocado toast with eggs (400 kcal)",
+        "Lunch": "Grilled chicken salad with quinoa and nuts (600 kcal)",
+        "Snack": "Banana smoothie with almond milk and protein powder (300 kcal)",
+        "Dinner": "Grilled salmon with sweet potatoes and broccoli (550 kcal)"
+    },
+    "normal": {
+        "Breakfast": "Oatmeal with fruits and nuts (350 kcal)",
+        "Lunch": "Grilled chicken salad with quinoa and avocado (500 kcal)",
+        "Snack": "Greek yogurt with berries and honey (200 kcal)",
+        "Dinner": "Baked salmon with roasted vegetables and quinoa (450 kcal)"
+    },
+    "overweight": {
+        "Breakfast": "Low-fat yogurt with fruits and granola (250 kcal)",
+        "Lunch": "Grilled chicken salad with mixed greens and vinaigrette (400 kcal)",
+        "Snack": "Carrot sticks with hummus (150 kcal)",
+        "Dinner": "Grilled chicken breast with roasted vegetables and brown rice (350 kcal)"
+    },
+    "obese": {
+        "Breakfast": "Black coffee with sugar-free sweetener (0 kcal)",
+        "Lunch": "Salad with mixed greens, cherry tomatoes, and vinaigrette (200 kcal)",
+        "Snack": "Raw vegetables with low-fat ranch dressing (100 kcal)",
+        "Dinner": "Grilled chicken breast with steamed broccoli and brown rice (250 kcal)"
     }
-
+}
+
+_PREFERENCE_OVERRIDES = {
+    "vegetarian": {"Dinner": "Lentil soup with whole grain bread (400 kcal)"},
+    "gluten-free": {"Lunch": "Grilled chicken salad with mixed greens and gluten-free vinaigrette (400 kcal)"},
+}
+
+# Every (BMI bucket, preference) plan, built once and shared read-only; preference
+# None is the plain template used for any other preference.
+MEAL_PLANS = MappingProxyType({
+    (_bucket, _preference): MappingProxyType({**_plan, **_PREFERENCE_OVERRIDES.get(_preference, {})})
+    for _bucket, _plan in _MEAL_PLAN_TEMPLATES.items()
+    for _preference in (None, *_PREFERENCE_OVERRIDES)
+})
+# The same plans by bucket, then by preference, for get_meal_plan's lookups
+_PLANS_BY_BUCKET = {_bucket: {_preference: MEAL_PLANS[(_bucket, _preference)]
+                              for _preference in (None, *_PREFERENCE_OVERRIDES)}
+                    for _bucket in _MEAL_PLAN_TEMPLATES}
+
+def get_bmi_bucket(_bmi):
+    """Return the meal plan bucket for a BMI."""
     if _bmi < 18.5:
-        meal_plan = meal_plans["underweight"]
+        return "underweight"
     elif 18.5 <= _bmi < 24.9:
-        meal_plan = meal_plans["normal"]
+        return "normal"
     elif 25 <= _bmi < 29.9:
-        meal_plan = meal_plans["overweight"]
+        return "overweight"
     else:
-        meal_plan = meal_plans["obese"]
+        return "obese"
 
-    if _food_preference == "vegetarian":
-        meal_plan["Dinner"] = "Lentil soup with whole grain bread (400 kcal)"
-    elif _food_preference == "gluten-free":
-        meal_plan["Lunch"] = "Grilled chicken salad with mixed greens and gluten-free vinaigrette (400 kcal)"
+def get_meal_plan(_bucket, _food_preference):
+    """Return the shared read-only meal plan for a BMI bucket and food preference."""
+    _plans = _PLANS_BY_BUCKET[_bucket]
+    try:
+        return _plans.get(_food_preference) or _plans[None]
+    except TypeError:
+        # An unhashable preference (such as a list) has no override either
+        return _plans[None]
 
-    return meal_plan
+def suggest_meal_plan(_bmi, _food_preference):
+    """Suggest a simple meal plan based on BMI and food preference (read-only, shared between calls)."""
+    return get_meal_plan(get_bmi_bucket(_bmi), _food_preference)
 
 def main():
     """Main entry point of the script."""
@@ -164,7 +189,7 @@ def main():
     print(f"Recommended Daily Calorie Intake: {calorie_intake} kcal")
     print(f"Recommended Macronutrient Breakdown: {macros}")
     print(f"Sleep Advice: {sleep_advice}")
-    print(f"Meal Plan: {meal_plan}")
+    print(f"Meal Plan: {dict(meal_plan)}")
     print("==============================")
     print("Remember, these are just recommendations. Always consult a healthcare professional for personalized advice!")
 
@@ -0,0 +1,243 @@
+# Tests for the batch health reports: the vectorized calculators against the
+# scalar ones in personal-health-advisor.py, the files score_file writes, and
+# the parallel path (byte-range CSV splits, Parquet row-group parts and the
+# in-order merge), whose output must match a single-process run.
+#
+# Dependencies:
+# pip install pytest numpy
+
+import csv
+import importlib.util
+import math
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import health_batch
+
+_spec = importlib.util.spec_from_file_location(
+    "personal_health_advisor", os.path.join(os.path.dirname(__file__), "personal-health-advisor.py"))
+advisor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(advisor)
+
+ACTIVITY_LEVELS = ['sedentary', 'moderate', 'active', 'very active']
+# Every branch edge of recommend_sleep and calculate_daily_water_intake, and a spread around them
+AGES = [2, 5, 6, 13, 14, 17, 18, 30, 55, 56, 64, 65, 90]
+
+
+def _cohort(size, seed=7):
+    rng = random.Random(seed)
+    return [{
+        "age": rng.choice(AGES) if i % 3 else rng.randint(1, 99),
+        "gender": rng.choice(['male', 'female']),
+        "height_cm": round(rng.uniform(140, 200), 1),
+        "weight": round(rng.uniform(35, 150), 1),
+        "activity_level": rng.choice(ACTIVITY_LEVELS),
+        "resting_heart_rate": rng.randint(45, 95),
+    } for i in range(size)]
+
+
+def _columns(rows, names=None):
+    names = names or list(rows[0])
+    return {name: np.array([row[name] for row in rows], dtype=object if name in ("gender", "activity_level") else float)
+            for name in names}
+
+
+def _expected(row):
+    """The report the scalar functions give for one row, keyed like score_chunk's columns."""
+    bmi = advisor.calculate_bmi(row["weight"], row["height_cm"] / 100)
+    calories = advisor.recommend_calories(row["age"], row["gender"], row["height_cm"], row["weight"],
+                                          row["activity_level"])
+    report = {
+        "bmi": bmi,
+        "bmi_recommendation": advisor.get_bmi_recommendation(bmi),
+        "water_intake_l": advisor.calculate_daily_water_intake(row["weight"], row["age"]),
+        "sleep_recommendation": advisor.recommend_sleep(row["age"]),
+        "exercise_recommendation": advisor.recommend_exercises(bmi),
+    }
+    if calories == "Invalid activity level":
+        report.update(calories=math.nan, protein_g=math.nan, carbs_g=math.nan, fats_g=math.nan)
+    else:
+        macros = advisor.calculate_macros(calories)
+        report.update(calories=calories, protein_g=macros["Protein (g)"], carbs_g=macros["Carbs (g)"],
+                      fats_g=macros["Fats (g)"])
+    if row.get("resting_heart_rate") is None:
+        report.update(moderate_hr_low=math.nan, moderate_hr_high=math.nan,
+                      vigorous_hr_low=math.nan, vigorous_hr_high=math.nan)
+    else:
+        zones = advisor.calculate_heart_rate_zones(row["age"], row["resting_heart_rate"])
+        (report["moderate_hr_low"], report["moderate_hr_high"]), (report["vigorous_hr_low"], report["vigorous_hr_high"]) = (
+            zones["Moderate (50-70%)"], zones["Vigorous (70-85%)"])
+    return report
+
+
+def _assert_matches_scalar(rows, scored):
+    assert list(scored) == list(health_batch.REPORT_COLUMNS)
+    for index, row in enumerate(rows):
+        expected = _expected(row)
+        actual = {name: values[index] for name, values in scored.items()}
+        for name, value in expected.items():
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(actual[name]), (row, name)
+            else:
+                assert actual[name] == value, (row, name, actual[name], value)
+
+
+def test_score_chunk_matches_the_scalar_functions():
+    rows = _cohort(5000)
+    _assert_matches_scalar(rows, health_batch.score_chunk(_columns(rows)))
+
+
+def test_invalid_activity_levels_leave_calories_and_macros_blank():
+    rows = _cohort(40)
+    for row in rows[::3]:
+        row["activity_level"] = "couch potato"
+    scored = health_batch.score_chunk(_columns(rows))
+
+    _assert_matches_scalar(rows, scored)
+    assert np.isnan(scored["calories"][::3]).all() and not np.isnan(scored["calories"][1::3]).any()
+
+
+def test_missing_resting_heart_rate_leaves_the_zones_blank():
+    rows = _cohort(40)
+    names = [name for name in rows[0] if name != "resting_heart_rate"]
+    for row in rows:
+        del row["resting_heart_rate"]
+    scored = health_batch.score_chunk(_columns(rows, names))
+
+    _assert_matches_scalar(rows, scored)
+    assert np.isnan(scored["vigorous_hr_high"]).all()
+
+
+def _write_csv(path, header, lines):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        file.write(header + "\n" + "".join(line + "\n" for line in lines))
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.reader(file))
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_score_file_copies_input_columns_as_written(tmp_path, workers):
+    header = "age,gender,height_cm,weight,activity_level,resting_heart_rate,member_id"
+    _write_csv(tmp_path / "cohort.csv", header, [
+        "32, male ,180,75.50,moderate,60,007",
+        "17,female,160,50,bogus,,x-12",
+    ])
+    rows = health_batch.score_file(str(tmp_path / "cohort.csv"), str(tmp_path / "reports.csv"), workers=workers)
+
+    output = _read_csv(tmp_path / "reports.csv")
+    assert rows == 2
+    assert output[0] == header.split(",") + list(health_batch.REPORT_COLUMNS)
+    assert [line[:7] for line in output[1:]] == [
+        ["32", " male ", "180", "75.50", "moderate", "60", "007"],
+        ["17", "female", "160", "50", "bogus", "", "x-12"]]
+    # Scored from the stripped, parsed values: 10*75.5 + 6.25*180 - 5*32 + 5, times 1.55
+    assert output[1][7:11] == ["23.3", "Normal weight", "2.49", "2673.75"]
+    assert output[2][10:14] == ["", "", "", ""] and output[2][-4:] == ["", "", "", ""]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_header_only_input_writes_a_header_only_report(tmp_path, workers):
+    header = "age,gender,height_cm,weight,activity_level"
+    _write_csv(tmp_path / "cohort.csv", header, [])
+
+    assert health_batch.score_file(str(tmp_path / "cohort.csv"), str(tmp_path / "reports.csv"), workers=workers) == 0
+    assert _read_csv(tmp_path / "reports.csv") == [header.split(",") + list(health_batch.REPORT_COLUMNS)]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_parquet_input_columns_keep_their_types(tmp_path, workers):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    pq.write_table(pa.table({
+        "age": [32, None, 70], "gender": ["male", "female", "female"], "height_cm": [180, 160, 155],
+        "weight": [75.5, 50.0, 61.0], "activity_level": ["moderate", "active", "sedentary"],
+    }), tmp_path / "cohort.parquet")
+
+    health_batch.score_file(str(tmp_path / "cohort.parquet"), str(tmp_path / "reports.parquet"), workers=workers)
+    table = pq.read_table(tmp_path / "reports.parquet")
+    assert table.column("age").type == pa.int64() and table.column("age").to_pylist() == [32, None, 70]
+    assert table.column("height_cm").to_pylist() == [180, 160, 155]
+    assert table.column("calories").to_pylist()[0] == 2673.75
+
+    empty = tmp_path / "empty.parquet"
+    pq.write_table(table.schema.empty_table().select(["age", "gender", "height_cm", "weight", "activity_level"]), empty)
+    assert health_batch.score_file(str(empty), str(tmp_path / "empty_reports.parquet"), workers=workers) == 0
+    assert pq.read_table(tmp_path / "empty_reports.parquet").column_names[-1] == "vigorous_hr_high"
+
+
+def _write_cohort_csv(path, rows):
+    names = list(rows[0])
+    _write_csv(path, ",".join(names), [",".join(str(row[name]) for name in names) for row in rows])
+
+
+def test_split_csv_covers_every_row_once_on_line_boundaries(tmp_path):
+    path = tmp_path / "cohort.csv"
+    _write_cohort_csv(path, _cohort(1000))
+    content = path.read_bytes()
+    fieldnames, start = health_batch.read_csv_header(str(path))
+
+    for parts in (1, 3, 16, 5000):
+        ranges = health_batch.split_csv(str(path), parts)
+        assert ranges[0][0] == start and ranges[-1][1] == len(content)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(content[end - 1:end] == b"\n" for _, end in ranges)
+        assert len(ranges) == min(parts, 1000)
+
+        ages = np.concatenate([chunk["age"] for low, high in ranges
+                               for chunk in health_batch.read_csv_range(str(path), low, high, fieldnames, 64)])
+        assert ages.tolist() == [line.split(",")[0] for line in content.decode().splitlines()[1:]]
+
+
+@pytest.mark.parametrize("output", ["reports.csv", "reports.parquet"])
+def test_csv_reports_are_identical_for_one_and_four_workers(tmp_path, output):
+    rows = _cohort(3000)
+    _write_cohort_csv(tmp_path / "cohort.csv", rows)
+    outputs = []
+    for workers in (1, 4):
+        path = tmp_path / f"{workers}-{output}"
+        assert health_batch.score_file(str(tmp_path / "cohort.csv"), str(path), chunk_size=97, workers=workers) == 3000
+        outputs.append(path)
+
+    if output.endswith(".csv"):
+        assert outputs[0].read_bytes() == outputs[1].read_bytes()
+        # Merged in input order, under a single header
+        assert [line[0] for line in _read_csv(outputs[1])[1:]] == [str(row["age"]) for row in rows]
+    else:
+        pq = pytest.importorskip("pyarrow.parquet")
+        single, merged = pq.read_table(outputs[0]), pq.read_table(outputs[1])
+        assert single.equals(merged)
+        assert merged.column("age").to_pylist() == [row["age"] for row in rows]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("health_batch_")]
+
+
+@pytest.mark.parametrize("output", ["reports.csv", "reports.parquet"])
+def test_parquet_row_groups_are_scored_in_parts_and_merged_in_order(tmp_path, output):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = _cohort(2500)
+    pq.write_table(pa.Table.from_pylist(rows), tmp_path / "cohort.parquet", row_group_size=100)
+    assert pq.ParquetFile(tmp_path / "cohort.parquet").num_row_groups == 25
+
+    outputs = []
+    for workers in (1, 4):
+        path = tmp_path / f"{workers}-{output}"
+        assert health_batch.score_file(str(tmp_path / "cohort.parquet"), str(path), chunk_size=64,
+                                       workers=workers) == 2500
+        outputs.append(path)
+
+    if output.endswith(".csv"):
+        assert outputs[0].read_bytes() == outputs[1].read_bytes()
+        assert [line[0] for line in _read_csv(outputs[1])[1:]] == [str(row["age"]) for row in rows]
+    else:
+        single, merged = pq.read_table(outputs[0]), pq.read_table(outputs[1])
+        assert single.equals(merged)
+        assert merged.column("age").to_pylist() == [row["age"] for row in rows]
+        _assert_matches_scalar(rows, {name: merged.column(name).to_numpy(zero_copy_only=False)
+                                      for name in health_batch.REPORT_COLUMNS})
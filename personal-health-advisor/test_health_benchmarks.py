@@ -0,0 +1,95 @@
+# Benchmarks for the personal health advisor calculators
+#
+# Dependencies:
+# pip install pytest-benchmark numpy
+#
+# With --benchmark-gate, conftest.py compares the run against benchmark_baseline.json
+# and fails on a median more than 15% slower. Each benchmark runs the scalar
+# function over 1 and 10k inputs, and over 1M with --benchmark-large; the 1-input
+# cases are not gated. The health_batch versions run
+# over the same inputs so the batch engine can be compared against them.
+
+import importlib.util
+import os
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+np = pytest.importorskip("numpy")
+
+import health_batch
+
+_spec = importlib.util.spec_from_file_location(
+    "personal_health_advisor", os.path.join(os.path.dirname(__file__), "personal-health-advisor.py"))
+advisor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(advisor)
+
+LARGE = 1_000_000
+SMALL = 10_000
+SIZES = [pytest.param(1, marks=pytest.mark.ungated), SMALL, pytest.param(LARGE, marks=pytest.mark.large)]
+ACTIVITY_LEVELS = ['sedentary', 'moderate', 'active', 'very active']
+FOOD_PREFERENCES = ['vegetarian', 'gluten-free', 'none']
+
+
+def _rounds(size):
+    return 20 if size < LARGE else 3
+
+
+@pytest.fixture(scope="module")
+def cohort(request):
+    rng = random.Random(42)
+    size = LARGE if request.config.getoption("--benchmark-large") else SMALL
+    return {
+        "age": [rng.randint(5, 90) for _ in range(size)],
+        "gender": [rng.choice(['male', 'female']) for _ in range(size)],
+        "height_cm": [round(rng.uniform(140, 200), 1) for _ in range(size)],
+        "weight": [round(rng.uniform(40, 140), 1) for _ in range(size)],
+        "activity_level": [rng.choice(ACTIVITY_LEVELS) for _ in range(size)],
+        "food_preference": [rng.choice(FOOD_PREFERENCES) for _ in range(size)],
+    }
+
+
+@pytest.fixture(scope="module")
+def cohort_arrays(cohort):
+    return {name: np.array(values, dtype=object if isinstance(values[0], str) else float)
+            for name, values in cohort.items()}
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_calculate_bmi(benchmark, cohort, size):
+    weights, heights = cohort["weight"][:size], [height / 100 for height in cohort["height_cm"][:size]]
+    result = benchmark.pedantic(lambda: [advisor.calculate_bmi(w, h) for w, h in zip(weights, heights)],
+                                rounds=_rounds(size))
+    assert len(result) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_calculate_bmi_batch(benchmark, cohort, cohort_arrays, size):
+    weights, heights = cohort_arrays["weight"][:size], cohort_arrays["height_cm"][:size] / 100
+    result = benchmark.pedantic(health_batch.calculate_bmi, args=(weights, heights), rounds=_rounds(size))
+    assert result[0] == advisor.calculate_bmi(cohort["weight"][0], cohort["height_cm"][0] / 100)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_recommend_calories(benchmark, cohort, size):
+    rows = list(zip(cohort["age"], cohort["gender"], cohort["height_cm"], cohort["weight"],
+                    cohort["activity_level"]))[:size]
+    result = benchmark.pedantic(lambda: [advisor.recommend_calories(*row) for row in rows], rounds=_rounds(size))
+    assert len(result) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_recommend_calories_batch(benchmark, cohort, cohort_arrays, size):
+    columns = [cohort_arrays[name][:size] for name in ("age", "gender", "height_cm", "weight", "activity_level")]
+    result = benchmark.pedantic(health_batch.recommend_calories, args=columns, rounds=_rounds(size))
+    assert result[0] == advisor.recommend_calories(cohort["age"][0], cohort["gender"][0], cohort["height_cm"][0],
+                                                   cohort["weight"][0], cohort["activity_level"][0])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_suggest_meal_plan(benchmark, cohort, size):
+    rows = [(advisor.calculate_bmi(weight, height / 100), preference) for weight, height, preference
+            in zip(cohort["weight"][:size], cohort["height_cm"][:size], cohort["food_preference"][:size])]
+    result = benchmark.pedantic(lambda: [advisor.suggest_meal_plan(*row) for row in rows], rounds=_rounds(size))
+    assert len(result) == size
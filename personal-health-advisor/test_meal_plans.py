@@ -0,0 +1,39 @@
+# Tests for the shared, read-only meal plans of personal-health-advisor.py
+#
+# Dependencies:
+# pip install pytest
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "personal_health_advisor", os.path.join(os.path.dirname(__file__), "personal-health-advisor.py"))
+advisor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(advisor)
+
+
+def test_plans_are_shared_between_calls_and_read_only():
+    plan = advisor.suggest_meal_plan(22.0, "vegetarian")
+    assert advisor.suggest_meal_plan(23.5, "vegetarian") is plan
+    assert plan["Dinner"] == "Lentil soup with whole grain bread (400 kcal)"
+    assert plan["Breakfast"] == "Oatmeal with fruits and nuts (350 kcal)"
+
+    with pytest.raises(TypeError):
+        plan["Dinner"] = "Pizza"
+    with pytest.raises(TypeError):
+        del plan["Snack"]
+    assert advisor.suggest_meal_plan(22.0, "vegetarian")["Dinner"] == "Lentil soup with whole grain bread (400 kcal)"
+
+
+@pytest.mark.parametrize("bmi, bucket", [(17.0, "underweight"), (24.89, "normal"), (24.95, "obese"),
+                                         (27.0, "overweight"), (31.0, "obese")])
+def test_preferences_without_an_override_get_the_plain_template(bmi, bucket):
+    plain = advisor.MEAL_PLANS[(bucket, None)]
+    assert advisor.suggest_meal_plan(bmi, "none") is plain
+    assert advisor.suggest_meal_plan(bmi, "") is plain
+    # Unhashable or missing preferences are no different
+    assert advisor.suggest_meal_plan(bmi, ["vegetarian"]) is plain
+    assert advisor.suggest_meal_plan(bmi, None) is plain
+    assert advisor.suggest_meal_plan(bmi, "gluten-free")["Lunch"].endswith("gluten-free vinaigrette (400 kcal)")
@@ -0,0 +1,306 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Set
+from urllib.parse import urldefrag, urlsplit
+
+import aiohttp
+import lxml.html
+from lxml import etree
+from multidict import CIMultiDict
+
+from http_cache import CachedResponse, HttpCache
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "web-scrapper/1.0"
+# Longest Retry-After a server can impose before we retry anyway
+MAX_RETRY_AFTER = 60
+
+
+@dataclass
+class Page:
+    """A fetched page, or the error that prevented fetching it."""
+    url: str
+    depth: int
+    status: Optional[int] = None
+    headers: Mapping[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    error: Optional[str] = None
+    attempts: int = 0
+    # Whether the body was served from the HttpCache (fresh, or revalidated with a 304)
+    from_cache: bool = False
+    # Links found on the page by whoever parsed it, for Crawler.follow
+    links: Optional[List[str]] = None
+
+    @property
+    def is_html(self) -> bool:
+        return "html" in self.headers.get("Content-Type", "")
+
+
+def normalize_url(url: str) -> str:
+    """Drop the fragment and lowercase the scheme and host, so equal pages dedup to one URL."""
+    url = urldefrag(url.strip())[0]
+    parts = urlsplit(url)
+    return parts._replace(scheme=parts.scheme.lower(), netloc=parts.netloc.lower()).geturl()
+
+
+def read_url_list(path: str) -> Iterator[str]:
+    """Yield the URLs in a file, one per line, skipping blank lines and # comments."""
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def extract_links(body: bytes, base_url: str) -> Iterator[str]:
+    """Yield the absolute http(s) targets of the <a href> links in an HTML page."""
+    try:
+        document = lxml.html.document_fromstring(body, base_url=base_url)
+    except (etree.ParserError, ValueError):
+        return
+    document.make_links_absolute(base_url, resolve_base_href=True, handle_failures="discard")
+    for element, attribute, link, _ in document.iterlinks():
+        if element.tag == "a" and attribute == "href" and link.startswith(("http://", "https://")):
+            yield link
+
+
+class Frontier:
+    """Queue of URLs still to fetch; every URL is queued at most once."""
+
+    def __init__(self, max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+                 allowed_hosts: Optional[Set[str]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.seen: Set[str] = set()
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.allowed_hosts = allowed_hosts
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL unless it was already seen or falls outside the crawl limits."""
+        url = normalize_url(url)
+        if url in self.seen:
+            return False
+        if self.max_pages is not None and len(self.seen) >= self.max_pages:
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if self.allowed_hosts is not None and urlsplit(url).netloc not in self.allowed_hosts:
+            return False
+        self.seen.add(url)
+        self.queue.put_nowait((url, depth))
+        return True
+
+
+class HostThrottle:
+    """Limits concurrent requests per host and spaces out their start times."""
+
+    def __init__(self, per_host: int, delay: float):
+        self.per_host = per_host
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with semaphore:
+            if self.delay:
+                async with self._locks.setdefault(host, asyncio.Lock()):
+                    wait = self._next_start.get(host, 0.0) - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._next_start[host] = time.monotonic() + self.delay
+            yield
+
+
+class Crawler:
+    """
+    Fetches pages concurrently over one pooled aiohttp session.
+
+    URLs come from seeds (e.g. read_url_list) and, with follow_links, from the
+    links on every fetched HTML page. Those are extracted on a thread, off the
+    event loop, unless defer_links hands the job to the consumer: a parse stage
+    that parses every page anyway finds the links in the same worker process and
+    passes them back with follow(). Each host gets at most per_host requests at
+    a time, started at least delay seconds apart. Connection errors, timeouts
+    and RETRY_STATUSES responses are retried with exponential backoff. With a
+    cache, fresh pages are served from disk and stale ones are fetched with
+    conditional requests. The cache's SQLite and file I/O runs on a thread of
+    its own, so it never blocks the event loop.
+    """
+
+    def __init__(self, concurrency: int = 64, per_host: int = 4, delay: float = 0.25, retries: int = 3,
+                 backoff: float = 0.5, timeout: float = 30, follow_links: bool = False, same_host: bool = True,
+                 max_pages: Optional[int] = None, max_depth: Optional[int] = None,
+                 cache: Optional[HttpCache] = None, defer_links: bool = False):
+        """
+        Args:
+            concurrency: Requests in flight across all hosts
+            per_host: Requests in flight per host
+            delay: Seconds between the starts of two requests to the same host
+            retries: Retries per URL after the first attempt
+            backoff: Delay before the first retry; doubles on every further retry
+            timeout: Total seconds allowed per request
+            follow_links: Also crawl the links found on fetched pages
+            same_host: Only follow links to the hosts of the seeds
+            max_pages: Stop queueing URLs after this many
+            max_depth: Only follow links this many hops from a seed
+            cache: HTTP cache to serve and revalidate pages from
+            defer_links: With follow_links, leave link extraction to the consumer of crawl(),
+                which must call follow() once for every HTML page it is given
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.follow_links = follow_links
+        self.same_host = same_host
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.cache = cache
+        self.defer_links = defer_links
+        # URLs of the pages whose links are still to come through follow(), and where they go
+        self._awaiting_links: Set[str] = set()
+        self._frontier: Optional[Frontier] = None
+        # Started on first use; one thread, so cache calls run one at a time on the connection they share
+        self._cache_thread: Optional[ThreadPoolExecutor] = None
+        self.throttle = HostThrottle(per_host, delay)
+        self.stats = {"fetched": 0, "failed": 0, "retries": 0, "bytes": 0, "cached": 0}
+
+    async def crawl(self, seeds: Iterable[str]) -> AsyncIterator[Page]:
+        """Yield every page as soon as it has been fetched; stops when the frontier is exhausted."""
+        seeds = [normalize_url(url) for url in seeds]
+        allowed_hosts = {urlsplit(url).netloc for url in seeds} if self.follow_links and self.same_host else None
+        frontier = self._frontier = Frontier(self.max_pages, self.max_depth, allowed_hosts)
+        for url in seeds:
+            frontier.add(url, 0)
+
+        # Bounded, so a slow consumer pauses the fetchers instead of buffering pages
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        async with aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT},
+                                         timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            workers = [asyncio.create_task(self._work(session, frontier, pages)) for _ in range(self.concurrency)]
+
+            async def finish():
+                await frontier.queue.join()
+                await pages.put(None)
+
+            finisher = asyncio.create_task(finish())
+            try:
+                while (page := await pages.get()) is not None:
+                    yield page
+            finally:
+                for task in workers + [finisher]:
+                    task.cancel()
+                await asyncio.gather(*workers, finisher, return_exceptions=True)
+                if self._cache_thread is not None:
+                    self._cache_thread.shutdown()
+                    self._cache_thread = None
+                self._awaiting_links.clear()
+                self._frontier = None
+
+    async def _work(self, session: aiohttp.ClientSession, frontier: Frontier, pages: asyncio.Queue):
+        while True:
+            url, depth = await frontier.queue.get()
+            deferred = False
+            try:
+                page = await self.fetch(session, url, depth)
+                if self.follow_links and page.error is None and page.is_html:
+                    if self.defer_links:
+                        self._awaiting_links.add(url)
+                    else:
+                        links = await asyncio.get_running_loop().run_in_executor(
+                            None, lambda: list(extract_links(page.body, url)))
+                        for link in links:
+                            frontier.add(link, depth + 1)
+                await pages.put(page)
+                # Handed over: the crawl is not done until follow() has queued this page's links
+                deferred = url in self._awaiting_links
+            finally:
+                if not deferred:
+                    self._awaiting_links.discard(url)
+                    frontier.queue.task_done()
+
+    def follow(self, page: Page):
+        """
+        Queue the links of a page crawled with defer_links, as found by its parser in page.links.
+
+        Call it once for every page crawl() yields, including pages that failed to
+        parse (their links are None). Pages whose links were not deferred are ignored.
+        """
+        if page.url not in self._awaiting_links:
+            return
+        self._awaiting_links.discard(page.url)
+        for link in page.links or ():
+            self._frontier.add(link, page.depth + 1)
+        self._frontier.queue.task_done()
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str, depth: int = 0) -> Page:
+        """Fetch one URL, retrying transient failures."""
+        page = Page(url, depth)
+        host = urlsplit(url).netloc
+        cached = await self._in_cache_thread(self.cache.lookup, url) if self.cache is not None else None
+        if cached is not None and self.cache.is_fresh(cached):
+            await self._in_cache_thread(self.cache.hit, cached)
+            return self._from_cache(page, cached)
+        request_headers = self.cache.conditional_headers(cached) if self.cache is not None else {}
+
+        while True:
+            page.attempts += 1
+            retry_after = None
+            try:
+                async with self.throttle.slot(host):
+                    async with session.get(url, headers=request_headers) as response:
+                        page.body = await response.read()
+                page.status, page.headers, page.error = response.status, response.headers, None
+                if response.status == 304 and cached is not None:
+                    cached = await self._in_cache_thread(self.cache.revalidated, cached, response.headers)
+                    return self._from_cache(page, cached)
+                if response.status not in RETRY_STATUSES:
+                    if self.cache is not None:
+                        await self._in_cache_thread(self.cache.store, url, response.status, response.headers,
+                                                    page.body)
+                    break
+                page.error = f"HTTP {response.status}"
+                retry_after = _retry_after_seconds(response.headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                page.error = f"{type(e).__name__}: {e}"
+            if page.attempts > self.retries:
+                break
+            self.stats["retries"] += 1
+            delay = self.backoff * 2 ** (page.attempts - 1) * random.uniform(1, 1.5)
+            await asyncio.sleep(max(delay, retry_after or 0))
+
+        if page.error is None:
+            self.stats["fetched"] += 1
+            self.stats["bytes"] += len(page.body)
+        else:
+            self.stats["failed"] += 1
+        return page
+
+    async def _in_cache_thread(self, method, *args):
+        """Run an HttpCache method on the cache thread, off the event loop."""
+        if self._cache_thread is None:
+            self._cache_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="http-cache")
+        return await asyncio.get_running_loop().run_in_executor(self._cache_thread, method, *args)
+
+    def _from_cache(self, page: Page, cached: CachedResponse) -> Page:
+        page.status, page.headers, page.body = cached.status, CIMultiDict(cached.headers), cached.body
+        page.error, page.from_cache = None, True
+        self.stats["cached"] += 1
+        return page
+
+
+def _retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    try:
+        return min(float(headers.get("Retry-After", "")), MAX_RETRY_AFTER)
+    except ValueError:
+        return None
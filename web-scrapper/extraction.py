@@ -0,0 +1,73 @@
+from email.message import Message
+from typing import Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from lxml import etree
+
+CHUNK_SIZE = 64 * 1024
+# Elements whose text is code rather than page content
+SKIPPED_TAGS = frozenset(("script", "style"))
+
+
+def declared_encoding(headers: Mapping[str, str]) -> Optional[str]:
+    """The charset of a Content-Type header, or None to let lxml detect the encoding from the page."""
+    message = Message()
+    message["Content-Type"] = headers.get("content-type", "")
+    return message.get_content_charset()
+
+
+def iter_text_nodes(chunks: Iterable[bytes], encoding: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield every non-blank text node of an HTML document once, in document order.
+    Comments, processing instructions and the code inside script and style
+    elements are skipped.
+
+    The document is fed to lxml's pull parser chunk by chunk. Each text node is
+    emitted as soon as it is complete, and finished elements are discarded, so
+    the work is linear in the size of the page and memory stays bounded by the
+    depth of the DOM rather than its size. Walking the tree and calling
+    .text on every tag would re-read each subtree once per ancestor.
+
+    Args:
+        chunks: The raw HTML, e.g. response.iter_content(CHUNK_SIZE) or [body]
+        encoding: Character encoding if known (e.g. from the Content-Type header)
+
+    Returns:
+        (tag, path, text) for each text node, where tag is the element that
+        contains the text and path is the slash-separated chain of tags down to it
+    """
+    parser = etree.HTMLPullParser(events=("start", "end", "comment", "pi"), encoding=encoding)
+    path: List[str] = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_text_nodes(parser, path)
+    parser.close()
+    yield from _read_text_nodes(parser, path)
+
+
+def _read_text_nodes(parser: etree.HTMLPullParser, path: List[str]) -> Iterator[Tuple[str, str, str]]:
+    for event, element in parser.read_events():
+        if event == "end":
+            # The element's own text if it has no children, else the text after its last child
+            text = element[-1].tail if len(element) else element.text
+            if element.tag not in SKIPPED_TAGS:
+                yield from _text_node(path, text)
+            path.pop()
+            element.clear(keep_tail=True)
+            continue
+
+        parent = element.getparent()
+        if parent is not None:
+            # Everything between the previous sibling (or the parent's start tag) and this node is complete
+            previous = element.getprevious()
+            yield from _text_node(path, parent.text if previous is None else previous.tail)
+            if previous is not None:
+                # Siblings before the previous one have been fully emitted
+                while previous.getprevious() is not None:
+                    del parent[0]
+        if event == "start":
+            path.append(element.tag)
+
+
+def _text_node(path: List[str], text: Optional[str]) -> Iterator[Tuple[str, str, str]]:
+    if text and not text.isspace():
+        yield path[-1], "/".join(path), text.strip()
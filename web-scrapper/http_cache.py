@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import Dict, Mapping, Optional
+
+import requests
+
+# Headers that describe the stored body; refreshed from a 304 response
+_VALIDATOR_HEADERS = ("etag", "last-modified", "cache-control", "expires", "date")
+
+
+@dataclass
+class CachedResponse:
+    """A response body stored in the cache, with its headers (lowercase names)."""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+    from_cache: bool = True
+
+
+def _no_store(headers: Mapping[str, str]) -> bool:
+    return "no-store" in headers.get("cache-control", "").lower()
+
+
+def _lowercase(headers: Mapping[str, str]) -> Dict[str, str]:
+    lowered: Dict[str, str] = {}
+    for name, value in headers.items():
+        name = name.lower()
+        lowered[name] = f"{lowered[name]}, {value}" if name in lowered else value
+    return lowered
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache keyed by URL, revalidated with conditional requests.
+
+    Bodies are stored as files named by the SHA-256 of their URL. A SQLite index
+    next to them keeps each URL's validators (ETag, Last-Modified), headers,
+    size and the time it was stored and last used. An entry younger than ttl
+    seconds is served without touching the network. An older one is revalidated
+    with If-None-Match/If-Modified-Since, and a 304 answer is served from disk.
+    Once the bodies exceed max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30, ttl: Optional[float] = None):
+        """
+        Args:
+            directory: Folder holding the index and the bodies (created if missing)
+            max_bytes: Largest total size of the stored bodies
+            ttl: Seconds an entry is served without revalidation; None always revalidates
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        # The crawler calls the cache from a thread of its own, one call at a time
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+
+    def _body_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """Return the stored response for a URL, fresh or not, or None."""
+        row = self.conn.execute("SELECT status, headers, stored_at FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._body_path(url), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            self._delete(url)
+            return None
+        return CachedResponse(url, row[0], json.loads(row[1]), body, row[2])
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Whether an entry can be served without revalidating it."""
+        return self.ttl is not None and time.time() - entry.stored_at < self.ttl
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> Dict[str, str]:
+        """Request headers that let the server answer 304 if the entry is still current."""
+        if entry is None:
+            return {}
+        headers = {}
+        if "etag" in entry.headers:
+            headers["If-None-Match"] = entry.headers["etag"]
+        if "last-modified" in entry.headers:
+            headers["If-Modified-Since"] = entry.headers["last-modified"]
+        elif "etag" not in entry.headers:
+            headers["If-Modified-Since"] = formatdate(entry.stored_at, usegmt=True)
+        return headers
+
+    def hit(self, entry: CachedResponse):
+        """Record that a fresh entry was served."""
+        self.stats["hits"] += 1
+        self.conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), entry.url))
+        self.conn.commit()
+
+    def revalidated(self, entry: CachedResponse, headers: Mapping[str, str]) -> CachedResponse:
+        """Record a 304 for an entry: refresh its validators and restart its TTL."""
+        self.stats["revalidated"] += 1
+        headers = _lowercase(headers)
+        entry.headers.update({name: headers[name] for name in _VALIDATOR_HEADERS if name in headers})
+        entry.stored_at = time.time()
+        self.conn.execute("UPDATE responses SET headers = ?, stored_at = ?, last_used = ? WHERE url = ?",
+                          (json.dumps(entry.headers), entry.stored_at, entry.stored_at, entry.url))
+        self.conn.commit()
+        return entry
+
+    def store(self, url: str, status: int, headers: Mapping[str, str], body: bytes) -> bool:
+        """
+        Store a full response, evicting least recently used entries if needed.
+
+        Returns:
+            Whether the response was stored (responses marked no-store, non-200
+            responses and bodies larger than max_bytes are not)
+        """
+        self.stats["misses"] += 1
+        headers = _lowercase(headers)
+        if status != 200 or _no_store(headers) or len(body) > self.max_bytes:
+            self._delete(url)
+            return False
+
+        path = self._body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, path)
+
+        now = time.time()
+        previous = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        self.conn.execute("INSERT OR REPLACE INTO responses (url, status, headers, size, stored_at, last_used) "
+                          "VALUES (?, ?, ?, ?, ?, ?)", (url, status, json.dumps(headers), len(body), now, now))
+        self.total_bytes += len(body) - (previous[0] if previous else 0)
+        self._evict()
+        self.conn.commit()
+        return True
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT url, size FROM responses ORDER BY last_used LIMIT 64").fetchall()
+            for url, size in rows:
+                self._delete(url, commit=False)
+                self.stats["evictions"] += 1
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def _delete(self, url: str, commit: bool = True):
+        row = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+        self.total_bytes -= row[0]
+        try:
+            os.remove(self._body_path(url))
+        except FileNotFoundError:
+            pass
+        if commit:
+            self.conn.commit()
+
+    def get(self, url: str, session=None, **request_options) -> CachedResponse:
+        """
+        Fetch a URL with requests through the cache.
+
+        Args:
+            url: URL to fetch
+            session: requests session or module to use (defaults to requests)
+            request_options: Extra keyword arguments for session.get
+
+        Returns:
+            The response; from_cache tells whether the body came from disk
+        """
+        session = session or requests
+        entry = self.lookup(url)
+        if entry is not None and self.is_fresh(entry):
+            self.hit(entry)
+            return entry
+        headers = {**request_options.pop("headers", {}), **self.conditional_headers(entry)}
+        response = session.get(url, headers=headers, **request_options)
+        if response.status_code == 304 and entry is not None:
+            return self.revalidated(entry, response.headers)
+        self.store(url, response.status_code, response.headers, response.content)
+        return CachedResponse(url, response.status_code, _lowercase(response.headers), response.content,
+                              time.time(), from_cache=False)
+
+    def close(self):
+        self.conn.close()
@@ -1,15 +1,29 @@
+import argparse
+import asyncio
 import csv
+import json
+import time
 import requests
 from bs4 import BeautifulSoup
 
+from crawler import Crawler, read_url_list
+from extraction import CHUNK_SIZE, declared_encoding, iter_text_nodes
+from http_cache import HttpCache
+from parse_pool import ParseStage, RuleRecords, StageStats, TagRows, TextNodeRows
+from rules import RecordWriter, RuleSet
 
-def scrape_website():
+
+def scrape_website(mode="tags", cache=None):
     url = input("Enter the website URL to scrape: ").strip()
     website_name = url.split("//")[-1].split("/")[0].replace("www.", "")
     output_file = f"{website_name}_data.csv"
 
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
+    if mode == "text":
+        scrape_text_nodes(url, output_file, cache)
+        return
+
+    content = cache.get(url).body if cache is not None else requests.get(url).content
+    soup = BeautifulSoup(content, 'html.parser')
 
     with open(output_file, 'w', newline='', encoding='utf-8') as file:  # Specify encoding
         writer = csv.writer(file)
@@ -19,5 +33,121 @@ def scrape_website():
                 writer.writerow([tag.name, tag.text.strip()])
 
 
+def scrape_text_nodes(url, output_file, cache=None):
+    """Stream a page and write each of its text nodes once, with its tag path, as the page downloads."""
+    with open(output_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Tag", "Path", "Content"])
+        if cache is not None:
+            # The cache needs the whole body, so there is nothing left to stream
+            response = cache.get(url)
+            writer.writerows(iter_text_nodes([response.body], declared_encoding(response.headers)))
+            return
+        with requests.get(url, stream=True) as response:
+            writer.writerows(iter_text_nodes(response.iter_content(CHUNK_SIZE), declared_encoding(response.headers)))
+
+
+def _crawl_and_parse(seeds, parser, write, parse_workers=None, report_every=None, **crawler_options):
+    """
+    Fetch pages in the event loop and parse them in a pool of worker processes.
+
+    Each parsed page's rows are passed to write as they arrive. The fetch, parse
+    and write stages are timed separately, so slow stages show up in the report
+    printed every report_every seconds and at the end.
+    """
+    async def crawl():
+        # With --follow, the parse workers also find each page's links, so no page is parsed on the event loop
+        follow_links = crawler_options.get("follow_links", False)
+        crawler = Crawler(defer_links=follow_links, **crawler_options)
+        stage = ParseStage(parser, parse_workers, follow_links=follow_links)
+        fetch_stats, write_stats = StageStats("fetch"), StageStats("write")
+        last_report = time.perf_counter()
+
+        async def fetched_pages():
+            async for page in crawler.crawl(seeds):
+                if page.error is not None:
+                    print(f"Failed to fetch {page.url}: {page.error}")
+                    continue
+                fetch_stats.add(1, len(page.body))
+                yield page
+
+        async for page, rows, error in stage.map(fetched_pages()):
+            crawler.follow(page)
+            if error is not None:
+                print(f"Failed to parse {page.url}: {error}")
+                continue
+            started = time.perf_counter()
+            write(rows)
+            write_stats.add(len(rows), busy_seconds=time.perf_counter() - started)
+            if report_every and time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                print(f"{fetch_stats}\n{stage.stats}\n{write_stats}")
+
+        print(f"{fetch_stats}\n{stage.stats}\n{write_stats}")
+        return crawler.stats
+
+    return asyncio.run(crawl())
+
+
+def crawl_websites(seeds, output_file, mode="tags", parse_workers=None, report_every=None, **crawler_options):
+    """Crawl the seed URLs concurrently and write every page's tags (or text nodes) to one CSV; returns the crawl stats."""
+    with open(output_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(["URL", "Tag", "Path", "Content"] if mode == "text" else ["URL", "Tag", "Content"])
+        parser = TextNodeRows() if mode == "text" else TagRows()
+        return _crawl_and_parse(seeds, parser, writer.writerows, parse_workers, report_every, **crawler_options)
+
+
+def extract_websites(seeds, rules_file, output_file, parse_workers=None, report_every=None, **crawler_options):
+    """Crawl the seed URLs and write the fields the site rules select to CSV, JSONL or Parquet; returns the crawl stats."""
+    with open(rules_file, encoding='utf-8') as file:
+        sites = json.load(file)
+
+    def write(records):
+        for record in records:
+            writer.write(record)
+
+    with RecordWriter(output_file, RuleSet(sites).schema) as writer:
+        return _crawl_and_parse(seeds, RuleRecords(sites), write, parse_workers, report_every, **crawler_options)
+
+
 if __name__ == '__main__':
-    scrape_website()
+    parser = argparse.ArgumentParser(description="Scrape one page interactively, or crawl many with --urls/--seed.")
+    parser.add_argument("--urls", help="File with one URL per line to crawl")
+    parser.add_argument("--seed", action="append", default=[], help="URL to start crawling from (repeatable)")
+    parser.add_argument("--follow", action="store_true", help="Follow links to pages on the same hosts")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many pages")
+    parser.add_argument("--max-depth", type=int, help="Follow links at most this many hops")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight across all hosts")
+    parser.add_argument("--per-host", type=int, default=4, help="Requests in flight per host")
+    parser.add_argument("--delay", type=float, default=0.25, help="Seconds between requests to the same host")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per URL on transient failures")
+    parser.add_argument("--output", default="crawl_data.csv", help="CSV file to write")
+    parser.add_argument("--mode", choices=["tags", "text"], default="tags",
+                        help="tags: every tag with its full text (as before); text: each text node once with its tag path")
+    parser.add_argument("--rules", help="JSON file of per-site selectors; writes only those fields to --output "
+                                        "(.csv, .jsonl or .parquet)")
+    parser.add_argument("--parse-workers", type=int, help="Parser processes (defaults to the number of CPUs)")
+    parser.add_argument("--report-every", type=float, default=10, help="Seconds between per-stage throughput reports")
+    parser.add_argument("--cache", help="Folder for an HTTP cache; unchanged pages are then served from disk")
+    parser.add_argument("--cache-ttl", type=float, help="Seconds a cached page is used without revalidation")
+    parser.add_argument("--cache-size-mb", type=int, default=1024, help="Largest size of the cache")
+    args = parser.parse_args()
+    cache = HttpCache(args.cache, args.cache_size_mb << 20, args.cache_ttl) if args.cache else None
+
+    if args.urls or args.seed:
+        seeds = list(read_url_list(args.urls)) if args.urls else []
+        crawler_options = dict(concurrency=args.concurrency, per_host=args.per_host, delay=args.delay,
+                               retries=args.retries, follow_links=args.follow, max_pages=args.max_pages,
+                               max_depth=args.max_depth, cache=cache, parse_workers=args.parse_workers,
+                               report_every=args.report_every)
+        if args.rules:
+            stats = extract_websites(seeds + args.seed, args.rules, args.output, **crawler_options)
+        else:
+            stats = crawl_websites(seeds + args.seed, args.output, mode=args.mode, **crawler_options)
+        print(f"Fetched {stats['fetched']} pages ({stats['bytes']} bytes), {stats['cached']} from cache, "
+              f"{stats['failed']} failed, {stats['retries']} retries")
+    else:
+        scrape_website(args.mode, cache)
+    if cache is not None:
+        cache.close()
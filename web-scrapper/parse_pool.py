@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from crawler import Page, extract_links
+from extraction import declared_encoding, iter_text_nodes
+from rules import RuleSet
+
+
+# Parsers run inside the worker processes. Each takes a page's URL, body and
+# Content-Type and returns the rows to write for it.
+
+class TagRows:
+    """Every tag with its full text, as scrape_website writes them: [url, tag, content]."""
+
+    def __call__(self, url: str, body: bytes, content_type: str) -> List[list]:
+        soup = BeautifulSoup(body, 'html.parser')
+        rows = []
+        for tag in soup.find_all():
+            if tag.text.strip():
+                rows.append([url, tag.name, tag.text.strip()])
+        return rows
+
+
+class TextNodeRows:
+    """Each text node once with its tag path: [url, tag, path, content]."""
+
+    def __call__(self, url: str, body: bytes, content_type: str) -> List[list]:
+        encoding = declared_encoding({"content-type": content_type})
+        return [[url, *node] for node in iter_text_nodes([body], encoding)]
+
+
+class RuleRecords:
+    """The records a RuleSet selects from the page."""
+
+    def __init__(self, sites: Dict[str, Dict]):
+        self.sites = sites
+        self._rules: Optional[RuleSet] = None
+
+    def __getstate__(self):
+        # Compiled selectors cannot be pickled; each worker compiles its own once
+        return {"sites": self.sites, "_rules": None}
+
+    def __call__(self, url: str, body: bytes, content_type: str) -> List[Dict]:
+        if self._rules is None:
+            self._rules = RuleSet(self.sites)
+        return list(self._rules.extract(body, url))
+
+
+_parser = None
+
+
+def _init_worker(parser):
+    global _parser
+    _parser = parser
+
+
+def _parse(url: str, body: bytes, content_type: str,
+           follow_links: bool) -> Tuple[list, Optional[List[str]], Optional[str], float]:
+    started = time.process_time()
+    try:
+        rows, error = _parser(url, body, content_type), None
+    except Exception as e:
+        rows, error = [], f"{type(e).__name__}: {e}"
+    links = list(extract_links(body, url)) if follow_links and "html" in content_type else None
+    return rows, links, error, time.process_time() - started
+
+
+@dataclass
+class StageStats:
+    """Throughput of one stage of the scraper."""
+    name: str
+    items: int = 0
+    bytes: int = 0
+    # Seconds the stage spent working (CPU time summed over all workers for the parse stage)
+    busy_seconds: float = 0.0
+    workers: int = 1
+    started: float = field(default_factory=time.perf_counter)
+
+    def add(self, items: int = 1, size: int = 0, busy_seconds: float = 0.0):
+        self.items += items
+        self.bytes += size
+        self.busy_seconds += busy_seconds
+
+    def __str__(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        line = f"{self.name}: {self.items} items ({self.items / elapsed:.1f}/s"
+        line += f", {self.bytes / elapsed / 1e6:.2f} MB/s)" if self.bytes else ")"
+        if self.busy_seconds:
+            line += f", {self.busy_seconds / (elapsed * self.workers):.0%} busy over {self.workers} worker(s)"
+        return line
+
+
+class ParseStage:
+    """
+    Parses fetched pages in a pool of worker processes.
+
+    Pages are submitted as they arrive, with at most max_pending of them parsing
+    or waiting to be written at once. A fast fetcher therefore waits for the
+    parsers instead of piling up bodies in memory. Results are yielded as soon
+    as each page is parsed, in completion order.
+
+    With follow_links, the workers also extract the links of every HTML page
+    into page.links, for a Crawler with defer_links to follow.
+    """
+
+    def __init__(self, parser, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 follow_links: bool = False):
+        """
+        Args:
+            parser: TagRows, TextNodeRows, RuleRecords or another picklable callable
+            workers: Parser processes (defaults to the number of CPUs)
+            max_pending: Pages submitted but not yet consumed (defaults to 4 per worker)
+            follow_links: Also extract each HTML page's links into page.links
+        """
+        self.parser = parser
+        self.follow_links = follow_links
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.stats = StageStats("parse", workers=self.workers)
+
+    async def map(self, pages: AsyncIterator[Page]) -> AsyncIterator[Tuple[Page, list, Optional[str]]]:
+        """Yield (page, rows, parse error) for every page, parsed in the worker processes."""
+        loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_pending)
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.parser,)) as pool:
+            async def feed():
+                pending = set()
+                try:
+                    async for page in pages:
+                        await slots.acquire()
+                        future = loop.run_in_executor(pool, _parse, page.url, page.body,
+                                                      page.headers.get("Content-Type", ""), self.follow_links)
+                        pending.add(future)
+                        future.add_done_callback(pending.discard)
+                        future.add_done_callback(lambda done, page=page: results.put_nowait((page, done)))
+                    await asyncio.gather(*pending, return_exceptions=True)
+                finally:
+                    results.put_nowait(None)
+
+            feeder = asyncio.create_task(feed())
+            try:
+                while (item := await results.get()) is not None:
+                    page, done = item
+                    try:
+                        rows, page.links, error, busy = done.result()
+                    except Exception as e:
+                        rows, error, busy = [], f"{type(e).__name__}: {e}", 0.0
+                    self.stats.add(1, len(page.body), busy)
+                    yield page, rows, error
+                    slots.release()
+                await feeder
+            finally:
+                feeder.cancel()
@@ -0,0 +1,243 @@
+import csv
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import lxml.html
+from lxml import etree
+
+# Field types, with the Parquet type each is written as
+FIELD_TYPES = {"string": "string", "int": "int64", "float": "float64", "bool": "bool"}
+_NUMBER = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?")
+_TRUE = {"true", "yes", "1", "on"}
+_FALSE = {"false", "no", "0", "off"}
+# Attributes holding URLs; these are resolved against the page URL
+_URL_ATTRIBUTES = {"href", "src", "action"}
+
+
+def compile_selector(spec: Dict) -> etree.XPath:
+    """
+    Compile a {"css": ...} or {"xpath": ...} selector once, so it can be applied to every page.
+
+    CSS selectors need the cssselect package; they are translated to XPath.
+    """
+    if "css" in spec:
+        from lxml.cssselect import CSSSelector
+
+        return CSSSelector(spec["css"])
+    if "xpath" in spec:
+        return etree.XPath(spec["xpath"])
+    raise ValueError(f"Selector needs a 'css' or 'xpath' key: {spec}")
+
+
+def _convert(text: Optional[str], field_type: str):
+    if text is None:
+        return None
+    if field_type == "string":
+        return text
+    if field_type == "bool":
+        lowered = text.strip().lower()
+        return True if lowered in _TRUE else False if lowered in _FALSE else None
+    match = _NUMBER.search(text)
+    if match is None:
+        return None
+    number = match.group().replace(",", "")
+    try:
+        return int(float(number)) if field_type == "int" else float(number)
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """One output field: a compiled selector, what to read from its matches and the type to convert to."""
+    name: str
+    selector: etree.XPath
+    type: str = "string"
+    # Attribute to read instead of the text, e.g. "href"
+    attr: Optional[str] = None
+    # Keep every match as a list instead of only the first
+    many: bool = False
+
+    @classmethod
+    def from_spec(cls, name: str, spec: Dict) -> "FieldRule":
+        field_type = spec.get("type", "string")
+        if field_type not in FIELD_TYPES:
+            raise ValueError(f"Field {name!r} has unknown type {field_type!r}; use one of {', '.join(FIELD_TYPES)}")
+        return cls(name, compile_selector(spec), field_type, spec.get("attr"), spec.get("many", False))
+
+    def extract(self, scope, url: str):
+        values = []
+        for match in self.selector(scope):
+            if isinstance(match, str):
+                # XPath text() and @attribute results are already strings
+                text = match
+            elif self.attr is not None:
+                text = match.get(self.attr)
+                if text is not None and self.attr in _URL_ATTRIBUTES:
+                    text = urljoin(url, text.strip())
+            else:
+                text = " ".join(match.text_content().split())
+            value = _convert(text, self.type)
+            if not self.many:
+                return value
+            if value is not None:
+                values.append(value)
+        return values if self.many else None
+
+
+@dataclass(frozen=True)
+class SiteRules:
+    """The compiled rules of one site."""
+    # One record per match of this selector, or one record per page if None
+    record: Optional[etree.XPath]
+    fields: Tuple[FieldRule, ...]
+
+    @classmethod
+    def from_spec(cls, spec: Dict) -> "SiteRules":
+        record = compile_selector(spec["record"]) if "record" in spec else None
+        return cls(record, tuple(FieldRule.from_spec(name, field) for name, field in spec["fields"].items()))
+
+    def extract(self, document, url: str) -> Iterator[Dict]:
+        """Yield a record per match of the record selector (or one for the page), with the page URL."""
+        scopes = self.record(document) if self.record is not None else [document]
+        for scope in scopes:
+            record = {"url": url}
+            for field in self.fields:
+                record[field.name] = field.extract(scope, url)
+            yield record
+
+
+class RuleSet:
+    """
+    Declarative extraction rules for several sites, compiled once.
+
+    Rules are JSON, keyed by host. A key also matches its subdomains, so
+    "example.com" covers "www.example.com":
+
+        {"example.com": {
+            "record": {"css": "div.product"},
+            "fields": {
+                "title": {"css": "h2"},
+                "price": {"css": ".price", "type": "float"},
+                "link": {"css": "a", "attr": "href"},
+                "tags": {"xpath": ".//li[@class='tag']/text()", "many": true}}}}
+
+    Selectors are evaluated against lxml's tree, so only the nodes they match
+    become Python objects. No soup of the whole page is built.
+    """
+
+    def __init__(self, sites: Dict[str, Dict]):
+        self.sites = {host.lower(): SiteRules.from_spec(spec) for host, spec in sites.items()}
+        self.schema = self._merge_schemas(sites)
+        self._by_host: Dict[str, Optional[SiteRules]] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _merge_schemas(sites: Dict[str, Dict]) -> List[Tuple[str, str, bool]]:
+        # (name, type, many) of every field across the sites, in first-seen order, plus the page URL
+        schema = {"url": ("string", False)}
+        for host, spec in sites.items():
+            for name, field in spec["fields"].items():
+                kind = (field.get("type", "string"), field.get("many", False))
+                if schema.setdefault(name, kind) != kind:
+                    raise ValueError(f"Field {name!r} of {host} conflicts with its definition for another site")
+        return [(name, field_type, many) for name, (field_type, many) in schema.items()]
+
+    def for_url(self, url: str) -> Optional[SiteRules]:
+        """Return the rules for a URL's host (or a parent domain), or None if no site matches."""
+        host = urlsplit(url).hostname or ""
+        if host not in self._by_host:
+            rules = None
+            parts = host.split(".")
+            for i in range(len(parts)):
+                rules = self.sites.get(".".join(parts[i:]))
+                if rules is not None:
+                    break
+            self._by_host[host] = rules
+        return self._by_host[host]
+
+    def extract(self, body: bytes, url: str) -> Iterator[Dict]:
+        """Yield the records of a page, or nothing if no rules match its site."""
+        rules = self.for_url(url)
+        if rules is None:
+            return
+        try:
+            document = lxml.html.document_fromstring(body, base_url=url)
+        except etree.ParserError:
+            # Nothing but whitespace, comments or a doctype: the page has no content to extract
+            return
+        yield from rules.extract(document, url)
+
+
+class RecordWriter:
+    """
+    Write records to CSV, JSONL or Parquet, chosen by file extension.
+
+    Every file has the RuleSet's columns, in order. JSONL and Parquet keep the
+    types (Parquet with an explicit schema). In CSV, list fields are joined
+    with " | ".
+    """
+
+    def __init__(self, path: str, schema: List[Tuple[str, str, bool]], batch_size: int = 10_000):
+        self.path = path
+        self.schema = schema
+        self.names = [name for name, _, _ in schema]
+        self.format = path.lower().rsplit(".", 1)[-1]
+        if self.format not in ("csv", "jsonl", "parquet"):
+            raise ValueError(f"Unsupported output format: {path} (use .csv, .jsonl or .parquet)")
+        self.batch_size = batch_size
+        self._batch: List[Dict] = []
+        self._writer = None
+        self._file = None
+        if self.format == "csv":
+            self._file = open(path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.names)
+        elif self.format == "jsonl":
+            self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: Dict):
+        if self.format == "csv":
+            self._writer.writerow([" | ".join(map(str, value)) if isinstance(value, list) else value
+                                   for value in (record.get(name) for name in self.names)])
+        elif self.format == "jsonl":
+            self._file.write(json.dumps({name: record.get(name) for name in self.names}, ensure_ascii=False) + "\n")
+        else:
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._arrow_schema = pa.schema([
+                (name, pa.list_(pa.type_for_alias(FIELD_TYPES[field_type])) if many
+                 else pa.type_for_alias(FIELD_TYPES[field_type]))
+                for name, field_type, many in self.schema])
+            self._writer = pq.ParquetWriter(self.path, self._arrow_schema)
+        columns = {name: [record.get(name) for record in self._batch] for name in self.names}
+        self._writer.write_table(pa.table(columns, schema=self._arrow_schema))
+        self._batch = []
+
+    def close(self):
+        if self.format == "parquet":
+            if self._batch or self._writer is None:
+                self._flush()
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
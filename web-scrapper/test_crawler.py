@@ -0,0 +1,187 @@
+# Tests for the crawler, run against a local aiohttp server.
+#
+# Dependencies:
+# pip install pytest aiohttp lxml
+
+import asyncio
+import hashlib
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from crawler import Crawler, Frontier, extract_links, normalize_url, read_url_list
+
+
+class StandInSite:
+    """A small website served on localhost that records how it is requested."""
+
+    def __init__(self, pages=None, flaky=None, latency=0.0):
+        # path -> HTML body; flaky: path -> number of 503s to return before succeeding
+        self.pages = pages or {}
+        self.flaky = dict(flaky or {})
+        self.latency = latency
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Picked on the first crawl and kept, so cached URLs stay the same across crawls
+        self.port = 0
+
+    async def handle(self, request):
+        self.requests.append((request.path, time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.flaky.get(request.path, 0) > 0:
+                self.flaky[request.path] -= 1
+                return web.Response(status=503)
+            if request.path not in self.pages:
+                return web.Response(status=404)
+            etag = '"' + hashlib.sha256(self.pages[request.path].encode()).hexdigest()[:16] + '"'
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers={"ETag": etag})
+            return web.Response(text=self.pages[request.path], content_type="text/html", headers={"ETag": etag})
+        finally:
+            self.in_flight -= 1
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+
+def crawl(site, seeds, on_page=None, **options):
+    """Serve site on a free port, crawl it and return the fetched pages by path.
+
+    on_page, if given, is awaited with the crawler and each page as it is yielded.
+    """
+    async def run():
+        app = web.Application()
+        app.router.add_route("GET", "/{tail:.*}", site.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        server = web.TCPSite(runner, "127.0.0.1", site.port)
+        await server.start()
+        site.port = runner.addresses[0][1]
+        base = f"http://127.0.0.1:{site.port}"
+        try:
+            crawler = Crawler(**options)
+            pages = []
+            async for page in crawler.crawl(base + seed for seed in seeds):
+                pages.append(page)
+                if on_page:
+                    await on_page(crawler, page)
+            return {page.url[len(base):]: page for page in pages}, crawler.stats
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_follows_links_and_fetches_each_page_once():
+    site = StandInSite({
+        "/": '<a href="/a">a</a> <a href="/b#top">b</a> <a href="http://elsewhere.invalid/">x</a>',
+        "/a": '<a href="/">home</a> <a href="b">b</a>',
+        "/b": '<a href="/a">a</a>',
+    })
+    pages, stats = crawl(site, ["/"], follow_links=True, delay=0)
+
+    assert set(pages) == {"/", "/a", "/b"}
+    assert sorted(site.paths()) == ["/", "/a", "/b"]
+    assert stats["fetched"] == 3 and stats["failed"] == 0
+
+
+def test_deferred_links_are_followed_once_the_consumer_hands_them_back():
+    site = StandInSite({f"/{i}": f'<a href="/{i + 1}">next</a> <a href="/0">home</a>' for i in range(5)})
+    followed = []
+
+    async def parse_later(crawler, page):
+        # Stands in for a parse worker: the crawl must wait for the links instead of ending after "/0"
+        await asyncio.sleep(0.02)
+        page.links = list(extract_links(page.body, page.url))
+        followed.append(page.url)
+        crawler.follow(page)
+        crawler.follow(page)  # a second hand-back is ignored
+
+    pages, stats = crawl(site, ["/0"], on_page=parse_later, follow_links=True, defer_links=True, delay=0, max_depth=3)
+
+    assert set(pages) == {"/0", "/1", "/2", "/3"}
+    assert sorted(site.paths()) == ["/0", "/1", "/2", "/3"]
+    assert len(followed) == 4 and stats["fetched"] == 4
+    assert all(page.links is not None for page in pages.values())
+
+
+def test_respects_max_depth_and_max_pages():
+    site = StandInSite({f"/{i}": f'<a href="/{i + 1}">next</a>' for i in range(10)})
+
+    pages, _ = crawl(site, ["/0"], follow_links=True, delay=0, max_depth=2)
+    assert set(pages) == {"/0", "/1", "/2"}
+
+    pages, _ = crawl(site, ["/0"], follow_links=True, delay=0, max_pages=4)
+    assert set(pages) == {"/0", "/1", "/2", "/3"}
+
+
+def test_limits_concurrent_requests_per_host():
+    site = StandInSite({f"/{i}": "ok" for i in range(20)}, latency=0.05)
+    pages, _ = crawl(site, [f"/{i}" for i in range(20)], concurrency=16, per_host=3, delay=0)
+
+    assert len(pages) == 20
+    assert site.max_in_flight == 3
+
+
+def test_spaces_out_requests_to_a_host():
+    site = StandInSite({f"/{i}": "ok" for i in range(5)})
+    crawl(site, [f"/{i}" for i in range(5)], per_host=5, delay=0.05)
+
+    starts = sorted(started for _, started in site.requests)
+    # Arrival times also include connection setup, so allow some jitter per gap
+    assert all(later - earlier >= 0.03 for earlier, later in zip(starts, starts[1:]))
+    assert starts[-1] - starts[0] >= 4 * 0.05 - 0.01
+
+
+def test_retries_transient_errors_with_backoff():
+    site = StandInSite({"/": "ok"}, flaky={"/": 2})
+    pages, stats = crawl(site, ["/"], delay=0, retries=3, backoff=0.01)
+
+    assert pages["/"].error is None and pages["/"].status == 200
+    assert pages["/"].attempts == 3
+    assert stats["retries"] == 2
+
+
+def test_gives_up_after_the_last_retry():
+    site = StandInSite({"/": "ok"}, flaky={"/": 10})
+    pages, stats = crawl(site, ["/"], delay=0, retries=2, backoff=0.01)
+
+    assert pages["/"].error == "HTTP 503"
+    assert len(site.requests) == 3
+    assert stats["failed"] == 1
+
+
+def test_reports_unreachable_hosts_as_errors():
+    async def run():
+        crawler = Crawler(retries=1, backoff=0.01, delay=0, timeout=2)
+        return [page async for page in crawler.crawl(["http://127.0.0.1:9/"])]
+
+    pages = asyncio.run(run())
+    assert len(pages) == 1 and pages[0].error is not None and pages[0].attempts == 2
+
+
+def test_frontier_dedups_normalized_urls():
+    async def run():
+        frontier = Frontier()
+        added = [frontier.add(url, 0) for url in
+                 ["http://Example.com/a", "http://example.com/a#frag", "HTTP://example.com/a", "http://example.com/b"]]
+        return added, frontier.queue.qsize()
+
+    added, queued = asyncio.run(run())
+    assert added == [True, False, False, True]
+    assert queued == 2
+    assert normalize_url(" http://EXAMPLE.com/Path#x ") == "http://example.com/Path"
+
+
+def test_read_url_list_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("# seeds\nhttp://a.test/\n\n  http://b.test/x  \n", encoding="utf-8")
+    assert list(read_url_list(path)) == ["http://a.test/", "http://b.test/x"]
+
@@ -0,0 +1,71 @@
+# Tests for streaming text extraction.
+#
+# Dependencies:
+# pip install pytest lxml
+
+import pytest
+
+from extraction import declared_encoding, iter_text_nodes
+
+PAGE = ("<html><head><title>Café menu</title>"
+        "<script>var price = '<b>not text</b>';</script><style>p { color: red }</style></head>"
+        "<body><!-- a comment --><h1>Menu</h1>"
+        "<p>Fresh <b>croissants</b> every <i>morning</i>, baked in house.<?pi ignored?> Order early</p>"
+        "<ul><li>Espresso <span>1.80</span></li><li>Latte</li></ul>"
+        "<div>before<div>inside <em>deep</em> end</div>after</div>"
+        "</body></html>")
+
+EXPECTED = [
+    ("title", "html/head/title", "Café menu"),
+    ("h1", "html/body/h1", "Menu"),
+    ("p", "html/body/p", "Fresh"),
+    ("b", "html/body/p/b", "croissants"),
+    ("p", "html/body/p", "every"),
+    ("i", "html/body/p/i", "morning"),
+    ("p", "html/body/p", ", baked in house."),
+    ("p", "html/body/p", "Order early"),
+    ("li", "html/body/ul/li", "Espresso"),
+    ("span", "html/body/ul/li/span", "1.80"),
+    ("li", "html/body/ul/li", "Latte"),
+    ("div", "html/body/div", "before"),
+    ("div", "html/body/div/div", "inside"),
+    ("em", "html/body/div/div/em", "deep"),
+    ("div", "html/body/div/div", "end"),
+    ("div", "html/body/div", "after"),
+]
+
+
+def test_emits_text_and_tails_in_document_order():
+    assert list(iter_text_nodes([PAGE.encode()], "utf-8")) == EXPECTED
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64])
+def test_text_split_across_chunks_is_emitted_whole(chunk_size):
+    body = PAGE.encode()
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    # Chunks of 1 and 7 bytes also split the two-byte "é" of "Café"
+    assert list(iter_text_nodes(chunks, "utf-8")) == EXPECTED
+
+
+def test_skips_comments_scripts_and_blank_text():
+    body = (b"<body>\n  <!-- hidden --> <script>document.write('no')</script>\n"
+            b"<noscript>visible</noscript> <style>body {}</style>\n  <p>\n\t</p></body>")
+    assert list(iter_text_nodes([body])) == [("noscript", "html/body/noscript", "visible")]
+
+
+def test_nested_text_belongs_to_the_innermost_open_element():
+    # libxml2 caps HTML nesting at 255 levels
+    depth = 200
+    body = "<body>" + "<div>x" * depth + "</div>y" * depth + "</body>"
+    paths = ["html/body" + "/div" * level for level in range(depth + 1)]
+
+    assert list(iter_text_nodes([body.encode()])) == (
+        [("div", path, "x") for path in paths[1:]]
+        + [("div" if level else "body", paths[level], "y") for level in reversed(range(depth))])
+
+
+def test_uses_the_declared_encoding():
+    body = "<p>Grüße</p>".encode("latin-1")
+    assert list(iter_text_nodes([body], declared_encoding({"content-type": "text/html; charset=ISO-8859-1"}))) == [
+        ("p", "html/body/p", "Grüße")]
+    assert declared_encoding({}) is None
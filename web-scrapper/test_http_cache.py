@@ -0,0 +1,79 @@
+# Tests for the on-disk HTTP cache, alone and behind the crawler.
+#
+# Dependencies:
+# pip install pytest aiohttp lxml
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from http_cache import HttpCache
+from test_crawler import StandInSite, crawl
+
+
+def test_cache_revalidates_unchanged_pages_with_304(tmp_path):
+    site = StandInSite({"/": '<a href="/a">a</a>', "/a": "a"})
+    cache = HttpCache(str(tmp_path))
+    first, _ = crawl(site, ["/"], follow_links=True, delay=0, cache=cache)
+    site.pages["/a"] = "changed"
+    second, stats = crawl(site, ["/"], follow_links=True, delay=0, cache=cache)
+
+    assert not any(page.from_cache for page in first.values())
+    assert second["/"].from_cache and second["/"].body == first["/"].body
+    assert not second["/a"].from_cache and second["/a"].body == b"changed"
+    assert stats["cached"] == 1 and stats["fetched"] == 1
+    assert cache.stats["revalidated"] == 1
+
+
+def test_cache_serves_fresh_pages_without_requests(tmp_path):
+    site = StandInSite({"/": "home"})
+    cache = HttpCache(str(tmp_path), ttl=60)
+    crawl(site, ["/"], delay=0, cache=cache)
+    pages, _ = crawl(site, ["/"], delay=0, cache=cache)
+
+    assert pages["/"].from_cache and pages["/"].body == b"home"
+    assert pages["/"].headers["content-type"].startswith("text/html")
+    assert site.paths() == ["/"]
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=250)
+    for name in "abc":
+        cache.store(f"http://x.test/{name}", 200, {"ETag": name}, b"x" * 100)
+        time.sleep(0.01)
+
+    assert cache.lookup("http://x.test/a") is None
+    assert cache.lookup("http://x.test/c").body == b"x" * 100
+    assert cache.total_bytes == 200 and cache.stats["evictions"] == 1
+
+    reopened = HttpCache(str(tmp_path), max_bytes=250)
+    assert reopened.total_bytes == 200
+    assert reopened.conditional_headers(reopened.lookup("http://x.test/b")) == {"If-None-Match": "b"}
+
+
+def test_crawler_keeps_cache_io_off_the_event_loop(tmp_path):
+    class RecordingCache(HttpCache):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.threads = set()
+
+        def lookup(self, url):
+            self.threads.add(threading.current_thread().name)
+            return super().lookup(url)
+
+        def store(self, *args):
+            self.threads.add(threading.current_thread().name)
+            return super().store(*args)
+
+    site = StandInSite({f"/{i}": f"page {i}" for i in range(10)})
+    cache = RecordingCache(str(tmp_path))
+    pages, _ = crawl(site, [f"/{i}" for i in range(10)], delay=0, cache=cache)
+
+    assert len(pages) == 10 and cache.stats["misses"] == 10
+    assert cache.threads and threading.current_thread().name not in cache.threads
+    assert all(name.startswith("http-cache") for name in cache.threads)
+    # The thread only lives as long as the crawl
+    assert not any(thread.name.startswith("http-cache") for thread in threading.enumerate())
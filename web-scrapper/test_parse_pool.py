@@ -0,0 +1,86 @@
+# Tests for the multi-process parse stage.
+#
+# Dependencies:
+# pip install pytest beautifulsoup4 lxml
+
+import asyncio
+
+from crawler import Page
+from parse_pool import ParseStage, TagRows, TextNodeRows
+
+
+def _page(i):
+    body = f"<html><body><div>page {i}<p>para <b>{i}</b></p></div></body></html>".encode()
+    return Page(f"http://site.test/{i}", 0, 200, {"Content-Type": "text/html; charset=utf-8"}, body)
+
+
+def _parse_all(stage, pages):
+    async def source():
+        for page in pages:
+            await asyncio.sleep(0)
+            yield page
+
+    async def run():
+        results = {}
+        async for page, rows, error in stage.map(source()):
+            results[page.url] = (rows, error)
+        return results
+
+    return asyncio.run(run())
+
+
+def test_parses_every_page_in_worker_processes():
+    pages = [_page(i) for i in range(50)]
+    results = _parse_all(ParseStage(TextNodeRows(), workers=2), pages)
+
+    assert len(results) == 50
+    assert results["http://site.test/7"] == ([
+        ["http://site.test/7", "div", "html/body/div", "page 7"],
+        ["http://site.test/7", "p", "html/body/div/p", "para"],
+        ["http://site.test/7", "b", "html/body/div/p/b", "7"]], None)
+
+
+def test_extracts_links_of_html_pages_when_following():
+    page = Page("http://site.test/", 0, 200, {"Content-Type": "text/html"},
+                b'<a href="/a#top">a</a> <a href="b">b</a> <a href="http://elsewhere.test/">x</a>')
+    feed = Page("http://site.test/feed", 0, 200, {"Content-Type": "application/xml"}, b'<a href="/c">c</a>')
+
+    _parse_all(ParseStage(TagRows(), workers=1, follow_links=True), [page, feed])
+    assert page.links == ["http://site.test/a#top", "http://site.test/b", "http://elsewhere.test/"]
+    assert feed.links is None
+
+    plain = _page(1)
+    _parse_all(ParseStage(TagRows(), workers=1), [plain])
+    assert plain.links is None
+
+
+def test_tag_rows_match_scrape_website_output():
+    results = _parse_all(ParseStage(TagRows(), workers=1), [_page(1)])
+    rows, error = results["http://site.test/1"]
+
+    assert error is None
+    assert [row[1:] for row in rows] == [
+        ["html", "page 1para 1"], ["body", "page 1para 1"], ["div", "page 1para 1"], ["p", "para 1"], ["b", "1"]]
+
+
+def test_bounds_pages_in_flight_and_reports_throughput():
+    stage = ParseStage(TextNodeRows(), workers=2, max_pending=3)
+    pulled, ahead = [], []
+
+    async def source():
+        for i in range(20):
+            pulled.append(i)
+            yield _page(i)
+
+    async def run():
+        consumed = 0
+        async for _ in stage.map(source()):
+            consumed += 1
+            ahead.append(len(pulled) - consumed)
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    # Pages pulled from the source but not yet consumed never exceed max_pending
+    assert max(ahead) <= 3
+    assert stage.stats.items == 20 and stage.stats.bytes == sum(len(_page(i).body) for i in range(20))
+    assert "parse: 20 items" in str(stage.stats)
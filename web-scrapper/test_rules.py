@@ -0,0 +1,110 @@
+# Tests for selector-based extraction rules and the record writers.
+#
+# Dependencies:
+# pip install pytest lxml cssselect pyarrow
+
+import csv
+import json
+
+import pytest
+
+pytest.importorskip("cssselect")
+
+from rules import RecordWriter, RuleSet
+
+SHOP = b"""
+<html><body>
+  <div class="product"><h2>Kettle</h2><span class="price">$1,299.50</span>
+    <a href="/kettle">more</a><ul><li class="tag">kitchen</li><li class="tag">steel</li></ul>
+    <span class="stock">yes</span></div>
+  <div class="product"><h2> Mug  <small>large</small></h2><span class="price">n/a</span></div>
+  <div class="ad"><h2>Buy now</h2></div>
+</body></html>
+"""
+
+RULES = {
+    "shop.test": {
+        "record": {"css": "div.product"},
+        "fields": {
+            "title": {"css": "h2"},
+            "price": {"css": ".price", "type": "float"},
+            "link": {"css": "a", "attr": "href"},
+            "tags": {"xpath": ".//li[@class='tag']/text()", "many": True},
+            "in_stock": {"css": ".stock", "type": "bool"},
+        },
+    },
+    "blog.test": {"fields": {"title": {"xpath": "//title/text()"}, "words": {"css": "p", "type": "int"}}},
+}
+
+
+def test_extracts_one_record_per_match():
+    records = list(RuleSet(RULES).extract(SHOP, "https://www.shop.test/list"))
+
+    assert records == [
+        {"url": "https://www.shop.test/list", "title": "Kettle", "price": 1299.5,
+         "link": "https://www.shop.test/kettle", "tags": ["kitchen", "steel"], "in_stock": True},
+        {"url": "https://www.shop.test/list", "title": "Mug large", "price": None,
+         "link": None, "tags": [], "in_stock": None},
+    ]
+
+
+def test_one_record_per_page_without_record_selector_and_nothing_for_unknown_sites():
+    rules = RuleSet(RULES)
+    page = b"<html><head><title>Post</title></head><body><p>About 1,200 words</p></body></html>"
+
+    assert list(rules.extract(page, "http://blog.test/post")) == [
+        {"url": "http://blog.test/post", "title": "Post", "words": 1200}]
+    assert list(rules.extract(page, "http://other.test/")) == []
+    for empty in (b"", b"  \n", b"<!-- nothing here -->", b"<!DOCTYPE html>\n<!-- moved -->"):
+        assert list(rules.extract(empty, "http://blog.test/empty")) == []
+
+
+def test_schema_merges_sites_and_rejects_conflicts():
+    assert RuleSet(RULES).schema == [
+        ("url", "string", False), ("title", "string", False), ("price", "float", False),
+        ("link", "string", False), ("tags", "string", True), ("in_stock", "bool", False), ("words", "int", False)]
+
+    with pytest.raises(ValueError):
+        RuleSet({"a.test": {"fields": {"n": {"css": "p", "type": "int"}}},
+                 "b.test": {"fields": {"n": {"css": "p"}}}})
+    with pytest.raises(ValueError):
+        RuleSet({"a.test": {"fields": {"n": {"css": "p", "type": "date"}}}})
+
+
+@pytest.fixture
+def records():
+    return list(RuleSet(RULES).extract(SHOP, "https://shop.test/"))
+
+
+def test_writes_csv_and_jsonl(tmp_path, records):
+    schema = RuleSet(RULES).schema
+    for suffix in ("csv", "jsonl"):
+        with RecordWriter(str(tmp_path / f"out.{suffix}"), schema) as writer:
+            for record in records:
+                writer.write(record)
+
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == [name for name, _, _ in schema]
+    assert rows[1][1:5] == ["Kettle", "1299.5", "https://shop.test/kettle", "kitchen | steel"]
+
+    with open(tmp_path / "out.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["tags"] == ["kitchen", "steel"] and lines[1]["words"] is None
+
+
+def test_writes_parquet_with_schema(tmp_path, records):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "out.parquet")
+    with RecordWriter(path, RuleSet(RULES).schema, batch_size=1) as writer:
+        for record in records:
+            writer.write(record)
+
+    table = pq.read_table(path)
+    assert str(table.schema.field("price").type) == "double"
+    assert str(table.schema.field("tags").type.value_type) == "string"
+    assert table.column("title").to_pylist() == ["Kettle", "Mug large"]
+
+    empty = str(tmp_path / "empty.parquet")
+    RecordWriter(empty, RuleSet(RULES).schema).close()
+    assert pq.read_table(empty).num_rows == 0